@@ -0,0 +1,144 @@
+"""Mide el arranque en frío del bot contra el Discord falso, sin red.
+
+Uso: python arranque_frio.py --partidas 2000 --repeticiones 5 --gateway 0.3
+
+Primero juega a medias `--partidas` partidas (creadas, llenas y en la
+primera noche) para que haya un diario que restaurar. Después arranca el
+bot `--repeticiones` veces, cada una en un proceso nuevo, por main.py como
+en producción: inicia sesión, tarda `--gateway` segundos en conectar y, en
+cuanto conecta, un jugador de una partida guardada pide su rol por DM.
+Muestra la mediana de cada etapa de bot/arranque.py (importado, conectado,
+listo y primer_comando) en segundos desde el arranque. No se espera a
+"precalentado": los DMs se precalientan poco a poco, en segundo plano.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+JUGADORES = 8
+
+
+def cliente_falso(args, red, guion=None):
+    """Apunta bot/client.py al cliente falso; hay que llamarlo antes de importar mainnn"""
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso
+
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(
+        red, gateway=args.gateway, guion=guion, **opciones)
+
+
+async def preparar(args):
+    """Deja `--partidas` partidas en curso en el diario"""
+    from bot.falso import RedFalsa
+
+    # Sin latencia ni límites: aquí solo interesa el diario que queda
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    cliente_falso(args, red)
+    import mainnn as bot
+
+    async def partida(numero: int):
+        canal = red.canal(10**9 + numero)
+        primero = 10**6 * (numero + 1)
+        await bot.client.entregar(red.usuario(primero, admin=True), f"!mafia crear {JUGADORES}", canal)
+        for i in range(1, JUGADORES):
+            await bot.client.entregar(red.usuario(primero + i), "!mafia unirme", canal)
+
+    await bot.client.conectar()
+    await asyncio.gather(*(partida(n) for n in range(args.partidas)))
+    while bot.envios_privados:
+        await asyncio.gather(*list(bot.envios_privados.values()))
+    await bot.salida.vaciar()
+    bot.diario.cerrar()
+    return len(bot.partidas)
+
+
+def hijo(args):
+    """Un arranque: main.main() con un guion que manda el primer comando"""
+    from bot import arranque
+    from bot.falso import RedFalsa
+    import main as entrada
+
+    async def guion(cliente):
+        # Llega antes de que se restauren las partidas: espera a que estén
+        await cliente.entregar(cliente.red.usuario(10**6), "!mafia rol")
+        sys.modules["mainnn"].diario.cerrar()
+
+    cliente_falso(args, RedFalsa(latencia=args.latencia, limite_global=args.limite_global), guion)
+    entrada.main()
+    print(json.dumps(arranque.ETAPAS))
+
+
+def mediana(etapas: List[Dict[str, float]]) -> Dict[str, float]:
+    nombres = [n for n in etapas[0] if all(n in e for e in etapas)]
+    return {n: round(statistics.median(e[n] for e in etapas), 4) for n in nombres}
+
+
+def mostrar(resultado: Dict[str, float], anterior: Optional[Dict] = None):
+    for etapa, segundos in resultado.items():
+        texto = f"{etapa:<24}{segundos:.3f} s"
+        if anterior and anterior.get(etapa):
+            texto += f"  ({(segundos - anterior[etapa]) / anterior[etapa]:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=2000, help="partidas guardadas que restaurar")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--gateway", type=float, default=0.3, help="segundos desde iniciar sesión hasta READY")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--limite-global", type=int, default=50, help="peticiones por segundo")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    parser.add_argument("--directorio", help=argparse.SUPPRESS)
+    parser.add_argument("--fase", choices=("preparar", "hijo"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.fase is not None:
+        os.environ.update({
+            "DIARIO_PARTIDAS": os.path.join(args.directorio, "partidas.db"),
+            "ESTADISTICAS": os.path.join(args.directorio, "estadisticas.db"),
+            "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+            "MAX_PARTIDAS": str(max(1000, args.partidas * 2)),
+            "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+        })
+        os.environ.setdefault("LOG_NIVEL", "ERROR")
+        os.environ.pop("METRICAS_PUERTO", None)
+        if args.fase == "preparar":
+            print(f"Partidas guardadas: {asyncio.run(preparar(args))}")
+        else:
+            hijo(args)
+        return 0
+
+    # Cada arranque en un proceso nuevo: si no, los imports ya estarían hechos
+    directorio = tempfile.mkdtemp(prefix="arranque-")
+    comando = [sys.executable, os.path.abspath(__file__), "--directorio", directorio] + (argv or sys.argv[1:])
+    subprocess.run(comando + ["--fase", "preparar"], check=True)
+    etapas = []
+    for _ in range(args.repeticiones):
+        salida = subprocess.run(comando + ["--fase", "hijo"], check=True, capture_output=True, text=True)
+        etapas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+    resultado = mediana(etapas)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Marcas de tiempo del arranque, desde que se importa este módulo.
+
+main.py lo importa antes que nada (antes que discord.py), así que las
+marcas cuentan también lo que tardan los imports. Cada etapa se anota una
+sola vez; mainnn las expone como la métrica mafia_arranque_segundos y la
+última, "primer_comando", es el tiempo hasta atender el primer comando.
+No importa nada del bot para poder ser lo primero.
+"""
+import logging
+import time
+from typing import Dict
+
+log = logging.getLogger(__name__)
+
+INICIO = time.monotonic()
+ETAPAS: Dict[str, float] = {}  # {etapa: segundos desde INICIO}
+
+
+def marcar(etapa: str):
+    """Anota cuánto se tardó en llegar a `etapa` (solo la primera vez)"""
+    if etapa not in ETAPAS:
+        ETAPAS[etapa] = segundos = time.monotonic() - INICIO
+        log.info("Arranque: %s a los %.3f s", etapa, segundos)
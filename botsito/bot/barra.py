@@ -0,0 +1,94 @@
+"""Comandos de barra (/mafia crear, /matar...) sobre los mismos manejadores del router.
+
+Con MODO_INTERACCION=barra el bot no necesita leer los mensajes del
+servidor ni abrir DMs: cada comando llega como interacción y lo privado
+(rol, instrucciones, confirmaciones) se contesta con una respuesta
+efímera, en la misma petición HTTP que responde a la interacción.
+"""
+import logging
+from typing import Optional
+
+import discord
+from discord import app_commands
+
+from bot.commands import Router
+
+log = logging.getLogger(__name__)
+
+
+def registrar_comandos_barra(client: discord.Client, router: Router) -> app_commands.CommandTree:
+    """Crea el árbol de comandos de barra; cada uno despacha al comando de texto equivalente"""
+    arbol = app_commands.CommandTree(client)
+    mafia = app_commands.Group(name="mafia", description="Partidas de Mafia")
+
+    @mafia.command(name="crear", description="Crea una partida en este canal")
+    @app_commands.describe(jugadores="Número de jugadores")
+    async def crear(interaccion: discord.Interaction, jugadores: int):
+        await router.despachar_interaccion(interaccion, "!mafia crear", [str(jugadores)])
+
+    @mafia.command(name="unirme", description="Únete a la partida de este canal")
+    async def unirme(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!mafia unirme", [])
+
+    @mafia.command(name="buscar", description="Busca partida con jugadores de cualquier canal del servidor")
+    @app_commands.describe(jugadores="Número de jugadores que prefieres", idioma="Idioma de la partida (p. ej. es)")
+    async def buscar(interaccion: discord.Interaction, jugadores: Optional[int] = None, idioma: Optional[str] = None):
+        args = [str(valor) for valor in (jugadores, idioma) if valor is not None]
+        await router.despachar_interaccion(interaccion, "!mafia buscar", args)
+
+    @mafia.command(name="cancelar", description="Sal de la cola de emparejamiento")
+    async def cancelar(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!mafia cancelar", [])
+
+    @mafia.command(name="reanudar", description="Reanuda la partida guardada de este canal")
+    async def reanudar(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!mafia reanudar", [])
+
+    @mafia.command(name="rol", description="Muestra (solo a ti) tu rol y lo que puedes hacer ahora")
+    async def rol(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!mafia rol", [])
+
+    @mafia.command(name="stats", description="Tus estadísticas (o las de otro jugador)")
+    @app_commands.describe(jugador="Jugador del que ver las estadísticas")
+    async def stats(interaccion: discord.Interaction, jugador: Optional[discord.User] = None):
+        await router.despachar_interaccion(interaccion, "!mafia stats", [jugador.mention] if jugador else [])
+
+    @mafia.command(name="ranking", description="Los jugadores con más victorias")
+    async def ranking(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!mafia ranking", [])
+
+    arbol.add_command(mafia)
+
+    # Comandos de un jugador contra otro: el texto se interpreta igual que en `!matar Nombre`
+    def con_objetivo(nombre: str, descripcion: str):
+        @arbol.command(name=nombre, description=descripcion)
+        @app_commands.describe(jugador="Nombre o mención del jugador")
+        async def comando(interaccion: discord.Interaction, jugador: str):
+            await router.despachar_interaccion(interaccion, f"!{nombre}", jugador.split())
+
+    con_objetivo("matar", "Mafia: vota a quién eliminar esta noche")
+    con_objetivo("proteger", "Doctor: protege a un jugador esta noche")
+    con_objetivo("investigar", "Detective: descubre el rol de un jugador")
+    con_objetivo("votar", "Vota a quién linchar")
+
+    @arbol.command(name="siguiente", description="Pasa a la siguiente fase (administradores)")
+    @app_commands.default_permissions(administrator=True)
+    async def siguiente(interaccion: discord.Interaction):
+        await router.despachar_interaccion(interaccion, "!siguiente", [])
+
+    @arbol.command(name="perfil", description="Guarda un perfil del bot para analizarlo (administradores)")
+    @app_commands.describe(segundos="Duración de la captura")
+    @app_commands.default_permissions(administrator=True)
+    async def perfil(interaccion: discord.Interaction, segundos: int = 10):
+        await router.despachar_interaccion(interaccion, "!mafia perfil", [str(segundos)])
+
+    return arbol
+
+
+async def sincronizar(arbol: app_commands.CommandTree):
+    """Publica los comandos en Discord (una vez por arranque: Discord limita cuántas veces)"""
+    try:
+        comandos = await arbol.sync()
+        log.info("Comandos de barra sincronizados: %d", len(comandos))
+    except discord.HTTPException:
+        log.exception("No se pudieron sincronizar los comandos de barra")
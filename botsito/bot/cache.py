@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+import discord
+
+from bot.metricas import medir_api
+
+MAX_ENTRADAS = 5000
+TTL_SEGUNDOS = 3600  # Una partida rara vez dura más de una hora
+CONCURRENCIA_PRECALENTAR = 2  # Peticiones REST a la vez al precalentar (el límite global es de 50/s)
+
+
+class CacheLRU:
+    """Diccionario con tamaño máximo (LRU) y caducidad por entrada (TTL)"""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, ttl: float = TTL_SEGUNDOS,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.reloj = reloj
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+
+        valor, caduca = entrada
+        if caduca < self.reloj():
+            del self._datos[clave]
+            self.fallos += 1
+            return None
+
+        self._datos.move_to_end(clave)
+        self.aciertos += 1
+        return valor
+
+    def guardar(self, clave: Hashable, valor: Any):
+        self._datos[clave] = (valor, self.reloj() + self.ttl)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+
+    def invalidar(self, clave: Hashable):
+        self._datos.pop(clave, None)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheEntidades:
+    """Resuelve usuarios, canales privados y canales de texto una sola vez.
+
+    Primero se consulta la caché del gateway de discord.py y solo si falla
+    se hace la petición REST correspondiente.
+    """
+
+    def __init__(self, client: discord.Client, max_entradas: int = MAX_ENTRADAS,
+                 ttl: float = TTL_SEGUNDOS):
+        self.client = client
+        self.usuarios = CacheLRU(max_entradas, ttl)
+        self.privados = CacheLRU(max_entradas, ttl)
+        self.canales = CacheLRU(max_entradas, ttl)
+        self.peticiones_rest = 0
+
+    async def obtener_usuario(self, usuario_id: str) -> discord.User:
+        usuario = self.usuarios.obtener(usuario_id)
+        if usuario is None:
+            usuario = self.client.get_user(int(usuario_id))
+            if usuario is None:
+                self.peticiones_rest += 1
+                with medir_api("fetch_user"):
+                    usuario = await self.client.fetch_user(int(usuario_id))
+            self.usuarios.guardar(usuario_id, usuario)
+        return usuario
+
+    async def obtener_canal_privado(self, usuario_id: str) -> discord.DMChannel:
+        canal = self.privados.obtener(usuario_id)
+        if canal is None:
+            usuario = await self.obtener_usuario(usuario_id)
+            canal = usuario.dm_channel
+            if canal is None:
+                self.peticiones_rest += 1
+                with medir_api("create_dm"):
+                    canal = await usuario.create_dm()
+            self.privados.guardar(usuario_id, canal)
+        return canal
+
+    async def obtener_canal(self, canal_id: str):
+        canal = self.canales.obtener(canal_id)
+        if canal is None:
+            canal = self.client.get_channel(int(canal_id))
+            if canal is None:
+                self.peticiones_rest += 1
+                with medir_api("fetch_channel"):
+                    canal = await self.client.fetch_channel(int(canal_id))
+            self.canales.guardar(canal_id, canal)
+        return canal
+
+    def recordar_usuario(self, usuario: discord.abc.User):
+        """Guarda un usuario que ya tenemos (p. ej. el autor de un mensaje) sin pedirlo por REST"""
+        usuario_id = str(usuario.id)
+        self.usuarios.guardar(usuario_id, usuario)
+        if usuario.dm_channel is not None:
+            self.privados.guardar(usuario_id, usuario.dm_channel)
+
+    async def precalentar(self, canales: Iterable[str], privados: Iterable[str],
+                          concurrencia: int = CONCURRENCIA_PRECALENTAR) -> int:
+        """Resuelve de antemano canales y DMs que se van a usar; devuelve cuántos fallaron.
+
+        Pocos a la vez para no gastar el límite de la API que necesitan los
+        comandos, y no más DMs de los que caben: los primeros se perderían.
+        Los fallos se ignoran: se reintentan cuando se usen.
+        """
+        privados = islice(privados, self.privados.max_entradas)
+        pendientes = iter([(self.obtener_canal, canal_id) for canal_id in canales] +
+                          [(self.obtener_canal_privado, usuario_id) for usuario_id in privados])
+        fallos = 0
+
+        async def trabajar():
+            nonlocal fallos
+            for obtener, clave in pendientes:  # El iterador es compartido: cada uno coge el siguiente
+                try:
+                    await obtener(clave)
+                except discord.HTTPException:
+                    fallos += 1
+
+        await asyncio.gather(*(trabajar() for _ in range(concurrencia)))
+        return fallos
+
+    def invalidar_usuario(self, usuario_id: str):
+        self.usuarios.invalidar(usuario_id)
+        self.privados.invalidar(usuario_id)
+
+    def invalidar_canal(self, canal_id: str):
+        self.canales.invalidar(canal_id)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores de aciertos/fallos para diagnosticar el tráfico REST"""
+        return {
+            "usuarios_aciertos": self.usuarios.aciertos,
+            "usuarios_fallos": self.usuarios.fallos,
+            "privados_aciertos": self.privados.aciertos,
+            "privados_fallos": self.privados.fallos,
+            "canales_aciertos": self.canales.aciertos,
+            "canales_fallos": self.canales.fallos,
+            "peticiones_rest": self.peticiones_rest,
+        }
@@ -1,12 +1,81 @@
+import os
+from typing import Callable, List, Optional
+
 import discord
 from discord import Intents
 
-def setup_client():
-    intents = Intents.default()
-    intents.message_content = True
-    intents.messages = True
+PERFILES = ("ligero", "completo", "interacciones")
+
+# carga.py la apunta a un cliente falso (bot/falso.py) antes de importar mainnn
+fabrica_cliente: Optional[Callable[..., discord.Client]] = None
+
+def shards_configurados():
+    """Lee SHARD_COUNT y SHARD_IDS (p. ej. "0,1,2") del entorno"""
+    total = os.getenv('SHARD_COUNT')
+    ids = os.getenv('SHARD_IDS')
+    shard_count = int(total) if total else None
+    shard_ids = [int(i) for i in ids.split(',')] if ids else None
+    return shard_ids, shard_count
+
+def perfil_configurado() -> str:
+    """Lee PERFIL_CLIENTE del entorno ("ligero" si no está)"""
+    return os.getenv('PERFIL_CLIENTE') or "ligero"
+
+def intents_del_perfil(perfil: str) -> Intents:
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de cliente desconocido: {perfil!r} (usa {', '.join(PERFILES)})")
+
+    if perfil == "completo":
+        intents = Intents.default()
+        intents.message_content = True
+        intents.messages = True
+        intents.dm_messages = True
+        intents.members = True
+        return intents
+
+    intents = Intents.none()
+    intents.guilds = True
+    if perfil == "interacciones":
+        # Con comandos de barra no hace falta recibir ningún mensaje
+        return intents
+
+    # Solo lo que usa el juego: canales y permisos del servidor, mensajes y DMs
+    intents.guild_messages = True
     intents.dm_messages = True
-    intents.members = True
-    
-    client = discord.Client(intents=intents)
-    return client
\ No newline at end of file
+    intents.message_content = True
+    return intents
+
+def setup_client(shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+                 perfil: Optional[str] = None):
+    """Crea el cliente según el perfil: "ligero" (por defecto), "completo" o "interacciones".
+
+    El perfil ligero no pide la lista de miembros de cada servidor al
+    conectar ni la guarda en memoria, ni guarda los últimos mensajes: de los
+    miembros solo interesan los jugadores, que se recuerdan al unirse a una
+    partida (CacheEntidades.recordar_usuario). "interacciones" es igual pero
+    sin recibir mensajes, para usar solo comandos de barra (bot/barra.py).
+
+    Sin el intent de miembros tampoco llega on_member_remove (bot/events.py
+    solo lo registra en el perfil completo): quien deja el servidor caduca
+    de CacheEntidades por TTL y la partida que abandona la cierra el barrido
+    de inactividad (TTL_SALA / TTL_PARTIDA en mainnn.py).
+    """
+    perfil = perfil or perfil_configurado()
+    opciones = {"intents": intents_del_perfil(perfil)}
+    if perfil != "completo":
+        opciones["chunk_guilds_at_startup"] = False
+        opciones["member_cache_flags"] = discord.MemberCacheFlags.none()
+        opciones["max_messages"] = None
+
+    if fabrica_cliente is not None:
+        return fabrica_cliente(**opciones)
+
+    if shard_ids is None and shard_count is None:
+        shard_ids, shard_count = shards_configurados()
+
+    # Con shards, un solo proceso mantiene varias conexiones al gateway
+    if shard_count is not None:
+        return discord.AutoShardedClient(shard_ids=shard_ids, shard_count=shard_count, **opciones)
+
+    client = discord.Client(**opciones)
+    return client
@@ -0,0 +1,241 @@
+import asyncio
+from enum import Enum, auto
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Tuple
+
+import discord
+
+from bot import arranque
+from bot.metricas import LATENCIA_COMANDOS
+from game.actores import Actores, BuzonLleno
+
+PREFIJO = "!"
+# Respuesta a un comando de barra que no se pudo usar (sin ella se queda "pensando")
+RECHAZO_INTERACCION = "❌ Ahora no puedes usar este comando."
+
+
+class Ambito(Enum):
+    CUALQUIERA = auto()
+    PRIVADO = auto()   # Solo por DM
+    SERVIDOR = auto()  # Solo en un canal del servidor
+
+
+# (destino, contenido) -> envía el mensaje; por defecto destino.send
+Enviar = Callable[[discord.abc.Messageable, str], Awaitable[Any]]
+
+
+async def _enviar_directo(destino: discord.abc.Messageable, contenido: str):
+    await destino.send(contenido)
+
+
+class Contexto:
+    """Todo lo que un manejador necesita saber del comando recibido.
+
+    Viene de un mensaje (`mensaje`) o de un comando de barra (`interaccion`);
+    los manejadores solo usan `autor`, `canal` y `responder`, así sirven
+    para los dos. En una interacción las respuestas se juntan y salen juntas
+    al terminar, en la propia respuesta o, si hubo que diferirla, en un solo
+    followup (efímeras si el comando es privado).
+    """
+    __slots__ = ("mensaje", "interaccion", "autor", "canal", "args", "es_privado",
+                 "autor_id", "canal_id", "partida", "jugador", "enviar", "respuestas")
+
+    def __init__(self, autor: discord.abc.User, canal: discord.abc.Messageable, args: List[str],
+                 es_privado: bool, enviar: Enviar = _enviar_directo,
+                 mensaje: Optional[discord.Message] = None,
+                 interaccion: Optional[discord.Interaction] = None):
+        self.enviar = enviar
+        self.mensaje = mensaje
+        self.interaccion = interaccion
+        self.autor = autor
+        self.canal = canal
+        self.args = args
+        self.es_privado = es_privado
+        self.autor_id = str(autor.id)
+        self.canal_id: Optional[str] = None  # Canal de la partida (en un DM no es `canal`)
+        self.partida: Optional[Dict] = None
+        self.jugador: Any = None
+        self.respuestas: List[str] = []  # Solo con interacción: se envían al terminar
+
+    @property
+    def texto(self) -> str:
+        """Argumentos unidos de nuevo en un solo texto (p. ej. un nombre con espacios)"""
+        return " ".join(self.args)
+
+    async def responder(self, contenido: str):
+        if self.interaccion is None:
+            await self.enviar(self.canal, contenido)
+        else:
+            self.respuestas.append(contenido)
+
+    async def diferir(self):
+        """Difiere la interacción (si no lo está ya): Discord da 3 s para contestarla"""
+        if not self.interaccion.response.is_done():
+            await self.interaccion.response.defer(ephemeral=self.es_privado)
+
+    async def enviar_respuestas(self):
+        """Contesta a la interacción con todo lo acumulado, en una sola llamada.
+
+        Si aún no se ha contestado va en la propia respuesta; si ya se
+        difirió (porque el comando tuvo que esperar), por el followup.
+        """
+        if not self.respuestas:
+            return
+        contenido = "\n".join(self.respuestas)
+        self.respuestas = []
+        if not self.interaccion.response.is_done():
+            # Va en la propia respuesta HTTP a la interacción
+            await self.interaccion.response.send_message(contenido, ephemeral=self.es_privado)
+        else:
+            await self.interaccion.followup.send(contenido, ephemeral=self.es_privado)
+
+
+Manejador = Callable[[Contexto], Awaitable[None]]
+# (autor_id, canal_id, es_privado) -> (canal_id de la partida, partida, jugador)
+ResolverPartida = Callable[[str, str, bool], Tuple[Optional[str], Optional[Dict], Any]]
+
+
+class Comando:
+    __slots__ = ("nombre", "manejador", "ambito", "fases", "roles", "admin", "en_partida")
+
+    def __init__(self, nombre: str, manejador: Manejador, ambito: Ambito,
+                 fases: Optional[Collection], roles: Optional[Collection],
+                 admin: bool, en_partida: bool):
+        self.nombre = nombre
+        self.manejador = manejador
+        self.ambito = ambito
+        self.fases = fases
+        self.roles = roles
+        self.admin = admin
+        # Pedir fase o rol implica que el comando se usa dentro de una partida
+        self.en_partida = en_partida or fases is not None or roles is not None
+
+
+class Router:
+    """Tabla de comandos: una comprobación para descartar, un dict para despachar.
+
+    Los comandos pueden tener dos palabras (`!mafia crear`); en ese caso se
+    busca primero la pareja y luego la primera palabra sola.
+    """
+
+    def __init__(self, resolver_partida: ResolverPartida, prefijo: str = PREFIJO,
+                 enviar: Enviar = _enviar_directo, actores: Optional[Actores] = None):
+        self.prefijo = prefijo
+        self.resolver_partida = resolver_partida
+        self.enviar = enviar
+        # Con actores, lo que toca una partida se ejecuta en el turno de esa partida
+        self.actores = actores
+        self.comandos: Dict[str, Comando] = {}
+        # Si se indica, los comandos esperan a que esté puesto (p. ej. a que se restauren las partidas)
+        self.preparado: Optional[asyncio.Event] = None
+
+    def comando(self, nombre: str, ambito: Ambito = Ambito.CUALQUIERA,
+                fases: Optional[Collection] = None, roles: Optional[Collection] = None,
+                admin: bool = False, en_partida: bool = False):
+        """Decorador que registra un manejador para `nombre`"""
+        def registrar(manejador: Manejador) -> Manejador:
+            clave = nombre.lower()
+            self.comandos[clave] = Comando(clave, manejador, ambito, fases, roles, admin, en_partida)
+            return manejador
+        return registrar
+
+    def _buscar(self, partes: List[str]) -> Tuple[Optional[Comando], List[str]]:
+        nombre = partes[0].lower()
+        if len(partes) > 1:
+            comando = self.comandos.get(f"{nombre} {partes[1].lower()}")
+            if comando:
+                return comando, partes[2:]
+        return self.comandos.get(nombre), partes[1:]
+
+    async def despachar(self, mensaje: discord.Message) -> bool:
+        """Ejecuta el comando del mensaje; devuelve False si no era para nosotros"""
+        contenido = mensaje.content
+        if not contenido.startswith(self.prefijo):
+            return False
+
+        comando, args = self._buscar(contenido.split())
+        if comando is None:
+            return False
+        if self.preparado is not None and not self.preparado.is_set():
+            await self.preparado.wait()
+
+        ctx = Contexto(mensaje.author, mensaje.channel, args, mensaje.guild is None,
+                       self.enviar, mensaje=mensaje)
+        return await self._ejecutar(comando, ctx)
+
+    async def despachar_interaccion(self, interaccion: discord.Interaction, nombre: str,
+                                    args: List[str]) -> bool:
+        """Ejecuta un comando de barra con el mismo manejador que su versión de texto"""
+        comando = self.comandos[nombre]
+        # Las respuestas efímeras hacen de DM: los comandos privados valen en cualquier canal
+        es_privado = comando.ambito == Ambito.PRIVADO or interaccion.guild is None
+        ctx = Contexto(interaccion.user, interaccion.channel, args, es_privado,
+                       self.enviar, interaccion=interaccion)
+        # Solo se difiere si el comando tiene que esperar (aquí o en el turno de su partida,
+        # ver _ejecutar); si no, contesta en la propia respuesta: una sola llamada HTTP
+        if self.preparado is not None and not self.preparado.is_set():
+            await ctx.diferir()
+            await self.preparado.wait()
+        ejecutado = await self._ejecutar(comando, ctx)
+        if ctx.respuestas:
+            await ctx.enviar_respuestas()
+        elif interaccion.response.is_done():
+            # Una interacción diferida se queda "pensando" hasta recibir un followup
+            await interaccion.followup.send(RECHAZO_INTERACCION, ephemeral=True)
+        else:
+            await interaccion.response.send_message(RECHAZO_INTERACCION, ephemeral=True)
+        return ejecutado
+
+    async def _ejecutar(self, comando: Comando, ctx: Contexto) -> bool:
+        """Comprueba ámbito y permisos y pasa el comando al actor de su partida"""
+        es_privado = ctx.es_privado
+        if comando.ambito == Ambito.PRIVADO and not es_privado:
+            return False
+        if comando.ambito == Ambito.SERVIDOR and es_privado:
+            return False
+        if comando.admin:
+            permisos = getattr(ctx.autor, "guild_permissions", None)
+            if not (permisos and permisos.administrator):
+                return False
+
+        clave = self._clave_partida(comando, ctx)
+        if self.actores is None or clave is None:
+            return await self._en_turno(comando, ctx)
+        if ctx.interaccion is not None and self.actores.ocupado(clave):
+            await ctx.diferir()  # Le toca esperar turno: puede pasar de los 3 s
+        try:
+            return await self.actores.ejecutar(clave, lambda: self._en_turno(comando, ctx),
+                                               descripcion=comando.nombre)
+        except BuzonLleno:
+            await ctx.responder("⏳ La partida está muy ocupada. Inténtalo de nuevo en unos segundos.")
+            return True
+
+    def _clave_partida(self, comando: Comando, ctx: Contexto) -> Optional[str]:
+        """Canal de la partida a la que afecta el comando (None si no afecta a ninguna)"""
+        if comando.en_partida:
+            return self.resolver_partida(ctx.autor_id, str(ctx.canal.id), ctx.es_privado)[0]
+        return None if ctx.es_privado else str(ctx.canal.id)
+
+    async def _en_turno(self, comando: Comando, ctx: Contexto) -> bool:
+        """Comprueba fase y rol con el estado ya estable y llama al manejador"""
+        es_privado = ctx.es_privado
+        if comando.en_partida:
+            ctx.canal_id, ctx.partida, ctx.jugador = self.resolver_partida(
+                ctx.autor_id, str(ctx.canal.id), es_privado)
+            if ctx.partida is None:
+                if es_privado:
+                    await ctx.responder("⚠️ No estás en una partida activa.")
+                return False
+            # Las acciones de la partida (con fase o rol) no son para los eliminados, sea cual sea la fase
+            acciona = comando.fases is not None or comando.roles is not None
+            if acciona and es_privado and ctx.jugador is not None and not ctx.jugador.vivo:
+                await ctx.responder("💀 Ya has sido eliminado de la partida.")
+                return False
+            if comando.fases is not None and ctx.partida["estado"] not in comando.fases:
+                return False
+            if comando.roles is not None and (ctx.jugador is None or ctx.jugador.rol not in comando.roles):
+                return False
+
+        with LATENCIA_COMANDOS.medir(comando.nombre):
+            await comando.manejador(ctx)
+        arranque.marcar("primer_comando")
+        return True
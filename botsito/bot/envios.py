@@ -0,0 +1,122 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from bot.metricas import DURACION_ENVIOS_PRIVADOS, medir_api
+
+# Discord limita a ~50 peticiones por segundo a nivel global; cada DM va a
+# su propio bucket (POST /channels/{dm_id}/messages). El semáforo acota las
+# peticiones en vuelo por el límite global; los 429 de un bucket solo frenan
+# a ese DM (ver EsperasPorRuta).
+MAX_CONCURRENTES = 10
+MAX_INTENTOS = 4
+ESPERA_BASE = 0.5  # segundos, se duplica en cada reintento
+MAX_RUTAS = 10000  # Rutas frenadas que se recuerdan antes de limpiar las ya vencidas
+
+ObtenerDestino = Callable[[str], Awaitable[discord.abc.Messageable]]
+
+
+def espera_reintento(error: Exception, intento: int) -> float:
+    """Calcula cuánto esperar antes de reintentar un envío fallido"""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        respuesta = getattr(error, "response", None)
+        cabeceras = getattr(respuesta, "headers", None) or {}
+        retry_after = cabeceras.get("Retry-After")
+    if retry_after is not None:
+        return float(retry_after)
+    return ESPERA_BASE * (2 ** intento) + random.uniform(0, ESPERA_BASE)
+
+
+def es_limite_global(error: Exception) -> bool:
+    """Si el 429 es del límite global de la API y no del bucket de la ruta"""
+    cabeceras = getattr(getattr(error, "response", None), "headers", None) or {}
+    return str(cabeceras.get("X-RateLimit-Global", "")).lower() == "true"
+
+
+class EsperasPorRuta:
+    """Hasta cuándo no se debe volver a usar cada ruta tras un 429.
+
+    Un 429 de un DM solo frena los envíos a ese jugador, también los de
+    lotes posteriores (p. ej. las instrucciones de la noche tras el rol),
+    que así esperan en vez de gastar otra petición en un 429 seguro. Un
+    429 del límite global frena todas las rutas.
+    """
+
+    def __init__(self):
+        self._hasta: Dict[str, float] = {}  # {ruta: instante del bucle}
+        self._global = 0.0
+
+    def frenar(self, ruta: str, segundos: float, global_: bool = False):
+        ahora = asyncio.get_running_loop().time()
+        hasta = ahora + segundos
+        if global_:
+            self._global = max(self._global, hasta)
+            return
+        if len(self._hasta) >= MAX_RUTAS:
+            self._hasta = {r: h for r, h in self._hasta.items() if h > ahora}
+        self._hasta[ruta] = max(self._hasta.get(ruta, 0.0), hasta)
+
+    async def esperar(self, ruta: str):
+        """Espera a que la ruta (y el límite global) se puedan volver a usar"""
+        bucle = asyncio.get_running_loop()
+        while True:
+            ahora = bucle.time()
+            hasta = max(self._hasta.get(ruta, 0.0), self._global)
+            if hasta <= ahora:
+                self._hasta.pop(ruta, None)
+                return
+            await asyncio.sleep(hasta - ahora)
+
+
+async def _enviar_privado(obtener_destino: ObtenerDestino, jugador_id: str, contenido: str,
+                          limite: asyncio.Semaphore, esperas: EsperasPorRuta) -> bool:
+    """Envía un DM a un jugador, reintentando 429 y errores transitorios"""
+    for intento in range(MAX_INTENTOS):
+        await esperas.esperar(jugador_id)
+        async with limite:
+            try:
+                destino = await obtener_destino(jugador_id)
+                with medir_api("send"):
+                    await destino.send(contenido)
+                return True
+            except (discord.Forbidden, discord.NotFound):
+                # DMs cerrados o usuario inexistente: reintentar no sirve de nada
+                return False
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    return False
+                error = e
+            except (OSError, asyncio.TimeoutError) as e:
+                error = e
+        # Esperamos fuera del semáforo para no frenar al resto de envíos
+        espera = espera_reintento(error, intento)
+        if getattr(error, "status", None) == 429:
+            # También tras el último intento: el próximo lote a este DM lo respetará
+            esperas.frenar(jugador_id, espera, es_limite_global(error))
+        elif intento + 1 < MAX_INTENTOS:
+            await asyncio.sleep(espera)
+    return False
+
+
+async def enviar_privados(obtener_destino: ObtenerDestino, mensajes: Dict[str, str],
+                          max_concurrentes: int = MAX_CONCURRENTES,
+                          esperas: Optional[EsperasPorRuta] = None) -> List[str]:
+    """Envía en paralelo un DM por jugador y devuelve los ids que no se pudieron alcanzar.
+
+    Con `esperas` compartidas entre lotes, un lote respeta los 429 que recibieron los anteriores.
+    """
+    if not mensajes:
+        return []
+
+    esperas = esperas if esperas is not None else EsperasPorRuta()
+    limite = asyncio.Semaphore(max_concurrentes)
+    ids = list(mensajes)
+    with DURACION_ENVIOS_PRIVADOS.medir():
+        resultados = await asyncio.gather(*(
+            _enviar_privado(obtener_destino, jugador_id, mensajes[jugador_id], limite, esperas)
+            for jugador_id in ids
+        ))
+    return [jugador_id for jugador_id, ok in zip(ids, resultados) if not ok]
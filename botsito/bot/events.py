@@ -0,0 +1,61 @@
+import logging
+from typing import Awaitable, Callable, Optional
+
+import discord
+
+from bot.cache import CacheEntidades
+from bot.commands import Router
+
+
+log = logging.getLogger(__name__)
+
+
+def registrar_eventos(client: discord.Client, router: Router, cache: CacheEntidades,
+                      al_conectar: Optional[Callable[[], Awaitable[None]]] = None,
+                      desviar: Optional[Callable[[discord.Message], bool]] = None):
+    """Conecta los eventos del gateway con el router de comandos y la caché"""
+
+    @client.event
+    async def on_ready():
+        log.info("Bot conectado como %s", client.user)
+        if al_conectar is not None:
+            await al_conectar()
+
+    @client.event
+    async def on_message(message):
+        contenido = message.content
+        # La gran mayoría de mensajes no son comandos: se descartan con una sola comprobación
+        if not contenido.startswith(router.prefijo):
+            # Comando básico de prueba
+            if len(contenido) == 4 and contenido.lower() == 'hola' and message.author != client.user:
+                await message.channel.send('¡Hola! Soy un bot de Mafia. 🤖')
+            return
+
+        if message.author == client.user:
+            return
+
+        # Con varios procesos, un DM puede pertenecer a una partida de otro proceso
+        if desviar is not None and desviar(message):
+            return
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Comando recibido: %r", contenido,
+                      extra={"usuario_id": str(message.author.id), "canal_id": str(message.channel.id)})
+        await router.despachar(message)
+
+    # Solo llega con el intent de miembros (perfil "completo"); sin él, quien se va
+    # del servidor caduca de la caché (TTL) y su partida la cierra el barrido de inactividad
+    if client.intents.members:
+        @client.event
+        async def on_member_remove(member):
+            cache.invalidar_usuario(str(member.id))
+
+    @client.event
+    async def on_guild_channel_delete(channel):
+        cache.invalidar_canal(str(channel.id))
+
+    @client.event
+    async def on_private_channel_delete(channel):
+        cache.invalidar_canal(str(channel.id))
+        if channel.recipient:
+            cache.invalidar_usuario(str(channel.recipient.id))
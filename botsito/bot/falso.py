@@ -0,0 +1,318 @@
+"""Discord falso en el mismo proceso, para medir el bot sin red (ver carga.py).
+
+RedFalsa hace de API REST: cada llamada espera una latencia configurable,
+respeta un límite global y otro por destino como haría discord.py (espera
+en vez de fallar, y cuenta cuántas veces tuvo que esperar) o, con
+`responder_429`, como la API sin discord.py delante (devuelve un 429 con
+Retry-After), y puede fallar con un 500 o con DMs cerrados. ClienteFalso ocupa el lugar de
+discord.Client y entrega los mensajes como lo hace el gateway; InteraccionFalsa, el de
+una interacción de un comando de barra.
+"""
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+
+class _RespuestaFalsa:
+    """Lo que las excepciones de discord.py leen de una respuesta HTTP"""
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+        self.headers: Dict[str, str] = {}
+
+
+class Cubo:
+    """Límite de peticiones (capacidad por periodo) que reserva turno en orden de llegada"""
+
+    def __init__(self, capacidad: int, periodo: float, reloj: Callable[[], float] = time.monotonic):
+        self.capacidad = capacidad
+        self.periodo = periodo
+        self.reloj = reloj
+        self._fichas = float(capacidad)
+        self._ultimo = reloj()
+
+    def reservar(self) -> float:
+        """Gasta una ficha y devuelve cuánto hay que esperar a que exista"""
+        ahora = self.reloj()
+        recarga = (ahora - self._ultimo) * self.capacidad / self.periodo
+        self._fichas = min(float(self.capacidad), self._fichas + recarga)
+        self._ultimo = ahora
+        self._fichas -= 1
+        return 0.0 if self._fichas >= 0 else -self._fichas * self.periodo / self.capacidad
+
+    def devolver(self):
+        """Devuelve la ficha de una petición que al final no se hizo"""
+        self._fichas = min(float(self.capacidad), self._fichas + 1)
+
+
+class RedFalsa:
+    """API REST simulada: latencia, límites de Discord y fallos, con contadores por ruta"""
+
+    def __init__(self, latencia: float = 0.05, limite_global: int = 50, limite_destino: int = 5,
+                 periodo_destino: float = 5.0, prob_fallo: float = 0.0, dm_cerrados: float = 0.0,
+                 responder_429: bool = False, semilla: int = 0,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.latencia = latencia
+        self.reloj = reloj  # El de los límites; en las pruebas, el del bucle con reloj virtual
+        self.responder_429 = responder_429
+        self.prob_fallo = prob_fallo
+        self.dm_cerrados = dm_cerrados
+        self.azar = random.Random(semilla)
+        self.llamadas: Counter = Counter()   # {ruta: peticiones}
+        self.limitadas: Counter = Counter()  # {ruta: peticiones que esperaron por el límite o recibieron un 429}
+        self.fallidas: Counter = Counter()   # {ruta: peticiones que devolvieron error}
+        self.entregados: List[Tuple[int, str]] = []  # [(destino_id, contenido)]
+        self.guardar_entregados = False
+        self._global = Cubo(limite_global, 1.0, reloj)
+        self._limite_destino = (limite_destino, periodo_destino)
+        self._por_destino: Dict[int, Cubo] = {}
+        self.usuarios: Dict[int, "UsuarioFalso"] = {}
+        self.canales: Dict[int, "CanalFalso"] = {}
+
+    async def llamar(self, ruta: str, destino: Optional[int] = None, con_limite_global: bool = True):
+        """Una petición REST: espera su turno y la latencia, y falla si toca.
+
+        Las respuestas a interacciones no cuentan para el límite global de
+        Discord (`con_limite_global=False`).
+        """
+        self.llamadas[ruta] += 1
+        cubos = [self._global] if con_limite_global else []
+        if destino is not None:
+            cubo = self._por_destino.get(destino)
+            if cubo is None:
+                cubo = self._por_destino[destino] = Cubo(*self._limite_destino, self.reloj)
+            cubos.append(cubo)
+        espera = max([cubo.reservar() for cubo in cubos], default=0.0)
+        if espera > 0:
+            self.limitadas[ruta] += 1
+            if self.responder_429:
+                for cubo in cubos:
+                    cubo.devolver()
+                await asyncio.sleep(self.latencia * self.azar.uniform(0.5, 1.5))
+                respuesta = _RespuestaFalsa(429, "Too Many Requests")
+                respuesta.headers["Retry-After"] = f"{espera:.3f}"
+                raise discord.HTTPException(respuesta, "You are being rate limited.")
+        await asyncio.sleep(espera + self.latencia * self.azar.uniform(0.5, 1.5))
+        if self.prob_fallo and self.azar.random() < self.prob_fallo:
+            self.fallidas[ruta] += 1
+            raise discord.HTTPException(_RespuestaFalsa(500, "Internal Server Error"), "fallo simulado")
+
+    def usuario(self, usuario_id: int, nombre: Optional[str] = None, admin: bool = False) -> "UsuarioFalso":
+        usuario = self.usuarios.get(usuario_id)
+        if usuario is None:
+            usuario = self.usuarios[usuario_id] = UsuarioFalso(self, usuario_id, nombre or f"J{usuario_id}", admin)
+        return usuario
+
+    def canal(self, canal_id: int, servidor_id: int = 0) -> "CanalFalso":
+        canal = self.canales.get(canal_id)
+        if canal is None:
+            canal = self.canales[canal_id] = CanalFalso(self, canal_id, servidor_id=servidor_id)
+        return canal
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        return {"llamadas": dict(self.llamadas), "limitadas": dict(self.limitadas),
+                "fallidas": dict(self.fallidas)}
+
+
+class ServidorFalso:
+    def __init__(self, servidor_id: int):
+        self.id = servidor_id
+
+
+class CanalFalso:
+    def __init__(self, red: RedFalsa, canal_id: int, destinatario: Optional["UsuarioFalso"] = None,
+                 servidor_id: int = 0):
+        self.red = red
+        self.id = canal_id
+        self.recipient = destinatario  # Solo en los DMs
+        self.guild = None if destinatario is not None else ServidorFalso(servidor_id)
+
+    async def send(self, contenido: str):
+        await self.red.llamar("send", self.id)
+        if self.recipient is not None and self.recipient.dm_cerrados:
+            self.red.fallidas["send"] += 1
+            raise discord.Forbidden(_RespuestaFalsa(403, "Forbidden"), "Cannot send messages to this user")
+        if self.red.guardar_entregados:
+            self.red.entregados.append((self.id, contenido))
+
+
+class _Permisos:
+    def __init__(self, administrator: bool):
+        self.administrator = administrator
+
+
+class UsuarioFalso:
+    def __init__(self, red: RedFalsa, usuario_id: int, nombre: str, admin: bool = False):
+        self.red = red
+        self.id = usuario_id
+        self.name = self.display_name = nombre
+        self.mention = f"<@{usuario_id}>"
+        self.guild_permissions = _Permisos(admin)
+        self.dm_channel: Optional[CanalFalso] = None
+        # Depende solo del id: los mismos usuarios tienen los DMs cerrados en cada ejecución
+        self.dm_cerrados = random.Random(usuario_id).random() < red.dm_cerrados
+
+    async def create_dm(self) -> CanalFalso:
+        await self.red.llamar("create_dm")
+        if self.dm_channel is None:
+            # Los DMs tienen ids propios; se separan de los canales con un desplazamiento
+            self.dm_channel = CanalFalso(self.red, 10**15 + self.id, destinatario=self)
+        return self.dm_channel
+
+
+class MensajeFalso:
+    def __init__(self, autor: UsuarioFalso, canal: CanalFalso, contenido: str, en_servidor: bool):
+        self.author = autor
+        self.channel = canal
+        self.content = contenido
+        self.guild = canal.guild if en_servidor else None
+
+
+class InteraccionFalsa:
+    """Lo que Router.despachar_interaccion usa de discord.Interaction.
+
+    Contestar (con defer o send_message) es una llamada a la ruta
+    "interaccion" y cada followup otra a "followup"; como en Discord, solo
+    se contesta una vez y el followup necesita la respuesta antes.
+    """
+
+    def __init__(self, red: RedFalsa, usuario: "UsuarioFalso", canal: Optional["CanalFalso"] = None):
+        self.red = red
+        self.user = usuario
+        if canal is None:  # Desde un DM con el bot
+            canal = usuario.dm_channel or CanalFalso(red, 10**15 + usuario.id, destinatario=usuario)
+        self.channel = canal
+        self.guild = canal.guild
+        self._contestada = False
+        self.response = SimpleNamespace(defer=self._diferir, send_message=self._contestar,
+                                        is_done=lambda: self._contestada)
+        self.followup = SimpleNamespace(send=self._followup)
+
+    async def _diferir(self, ephemeral: bool = False):
+        await self._contestar(None, ephemeral)
+
+    async def _contestar(self, contenido: Optional[str], ephemeral: bool = False):
+        if self._contestada:
+            raise discord.InteractionResponded(self)
+        self._contestada = True
+        await self.red.llamar("interaccion", con_limite_global=False)
+        if contenido is not None and self.red.guardar_entregados:
+            self.red.entregados.append((self.channel.id, contenido))
+
+    async def _followup(self, contenido: str, ephemeral: bool = False):
+        if not self._contestada:
+            raise RuntimeError("El followup necesita contestar antes a la interacción")
+        await self.red.llamar("followup", con_limite_global=False)
+        if self.red.guardar_entregados:
+            self.red.entregados.append((self.channel.id, contenido))
+
+
+class ClienteFalso:
+    """Ocupa el lugar de discord.Client: mismos eventos, REST contra la RedFalsa.
+
+    Como con el perfil ligero, los canales del servidor están en la caché
+    del gateway (`get_channel`) pero los usuarios no (`get_user` da None).
+
+    Con un `guion` también se puede arrancar con run(), como el de verdad:
+    inicia sesión, tarda `gateway` segundos en conectar y corre el guion.
+
+    Con `servidores` y `miembros` (por servidor) el gateway se comporta como
+    con servidores grandes: si el perfil pide el intent de miembros y no
+    desactiva chunk_guilds_at_startup, al conectar llegan todos los miembros
+    en bloques de BLOQUE_MIEMBROS (cada uno tarda la latencia de la red) y,
+    sin member_cache_flags, se guardan; on_ready espera a que lleguen. Con
+    max_messages (1000 si no se indica) se guardan los últimos mensajes.
+    """
+    BLOQUE_MIEMBROS = 1000  # Miembros por GUILD_MEMBERS_CHUNK
+
+    def __init__(self, red: RedFalsa, gateway: float = 0.0,
+                 guion: Optional[Callable[["ClienteFalso"], Awaitable[None]]] = None,
+                 servidores: int = 0, miembros: int = 0, **opciones):
+        self.red = red
+        self.gateway = gateway  # Segundos desde iniciar sesión hasta READY
+        self.guion = guion      # Lo que pasa una vez conectado; run() termina con él
+        self.servidores = servidores
+        self.miembros_por_servidor = miembros
+        self.opciones = opciones
+        self.intents = opciones.get("intents")
+        self.user = UsuarioFalso(red, 0, "botsito")
+        self.miembros: Dict[int, UsuarioFalso] = {}  # Caché de miembros del gateway
+        max_mensajes = opciones.get("max_messages", 1000)
+        self.mensajes = deque(maxlen=max_mensajes) if max_mensajes else None
+        # Lo que app_commands.CommandTree (bot/barra.py) usa del cliente de verdad
+        self.application_id = 1
+        self.http = SimpleNamespace(bulk_upsert_global_commands=self._publicar_comandos)
+        self._connection = SimpleNamespace(_command_tree=None)
+
+    def event(self, funcion):
+        setattr(self, funcion.__name__, funcion)
+        return funcion
+
+    async def _publicar_comandos(self, application_id: int, payload: List[Dict]) -> List[Dict]:
+        await self.red.llamar("sincronizar")
+        return []
+
+    def get_user(self, usuario_id: int) -> None:
+        return None
+
+    async def fetch_user(self, usuario_id: int) -> UsuarioFalso:
+        await self.red.llamar("fetch_user")
+        return self.red.usuario(usuario_id)
+
+    def get_channel(self, canal_id: int) -> Optional[CanalFalso]:
+        return self.red.canales.get(canal_id)
+
+    async def fetch_channel(self, canal_id: int) -> CanalFalso:
+        await self.red.llamar("fetch_channel")
+        return self.red.canal(canal_id)
+
+    async def conectar(self):
+        """Lo que hace el gateway al conectar: mandar los miembros si se piden y avisar con on_ready"""
+        if getattr(self.intents, "members", False) and self.opciones.get("chunk_guilds_at_startup", True):
+            await self._recibir_miembros()
+        await self.on_ready()
+
+    async def _recibir_miembros(self):
+        guardar = "member_cache_flags" not in self.opciones
+        for servidor in range(self.servidores):
+            primero = 2 * 10**12 + servidor * 10**7  # Ids aparte de los de los jugadores
+            for inicio in range(0, self.miembros_por_servidor, self.BLOQUE_MIEMBROS):
+                await asyncio.sleep(self.red.latencia)
+                fin = min(inicio + self.BLOQUE_MIEMBROS, self.miembros_por_servidor)
+                bloque = [{"id": primero + i, "nombre": f"M{i}"} for i in range(inicio, fin)]
+                for datos in bloque:
+                    miembro = UsuarioFalso(self.red, datos["id"], datos["nombre"])
+                    if guardar:
+                        self.miembros[miembro.id] = miembro
+
+    async def entregar(self, autor: UsuarioFalso, contenido: str, canal: Optional[CanalFalso] = None):
+        """Entrega un mensaje (al canal o, sin canal, por DM) y espera a que el bot lo procese"""
+        if canal is None:
+            privado = autor.dm_channel or CanalFalso(self.red, 10**15 + autor.id, destinatario=autor)
+            autor.dm_channel = privado
+            mensaje = MensajeFalso(autor, privado, contenido, en_servidor=False)
+        else:
+            mensaje = MensajeFalso(autor, canal, contenido, en_servidor=True)
+        if self.mensajes is not None:
+            self.mensajes.append(mensaje)
+        await self.on_message(mensaje)
+
+    def run(self, *args, **kwargs):
+        """Como discord.Client.run: bloquea hasta que termina el guion"""
+        if self.guion is None:
+            raise RuntimeError("El cliente falso no se conecta a Discord: úsalo desde carga.py o con un guion")
+        asyncio.run(self._correr())
+
+    async def _correr(self):
+        await self.red.llamar("login")
+        await asyncio.sleep(self.gateway)
+        # Como en discord.py, on_ready es una tarea más: los mensajes no lo esperan
+        conectado = asyncio.create_task(self.conectar())
+        await self.guion(self)
+        await conectado
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# (canal_id, mensaje_id) de un DM que debe procesar otro proceso
+ManejarReenviado = Callable[[int, int], Awaitable[None]]
+
+# Lo que viaja por las colas entre procesos: (DM, canal_id, mensaje_id) o
+# (VINCULAR/DESVINCULAR, jugador_id, índice del proceso que lo anuncia)
+DM = "dm"
+VINCULAR = "vincular"
+DESVINCULAR = "desvincular"
+
+
+def repartir_shards(total: int, procesos: int) -> List[List[int]]:
+    """Divide los shards 0..total-1 en rangos contiguos, uno por proceso"""
+    procesos = max(1, min(procesos, total))
+    base, resto = divmod(total, procesos)
+    rangos = []
+    inicio = 0
+    for i in range(procesos):
+        fin = inicio + base + (1 if i < resto else 0)
+        rangos.append(list(range(inicio, fin)))
+        inicio = fin
+    return rangos
+
+
+class Reenvio:
+    """Reenvía DMs al proceso dueño de la partida del autor.
+
+    Discord entrega todos los DMs al shard 0, pero cada partida vive en el
+    proceso que tiene el shard de su servidor. Cada proceso tiene su cola de
+    entrada en `colas` y una copia local de `propietarios` {jugador_id:
+    índice de proceso}: al vincular o desvincular a un jugador se avisa a los
+    demás por sus colas. Así nada de esto espera a otro proceso; consultar es
+    leer un dict y avisar es un put() que no bloquea (la cola se vacía en su
+    propio hilo).
+    """
+
+    def __init__(self, indice: int, colas: List):
+        self.indice = indice
+        self.colas = colas
+        self.propietarios: Dict[str, int] = {}
+        self._hilo: Optional[threading.Thread] = None
+
+    def _avisar(self, mensaje: Tuple):
+        for indice, cola in enumerate(self.colas):
+            if indice != self.indice:
+                cola.put(mensaje)
+
+    def vincular(self, jugador_id: str):
+        self.propietarios[jugador_id] = self.indice
+        self._avisar((VINCULAR, jugador_id, self.indice))
+
+    def desvincular(self, jugador_id: str):
+        if self.propietarios.get(jugador_id) == self.indice:
+            self.propietarios.pop(jugador_id, None)
+            self._avisar((DESVINCULAR, jugador_id, self.indice))
+
+    def propietario(self, jugador_id: str) -> Optional[int]:
+        return self.propietarios.get(jugador_id)
+
+    def reenviar_si_ajeno(self, jugador_id: str, canal_id: int, mensaje_id: int) -> bool:
+        """Manda el DM al proceso dueño; False si es nuestro o no es de nadie"""
+        dueno = self.propietarios.get(jugador_id)
+        if dueno is None or dueno == self.indice:
+            return False
+        self.colas[dueno].put((DM, canal_id, mensaje_id))
+        return True
+
+    def recibir(self, mensaje: Tuple) -> Optional[Tuple[int, int]]:
+        """Aplica un aviso de otro proceso; devuelve (canal_id, mensaje_id) si es un DM"""
+        tipo, *datos = mensaje
+        if tipo == DM:
+            return datos[0], datos[1]
+        jugador_id, indice = datos
+        if tipo == VINCULAR:
+            self.propietarios[jugador_id] = indice
+        elif self.propietarios.get(jugador_id) == indice:
+            # Si otro proceso ya lo vinculó después, su aviso manda
+            self.propietarios.pop(jugador_id, None)
+        return None
+
+    def escuchar(self, loop: asyncio.AbstractEventLoop, manejar: ManejarReenviado):
+        """Atiende en un hilo la cola de este proceso y pasa cada DM al bucle"""
+        if self._hilo is not None:
+            return
+
+        cola = self.colas[self.indice]
+
+        def bucle():
+            while True:
+                # Los avisos de vinculación se aplican aquí mismo: asignar en un dict es atómico
+                dm = self.recibir(cola.get())
+                if dm is not None:
+                    futuro = asyncio.run_coroutine_threadsafe(manejar(*dm), loop)
+                    futuro.add_done_callback(_registrar_error)
+
+        self._hilo = threading.Thread(target=bucle, name="reenvio-dms", daemon=True)
+        self._hilo.start()
+
+
+def _registrar_error(futuro):
+    if not futuro.cancelled() and futuro.exception() is not None:
+        log.error("Error procesando un DM reenviado", exc_info=futuro.exception())
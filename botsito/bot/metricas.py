@@ -0,0 +1,220 @@
+"""Métricas del bot en el formato de texto de Prometheus.
+
+Todo se registra desde el hilo del bucle de eventos, así que anotar un valor
+es sumar en un dict, sin locks. Lo que es un estado (partidas por fase,
+profundidad de las colas...) no se anota: se calcula con una función solo
+cuando alguien pide /metrics.
+"""
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Límites de los cubos de los histogramas de duración (segundos)
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[str, ...]
+Muestra = Tuple[str, Dict[str, str], float]  # (nombre, etiquetas, valor)
+
+
+def _formatear_etiquetas(etiquetas: Dict[str, str]) -> str:
+    if not etiquetas:
+        return ""
+    pares = []
+    for clave, valor in etiquetas.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{clave}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _formatear_valor(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores: Dict[Etiquetas, float] = {}
+
+    def inc(self, *valores: str, cantidad: float = 1):
+        self.valores[valores] = self.valores.get(valores, 0) + cantidad
+
+    def muestras(self) -> Iterator[Muestra]:
+        for valores, total in list(self.valores.items()):
+            yield self.nombre, dict(zip(self.etiquetas, valores)), total
+
+
+class Histograma:
+    """Cuenta cuántas observaciones caen en cada cubo, más su suma"""
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        # {etiquetas: [observaciones por cubo..., las que superan el último, suma]}
+        self.series: Dict[Etiquetas, List[float]] = {}
+
+    def observar(self, valor: float, *valores: str):
+        serie = self.series.get(valores)
+        if serie is None:
+            serie = self.series[valores] = [0] * (len(self.limites) + 1) + [0.0]
+        serie[bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+    @contextmanager
+    def medir(self, *valores: str):
+        """Observa lo que tarda el bloque `with`"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *valores)
+
+    def muestras(self) -> Iterator[Muestra]:
+        for valores, serie in list(self.series.items()):
+            etiquetas = dict(zip(self.etiquetas, valores))
+            acumulado = 0
+            for limite, cantidad in zip(self.limites + (float("inf"),), serie):
+                acumulado += cantidad
+                yield f"{self.nombre}_bucket", {**etiquetas, "le": _formatear_valor(limite)}, acumulado
+            yield f"{self.nombre}_sum", etiquetas, serie[-1]
+            yield f"{self.nombre}_count", etiquetas, acumulado
+
+
+class Medidor:
+    """Valor que se calcula al exponer: `funcion` devuelve {etiquetas: valor} o un número"""
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Callable[[], object],
+                 etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.etiquetas = tuple(etiquetas)
+
+    def muestras(self) -> Iterator[Muestra]:
+        resultado = self.funcion()
+        if not isinstance(resultado, dict):
+            resultado = {(): resultado}
+        for valores, valor in resultado.items():
+            if not isinstance(valores, tuple):
+                valores = (valores,)
+            yield self.nombre, dict(zip(self.etiquetas, valores)), valor
+
+
+class Registro:
+    def __init__(self):
+        self.metricas: Dict[str, object] = {}
+
+    def _registrar(self, metrica):
+        # Registrar dos veces el mismo nombre devuelve la métrica ya existente
+        return self.metricas.setdefault(metrica.nombre, metrica)
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                   limites: Sequence[float] = LIMITES_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, limites))
+
+    def medidor(self, nombre: str, ayuda: str, funcion: Callable[[], object],
+                etiquetas: Sequence[str] = ()) -> Medidor:
+        medidor = Medidor(nombre, ayuda, funcion, etiquetas)
+        self.metricas[nombre] = medidor  # La función puede cambiar (p. ej. al recargar)
+        return medidor
+
+    def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lineas = []
+        for metrica in self.metricas.values():
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            try:
+                for nombre, etiquetas, valor in metrica.muestras():
+                    lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {_formatear_valor(valor)}")
+            except Exception:
+                log.exception("No se pudo calcular la métrica %s", metrica.nombre)
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = Registro()
+
+LATENCIA_COMANDOS = METRICAS.histograma(
+    "mafia_comando_segundos", "Duración de cada comando", ("comando",))
+LLAMADAS_API = METRICAS.contador(
+    "mafia_discord_api_llamadas_total", "Llamadas REST a Discord por ruta y estado", ("ruta", "estado"))
+LATENCIA_API = METRICAS.histograma(
+    "mafia_discord_api_segundos", "Duración de las llamadas REST a Discord", ("ruta",))
+DURACION_ENVIOS_PRIVADOS = METRICAS.histograma(
+    "mafia_envio_privados_segundos", "Duración de un reparto de mensajes privados")
+
+
+@contextmanager
+def medir_api(ruta: str):
+    """Cuenta y cronometra una llamada REST; el estado es el código HTTP del error o "ok" """
+    estado = "ok"
+    inicio = time.perf_counter()
+    try:
+        yield
+    except discord.HTTPException as e:
+        estado = str(e.status)
+        raise
+    except Exception:
+        estado = "error"
+        raise
+    finally:
+        LATENCIA_API.observar(time.perf_counter() - inicio, ruta)
+        LLAMADAS_API.inc(ruta, estado)
+
+
+async def servir(registro: Registro = METRICAS, host: str = "127.0.0.1",
+                 puerto: int = 9100) -> asyncio.AbstractServer:
+    """Servidor HTTP mínimo que responde a GET /metrics"""
+
+    async def atender(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            peticion = (await lector.readline()).split()
+            while (await lector.readline()).strip():
+                pass  # Las cabeceras no nos interesan
+
+            if len(peticion) >= 2 and peticion[0] == b"GET" and peticion[1].split(b"?")[0] == b"/metrics":
+                estado, cuerpo = "200 OK", registro.exponer().encode()
+            else:
+                estado, cuerpo = "404 Not Found", b"No encontrado\n"
+            escritor.write(
+                f"HTTP/1.1 {estado}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                "Connection: close\r\n\r\n".encode() + cuerpo
+            )
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    servidor = await asyncio.start_server(atender, host, puerto)
+    log.info("Métricas en http://%s:%d/metrics", host, puerto)
+    return servidor
+
+
+def puerto_configurado() -> Optional[int]:
+    """Lee METRICAS_PUERTO del entorno; sin él no se sirven las métricas"""
+    puerto = os.getenv('METRICAS_PUERTO')
+    return int(puerto) if puerto else None
@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Campos de contexto que se pueden pasar con extra={...} o con un LoggerAdapter
+CAMPOS_CONTEXTO = ("canal_id", "usuario_id", "comando")
+
+MAX_POR_SEGUNDO = 20  # Registros por segundo de un mismo mensaje antes de descartar
+
+
+class FormatoTexto(logging.Formatter):
+    """Formato legible que añade los campos de contexto al final de la línea"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea = super().format(record)
+        contexto = " ".join(
+            f"{campo}={getattr(record, campo)}"
+            for campo in CAMPOS_CONTEXTO if getattr(record, campo, None) is not None
+        )
+        return f"{linea} [{contexto}]" if contexto else linea
+
+
+class FormatoJSON(logging.Formatter):
+    """Un objeto JSON por línea, para ingestión en sistemas de logs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": record.created,
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for campo in CAMPOS_CONTEXTO:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                datos[campo] = valor
+        if record.exc_info:
+            datos["error"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False)
+
+
+class LimiteFrecuencia(logging.Filter):
+    """Descarta los registros ruidosos que superan MAX_POR_SEGUNDO por mensaje.
+
+    Se agrupa por la plantilla del mensaje (record.msg), no por el texto ya
+    formateado, así que no hace falta formatear nada para decidir. Los
+    avisos y errores nunca se descartan.
+    """
+
+    def __init__(self, max_por_segundo: int = MAX_POR_SEGUNDO):
+        super().__init__()
+        self.max_por_segundo = max_por_segundo
+        self.descartados = 0
+        self._ventanas: Dict[Tuple[str, str], list] = {}  # {(logger, msg): [segundo, cuenta]}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        segundo = int(record.created)
+        clave = (record.name, str(record.msg))
+        ventana = self._ventanas.get(clave)
+        if ventana is None or ventana[0] != segundo:
+            if len(self._ventanas) > 10000:
+                self._ventanas.clear()
+            self._ventanas[clave] = [segundo, 1]
+            return True
+
+        ventana[1] += 1
+        if ventana[1] > self.max_por_segundo:
+            self.descartados += 1
+            return False
+        return True
+
+
+class ColaSinFormato(QueueHandler):
+    """QueueHandler que deja el formateo al hilo del listener.
+
+    El QueueHandler estándar formatea el mensaje antes de encolarlo (para
+    poder enviarlo a otro proceso); aquí todo ocurre en el mismo proceso, así
+    que el bucle de eventos solo paga por crear el registro y encolarlo.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configurar_registro(nivel: Optional[str] = None, formato: Optional[str] = None) -> QueueListener:
+    """Configura el logging de la aplicación con escritura fuera del bucle de eventos"""
+    nivel = (nivel or os.getenv("LOG_NIVEL", "INFO")).upper()
+    formato = (formato or os.getenv("LOG_FORMATO", "texto")).lower()
+
+    salida = logging.StreamHandler()
+    salida.setFormatter(FormatoJSON() if formato == "json" else FormatoTexto())
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    entrada = ColaSinFormato(cola)
+    entrada.addFilter(LimiteFrecuencia())
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [entrada]
+    raiz.setLevel(nivel)
+    # discord.py es muy ruidoso en DEBUG (cada evento del gateway): nunca por debajo de INFO
+    logging.getLogger("discord").setLevel(max(logging.INFO, raiz.level))
+
+    listener = QueueListener(cola, salida, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def registro_con_contexto(logger: logging.Logger, **contexto) -> logging.LoggerAdapter:
+    """Logger que añade canal_id/usuario_id/comando a cada registro"""
+    return logging.LoggerAdapter(logger, contexto)
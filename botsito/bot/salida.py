@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+import discord
+
+from bot.envios import MAX_INTENTOS, espera_reintento
+from bot.metricas import medir_api
+
+log = logging.getLogger(__name__)
+
+MAX_CARACTERES = 2000  # Límite de Discord por mensaje
+VENTANA = 0.15         # Segundos que se espera a que lleguen más mensajes para agrupar
+MAX_PENDIENTES = 100   # Mensajes en cola por destino antes de frenar a quien envía
+INACTIVIDAD = 60       # Segundos sin mensajes tras los que se libera la cola de un destino
+
+
+def dividir_mensaje(texto: str, limite: int = MAX_CARACTERES) -> List[str]:
+    """Parte un texto en trozos de como mucho `limite` caracteres, cortando por líneas"""
+    trozos: List[str] = []
+    actual = ""
+    for linea in texto.split("\n"):
+        # Una línea que por sí sola no cabe se corta a la fuerza
+        while len(linea) > limite:
+            if actual:
+                trozos.append(actual)
+                actual = ""
+            trozos.append(linea[:limite])
+            linea = linea[limite:]
+
+        if not actual:
+            actual = linea
+        elif len(actual) + 1 + len(linea) <= limite:
+            actual += "\n" + linea
+        else:
+            trozos.append(actual)
+            actual = linea
+    if actual:
+        trozos.append(actual)
+    return trozos
+
+
+class ColaSalida:
+    """Mensajes salientes agrupados por destino.
+
+    Cada destino (canal o DM) tiene su cola y su tarea. Los mensajes que
+    llegan dentro de VENTANA se juntan en un solo envío (partido si supera
+    los 2000 caracteres), siempre en el orden en que se encolaron. Si el
+    destino está limitado por Discord la cola se llena y `enviar` espera:
+    así la presión llega hasta quien genera los mensajes.
+    """
+
+    def __init__(self, ventana: float = VENTANA, max_pendientes: int = MAX_PENDIENTES):
+        self.ventana = ventana
+        self.max_pendientes = max_pendientes
+        self.mensajes = 0  # Mensajes encolados
+        self.envios = 0    # Llamadas REST realizadas
+        self._colas: Dict[int, asyncio.Queue] = {}
+        self._tareas: Dict[int, asyncio.Task] = {}
+
+    async def enviar(self, destino: discord.abc.Messageable, contenido: str):
+        """Encola un mensaje para `destino`; solo espera si su cola está llena"""
+        clave = destino.id
+        cola = self._colas.get(clave)
+        if cola is None:
+            cola = self._colas[clave] = asyncio.Queue(self.max_pendientes)
+            self._tareas[clave] = asyncio.create_task(self._trabajar(clave, destino, cola))
+        self.mensajes += 1
+        await cola.put(contenido)
+
+    def profundidad(self, destino_id: int) -> int:
+        cola = self._colas.get(destino_id)
+        return cola.qsize() if cola else 0
+
+    def profundidades(self) -> Dict[int, int]:
+        """Mensajes pendientes por destino (solo los que tienen alguno)"""
+        return {clave: cola.qsize() for clave, cola in self._colas.items() if cola.qsize()}
+
+    async def vaciar(self):
+        """Espera a que se hayan enviado todos los mensajes pendientes"""
+        await asyncio.gather(*(cola.join() for cola in list(self._colas.values())))
+
+    async def _trabajar(self, clave: int, destino: discord.abc.Messageable, cola: asyncio.Queue):
+        while True:
+            try:
+                async with asyncio.timeout(INACTIVIDAD):
+                    primero = await cola.get()
+            except TimeoutError:
+                # Un mensaje encolado en la misma vuelta del bucle que el plazo sigue en la cola
+                if not cola.empty():
+                    continue
+                del self._colas[clave]
+                del self._tareas[clave]
+                return
+
+            textos = [primero]
+            try:
+                await asyncio.sleep(self.ventana)
+                while not cola.empty():
+                    textos.append(cola.get_nowait())
+                for trozo in dividir_mensaje("\n".join(textos)):
+                    await self._enviar_trozo(clave, destino, trozo)
+            except Exception:
+                # La tarea tiene que seguir viva: si muriera, quien envía a este destino esperaría siempre
+                log.exception("Error inesperado enviando al destino %s", clave)
+            finally:
+                for _ in textos:
+                    cola.task_done()
+
+    async def _enviar_trozo(self, clave: int, destino: discord.abc.Messageable, trozo: str):
+        """Envía un trozo; reintenta 429, errores 5xx y de red como los DMs (ver bot/envios.py)"""
+        for intento in range(MAX_INTENTOS):
+            try:
+                with medir_api("send"):
+                    await destino.send(trozo)
+                self.envios += 1
+                return
+            except discord.HTTPException as e:
+                error = e
+                if e.status != 429 and e.status < 500:
+                    break  # Sin permisos, canal borrado...: reintentar no sirve de nada
+            except (OSError, asyncio.TimeoutError) as e:
+                error = e
+            if intento + 1 < MAX_INTENTOS:
+                await asyncio.sleep(espera_reintento(error, intento))
+        log.warning("No se pudo enviar un mensaje al destino %s", clave, exc_info=error)
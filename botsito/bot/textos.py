@@ -0,0 +1,91 @@
+"""Textos de la partida que se repiten para muchos destinatarios.
+
+Las listas de jugadores solo cambian cuando alguien se une, recibe rol o
+muere, y cada uno de esos cambios sube Plantel.version. Cada texto se guarda
+junto a la versión con la que se calculó y se reutiliza mientras no cambie:
+una noche con 50 jugadores construye cada lista una sola vez.
+"""
+from typing import Callable, Dict, Hashable, List, Optional
+
+from bot.cache import CacheLRU
+from game.jugadores import Jugador, Plantel, Rol
+
+MAX_ENTRADAS = 2000
+
+
+class Textos:
+    def __init__(self, descripciones: Dict[Rol, str], prefijo: str = "!", max_entradas: int = MAX_ENTRADAS):
+        self.descripciones = descripciones
+        self.prefijo = prefijo  # "!" con comandos de texto, "/" con comandos de barra
+        self._cache = CacheLRU(max_entradas)  # {(canal_id, clave): (versión, texto)}
+
+    def _memo(self, canal_id: str, jugadores: Plantel, clave: Hashable, calcular: Callable[[], object]):
+        entrada = self._cache.obtener((canal_id, clave))
+        if entrada is not None and entrada[0] == jugadores.version:
+            return entrada[1]
+        valor = calcular()
+        self._cache.guardar((canal_id, clave), (jugadores.version, valor))
+        return valor
+
+    def olvidar(self, canal_id: str):
+        """Descarta los textos de una partida que ha terminado"""
+        for clave in ("vivos", "mafiosos", "votacion", Rol.MAFIOSO, Rol.DOCTOR):
+            self._cache.invalidar((canal_id, clave))
+
+    def nombres_vivos(self, canal_id: str, jugadores: Plantel) -> str:
+        return self._memo(canal_id, jugadores, "vivos",
+                          lambda: ", ".join(j.nombre for j in jugadores.vivos()))
+
+    def _mafiosos(self, canal_id: str, jugadores: Plantel) -> List[Jugador]:
+        return self._memo(canal_id, jugadores, "mafiosos",
+                          lambda: jugadores.vivos_con_rol(Rol.MAFIOSO))
+
+    def mensaje_rol(self, canal_id: str, jugadores: Plantel, jugador: Jugador) -> str:
+        """DM con el rol asignado; los mafiosos además ven a sus compañeros"""
+        mensaje = (
+            f"🔮 **Tu rol en la partida de Mafia es: {jugador.rol.value}**\n\n"
+            f"{self.descripciones[jugador.rol]}\n\n"
+        )
+        if jugador.rol == Rol.MAFIOSO:
+            compañeros = [m.nombre for m in self._mafiosos(canal_id, jugadores) if m.id != jugador.id]
+            if compañeros:
+                mensaje += f"👥 Tus compañeros mafiosos son: {', '.join(compañeros)}"
+        return mensaje
+
+    def instrucciones_noche(self, canal_id: str, jugadores: Plantel, jugador: Jugador) -> Optional[str]:
+        """DM de la noche para un rol especial (None si no tiene nada que hacer)"""
+        if jugador.rol == Rol.MAFIOSO:
+            return self._memo(canal_id, jugadores, Rol.MAFIOSO, lambda: (
+                f"🌑 **Es de noche, Mafioso**\n"
+                f"Jugadores disponibles para eliminar: "
+                f"{', '.join(j.nombre for j in jugadores.vivos() if j.rol != Rol.MAFIOSO)}\n"
+                f"Usa el comando `{self.prefijo}matar @jugador` para votar por eliminar a alguien."
+            ))
+        if jugador.rol == Rol.DOCTOR:
+            return self._memo(canal_id, jugadores, Rol.DOCTOR, lambda: (
+                f"🏥 **Es de noche, Doctor**\n"
+                f"Puedes proteger a un jugador esta noche: {self.nombres_vivos(canal_id, jugadores)}\n"
+                f"Usa el comando `{self.prefijo}proteger @jugador` para salvar a alguien."
+            ))
+        if jugador.rol == Rol.DETECTIVE:
+            # Es distinto para cada detective (no se incluye a sí mismo); no se guarda
+            posibles_investigados = [j.nombre for j in jugadores.vivos() if j.id != jugador.id]
+            return (
+                f"🔍 **Es de noche, Detective**\n"
+                f"Puedes investigar a un jugador: {', '.join(posibles_investigados)}\n"
+                f"Usa el comando `{self.prefijo}investigar @jugador` para descubrir su rol."
+            )
+        return None
+
+    def inicio_votacion(self, canal_id: str, jugadores: Plantel) -> str:
+        return self._memo(canal_id, jugadores, "votacion", lambda: (
+            "🗳️ **Comienza la votación diurna!**\n"
+            f"Jugadores vivos: {self.nombres_vivos(canal_id, jugadores)}\n"
+            f"Usa `{self.prefijo}votar @jugador` para votar por linchar a alguien."
+        ))
+
+    def roles_finales(self, jugadores: Plantel) -> str:
+        lineas = ["🔍 **Roles de todos los jugadores:**"]
+        for jugador in jugadores:
+            lineas.append(f"- {jugador.nombre}: {jugador.rol.value if jugador.rol else 'Sin rol'}")
+        return "\n".join(lineas) + "\n"
@@ -0,0 +1,176 @@
+"""Vigilancia del bucle de eventos y perfiles por muestreo.
+
+Todos los manejadores corren en el único bucle de asyncio, así que algo
+lento (un `print` síncrono, un recuento cuadrático, un bucle de DMs sin
+`await`) detiene el heartbeat del gateway y todas las demás partidas.
+
+Vigilante mide continuamente cuánto tarda el bucle en despertar de un
+`sleep` corto y, desde un hilo aparte, avisa mientras el bucle sigue
+bloqueado: con la pila del hilo del bucle y la partida y el comando que lo
+bloquean. Perfilador guarda, a petición, muestras de la pila del bucle
+durante unos segundos en formato "folded" (una línea `f1;f2;f3 N` por
+pila), el que leen flamegraph.pl y speedscope.
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple
+
+from bot.metricas import METRICAS
+
+log = logging.getLogger(__name__)
+
+INTERVALO = 0.5           # Segundos entre latidos del bucle
+UMBRAL_BLOQUEO = float(os.getenv('BUCLE_LENTO_MS', '250')) / 1000  # Retraso a partir del que se avisa
+LINEAS_PILA = 25          # Marcos de la pila que se registran en cada aviso
+
+INTERVALO_MUESTREO = 0.005  # Segundos entre muestras del perfil
+MAX_SEGUNDOS_PERFIL = 60
+
+RETRASO_BUCLE = METRICAS.histograma(
+    "mafia_bucle_retraso_segundos", "Retraso del bucle de eventos al despertar de un latido",
+    limites=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+BLOQUEOS_BUCLE = METRICAS.contador(
+    "mafia_bucle_bloqueos_total", "Latidos del bucle que llegaron con más retraso que el umbral")
+
+DescribirTarea = Callable[[Optional[asyncio.Task]], Dict[str, str]]
+
+
+class Vigilante:
+    """Mide el retraso del bucle y registra las pilas de los bloqueos largos.
+
+    El hilo solo compara la hora del último latido con la actual cada medio
+    umbral: en reposo, entre los dos, son unos diez despertares por segundo.
+    """
+
+    def __init__(self, intervalo: float = INTERVALO, umbral: float = UMBRAL_BLOQUEO,
+                 describir: Optional[DescribirTarea] = None):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.describir = describir  # Partida y comando de la tarea que bloquea (para el log)
+        self.hilo_bucle: Optional[int] = None
+        self._bucle: Optional[asyncio.AbstractEventLoop] = None
+        self._latido = time.monotonic()
+        self._tarea: Optional[asyncio.Task] = None
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        """Empieza a vigilar el bucle que está corriendo (hay que llamarlo desde él)"""
+        if self._tarea is not None:
+            return
+        self._bucle = asyncio.get_running_loop()
+        self.hilo_bucle = threading.get_ident()
+        self._latido = time.monotonic()
+        self._parar.clear()
+        self._tarea = asyncio.create_task(self._latir(), name="vigilante")
+        self._hilo = threading.Thread(target=self._vigilar, name="vigilante", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self._hilo = None
+
+    async def _latir(self):
+        while True:
+            antes = time.monotonic()
+            self._latido = antes
+            await asyncio.sleep(self.intervalo)
+            retraso = max(0.0, time.monotonic() - antes - self.intervalo)
+            # Las métricas se anotan desde el bucle, nunca desde el hilo vigilante
+            RETRASO_BUCLE.observar(retraso)
+            if retraso >= self.umbral:
+                BLOQUEOS_BUCLE.inc()
+
+    def _vigilar(self):
+        avisado = None  # Latido del último bloqueo avisado: uno por bloqueo
+        while not self._parar.wait(self.umbral / 2):
+            latido = self._latido
+            parado = time.monotonic() - latido - self.intervalo
+            if parado >= self.umbral and latido != avisado:
+                avisado = latido
+                self._avisar(parado)
+
+    def _avisar(self, parado: float):
+        """Registra qué está haciendo el bucle mientras sigue bloqueado"""
+        tarea = asyncio.current_task(self._bucle)
+        contexto = self.describir(tarea) if self.describir else {}
+        marco = sys._current_frames().get(self.hilo_bucle)
+        pila = "".join(traceback.format_stack(marco, limit=-LINEAS_PILA)) if marco else ""
+        log.warning("El bucle lleva %.0f ms bloqueado en %s\n%s", parado * 1000,
+                    tarea.get_name() if tarea else "un callback", pila.rstrip(), extra=contexto)
+
+
+def _plegar(marco) -> str:
+    """La pila de `marco` como `raíz;...;hoja`, una función por elemento"""
+    funciones = []
+    while marco is not None:
+        codigo = marco.f_code
+        funciones.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+        marco = marco.f_back
+    return ";".join(reversed(funciones))
+
+
+def guardar_perfil(pilas: Counter, ruta: str):
+    """Escribe las pilas en formato folded, de la más a la menos frecuente. Bloquea"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        for pila, cantidad in pilas.most_common():
+            archivo.write(f"{pila} {cantidad}\n")
+
+
+class Perfilador:
+    """Perfiles por muestreo del bucle, de uno en uno y de duración limitada.
+
+    Las muestras las toma un temporizador de señal (SIGALRM) y no un hilo
+    que lea sys._current_frames(): ese hilo solo consigue el GIL cuando el
+    bucle lo suelta, casi siempre en el select(), y el perfil saldría vacío.
+    El manejador de la señal corre en el hilo principal con el marco que se
+    estaba ejecutando, así que el bucle tiene que ser el del hilo principal
+    (como con client.run). Solo en sistemas con setitimer (no en Windows).
+    """
+
+    def __init__(self, directorio: str, intervalo: float = INTERVALO_MUESTREO):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.ocupado = False
+
+    @staticmethod
+    def disponible() -> bool:
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    async def capturar(self, segundos: float) -> Optional[Tuple[str, int]]:
+        """Muestrea la pila del bucle `segundos` (como mucho MAX_SEGUNDOS_PERFIL) y la guarda.
+
+        Devuelve (ruta, muestras), o None si ya hay un perfil en marcha.
+        """
+        if self.ocupado:
+            return None
+        self.ocupado = True
+        pilas: Counter = Counter()
+
+        def muestrear(_senal, marco):
+            pilas[_plegar(marco)] += 1
+
+        anterior = signal.signal(signal.SIGALRM, muestrear)
+        try:
+            signal.setitimer(signal.ITIMER_REAL, self.intervalo, self.intervalo)
+            await asyncio.sleep(min(segundos, MAX_SEGUNDOS_PERFIL))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, anterior)
+            self.ocupado = False
+        ruta = os.path.join(self.directorio, time.strftime("perfil-%Y%m%d-%H%M%S.folded"))
+        await asyncio.get_running_loop().run_in_executor(None, guardar_perfil, pilas, ruta)
+        return ruta, sum(pilas.values())
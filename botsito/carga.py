@@ -0,0 +1,289 @@
+"""Prueba de carga del bot completo contra un Discord falso, sin red.
+
+Uso: python carga.py --partidas 500 --jugadores 8 --simultaneas 200 --latencia 0.05
+
+Sustituye el gateway y la API REST por bot/falso.py y juega partidas
+enteras con jugadores simulados: `!mafia crear`, `!mafia unirme`, acciones
+de noche por DM, votaciones y `!siguiente`. Los jugadores conocen su rol
+mirando el estado del bot en vez de leer sus DMs. Al terminar muestra
+comandos por segundo, latencia p50/p99 de cada comando (desde que llega
+hasta que el bot termina de procesarlo) y llamadas a la API por partida.
+
+Con `--buscar` los jugadores no crean ni se unen: cada partida es un
+servidor cuyos jugadores escriben `!mafia buscar` desde varios canales a la
+vez, y se mide además cuánto tarda la cola en juntarlos (espera p50/p99).
+
+Con `--barra` el bot arranca con MODO_INTERACCION=barra y los jugadores
+usan los comandos de barra: cada comando llega como una interacción (ver
+InteraccionFalsa en bot/falso.py) y no se mandan DMs. Las llamadas a la API
+por partida de los dos modos se comparan con medir_interacciones.py.
+
+Con la misma semilla se juegan las mismas partidas: `--json` guarda el
+resultado y `--comparar` lo compara con uno anterior (p. ej. de otro commit).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+MAX_RONDAS = 50  # Por si una partida no terminara nunca
+CANALES_POR_SERVIDOR = 4  # Con --buscar, canales desde los que buscan partida
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Carga:
+    """Juega partidas simuladas contra mainnn y mide cada comando"""
+
+    def __init__(self, bot, red, jugadores: int, semilla: int, buscar: bool = False, barra: bool = False):
+        self.bot = bot
+        self.red = red
+        self.jugadores = jugadores
+        self.semilla = semilla
+        self.buscar = buscar
+        self.barra = barra  # Cada comando como interacción de un comando de barra
+        self.latencias: List[float] = []
+        self.esperas: List[float] = []  # Con --buscar: desde `!mafia buscar` hasta tener partida
+        self.terminadas = 0
+        self.atascadas = 0
+
+    async def comando(self, autor, contenido: str, canal=None):
+        inicio = time.perf_counter()
+        if self.barra:
+            await self.interaccion(autor, contenido, canal)
+        else:
+            await self.bot.client.entregar(autor, contenido, canal)
+        self.latencias.append(time.perf_counter() - inicio)
+
+    async def interaccion(self, autor, contenido: str, canal=None):
+        """El comando de barra equivalente: `!mafia crear 8` es /mafia crear, `!matar X` es /matar"""
+        from bot.falso import InteraccionFalsa
+
+        partes = contenido.split()
+        palabras = 2 if partes[0] == "!mafia" else 1
+        await self.bot.router.despachar_interaccion(InteraccionFalsa(self.red, autor, canal),
+                                                    " ".join(partes[:palabras]), partes[palabras:])
+
+    def vivos(self, canal_id: str) -> List:
+        plantel = self.bot.jugadores_por_partida[canal_id]
+        return [self.red.usuario(int(j.id)) for j in plantel.vivos()]
+
+    def con_rol(self, canal_id: str, rol) -> List:
+        plantel = self.bot.jugadores_por_partida[canal_id]
+        return [self.red.usuario(int(j.id)) for j in plantel.vivos_con_rol(rol)]
+
+    async def partida(self, numero: int):
+        bot, red = self.bot, self.red
+        azar = random.Random(self.semilla * 1_000_003 + numero)
+        primero = 10**6 * (numero + 1)
+        creador = red.usuario(primero, admin=True)
+        otros = [red.usuario(primero + i) for i in range(1, self.jugadores)]
+
+        if self.buscar:
+            canal = await self.emparejar(numero, [creador] + otros, azar)
+            if canal is None:
+                self.atascadas += 1
+                return
+        else:
+            canal = red.canal(10**9 + numero)
+            await self.comando(creador, f"!mafia crear {self.jugadores}", canal)
+            # Todos se unen a la vez: el actor de la partida los pone en fila
+            await asyncio.gather(*(self.comando(u, "!mafia unirme", canal) for u in otros))
+        canal_id = str(canal.id)
+
+        for _ in range(MAX_RONDAS):
+            partida = bot.partidas.get(canal_id)
+            if partida is None:
+                self.terminadas += 1
+                return
+            fase = partida["estado"]
+            if fase == bot.FaseJuego.NOCHE:
+                await self.noche(canal_id, azar)
+                if canal_id in bot.partidas and bot.partidas[canal_id]["estado"] == fase:
+                    await self.comando(creador, "!siguiente", canal)
+            elif fase == bot.FaseJuego.DIA:
+                await self.comando(creador, "!siguiente", canal)
+            elif fase == bot.FaseJuego.VOTACION:
+                await self.votacion(canal_id, azar)
+                await self.comando(creador, "!siguiente", canal)
+            else:
+                break
+        self.atascadas += 1
+
+    async def emparejar(self, numero: int, jugadores: List, azar: random.Random):
+        """Todos buscan partida a la vez desde canales distintos; devuelve el canal donde se juega"""
+        bot, red = self.bot, self.red
+        canales = [red.canal(10**9 + numero * CANALES_POR_SERVIDOR + i, servidor_id=numero + 1)
+                   for i in range(CANALES_POR_SERVIDOR)]
+        inicio = time.perf_counter()
+        await asyncio.gather(*(self.comando(u, f"!mafia buscar {self.jugadores}", azar.choice(canales))
+                               for u in jugadores))
+        # La partida se crea en el turno de su canal, un poco después del último `buscar`
+        limite = inicio + 10
+        while str(jugadores[0].id) not in bot.partida_por_usuario:
+            if time.perf_counter() > limite:
+                return None
+            await asyncio.sleep(0.001)
+        self.esperas.append(time.perf_counter() - inicio)
+        return red.canal(int(bot.partida_por_usuario[str(jugadores[0].id)]))
+
+    async def noche(self, canal_id: str, azar: random.Random):
+        Rol = self.bot.Rol
+        vivos = self.vivos(canal_id)
+        mafiosos = self.con_rol(canal_id, Rol.MAFIOSO)
+        pueblo = [u for u in vivos if u not in mafiosos]
+        acciones = []
+        if pueblo:
+            victima = azar.choice(pueblo)
+            acciones += [self.comando(m, f"!matar {victima.mention}") for m in mafiosos]
+        for doctor in self.con_rol(canal_id, Rol.DOCTOR):
+            acciones.append(self.comando(doctor, f"!proteger {azar.choice(vivos).mention}"))
+        for detective in self.con_rol(canal_id, Rol.DETECTIVE):
+            sospechosos = [u for u in vivos if u is not detective]
+            if sospechosos:
+                acciones.append(self.comando(detective, f"!investigar {azar.choice(sospechosos).mention}"))
+        await asyncio.gather(*acciones)
+
+    async def votacion(self, canal_id: str, azar: random.Random):
+        vivos = self.vivos(canal_id)
+        # Casi todos siguen a uno de dos candidatos, así casi siempre hay linchamiento
+        candidatos = azar.sample(vivos, min(2, len(vivos)))
+        votos = []
+        for votante in vivos:
+            opciones = [u for u in candidatos if u is not votante] or [u for u in vivos if u is not votante]
+            if opciones:
+                votos.append(self.comando(votante, f"!votar {azar.choice(opciones).mention}"))
+        await asyncio.gather(*votos)
+
+
+async def ejecutar(args) -> Dict:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+
+    red = RedFalsa(latencia=args.latencia, limite_global=args.limite_global,
+                   limite_destino=args.limite_destino, prob_fallo=args.fallos,
+                   dm_cerrados=args.dm_cerrados, responder_429=args.responder_429, semilla=args.semilla)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    random.seed(args.semilla)  # El reparto de roles usa el módulo random
+    import mainnn as bot
+
+    await bot.client.conectar()
+    carga = Carga(bot, red, args.jugadores, args.semilla, buscar=args.buscar, barra=args.barra)
+    limite = asyncio.Semaphore(args.simultaneas)
+
+    async def jugar(numero: int):
+        async with limite:
+            await carga.partida(numero)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(jugar(n) for n in range(args.partidas)))
+    # Lo que aún esté saliendo (mensajes agrupados, DMs) también cuenta
+    while bot.envios_privados:
+        await asyncio.gather(*list(bot.envios_privados.values()))
+    await bot.salida.vaciar()
+    duracion = time.perf_counter() - inicio
+    bot.cerrar_almacenes()
+
+    latencias = sorted(carga.latencias)
+    llamadas = sum(red.llamadas.values())
+    resultado = {
+        "partidas": args.partidas,
+        "jugadores": args.partidas * args.jugadores,
+        "terminadas": carga.terminadas,
+        "atascadas": carga.atascadas,
+        "comandos": len(latencias),
+        "segundos": round(duracion, 3),
+        "comandos_por_segundo": round(len(latencias) / duracion, 1),
+        "p50_ms": round(percentil(latencias, 0.50) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 0.99) * 1000, 2),
+        "llamadas_por_partida": round(llamadas / max(1, args.partidas), 2),
+        "api": red.resumen(),
+    }
+    if args.buscar:
+        esperas = sorted(carga.esperas)
+        resultado["espera_p50_ms"] = round(percentil(esperas, 0.50) * 1000, 2)
+        resultado["espera_p99_ms"] = round(percentil(esperas, 0.99) * 1000, 2)
+    return resultado
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    def linea(clave: str, etiqueta: str):
+        valor = resultado[clave]
+        texto = f"{etiqueta:<24}{valor}"
+        if anterior and anterior.get(clave):
+            texto += f"  ({(valor - anterior[clave]) / anterior[clave]:+.1%})"
+        print(texto)
+
+    linea("partidas", "Partidas")
+    linea("terminadas", "Terminadas")
+    linea("comandos", "Comandos")
+    linea("segundos", "Duración (s)")
+    linea("comandos_por_segundo", "Comandos/s")
+    linea("p50_ms", "Latencia p50 (ms)")
+    linea("p99_ms", "Latencia p99 (ms)")
+    if "espera_p50_ms" in resultado:
+        linea("espera_p50_ms", "Espera en cola p50 (ms)")
+        linea("espera_p99_ms", "Espera en cola p99 (ms)")
+    linea("llamadas_por_partida", "Llamadas API/partida")
+    for ruta, cantidad in sorted(resultado["api"]["llamadas"].items()):
+        extra = [f"{resultado['api'][tipo].get(ruta, 0)} {tipo}" for tipo in ("limitadas", "fallidas")]
+        print(f"  {ruta:<22}{cantidad} ({', '.join(extra)})")
+    if resultado["atascadas"]:
+        print(f"⚠️ {resultado['atascadas']} partidas no terminaron en {MAX_RONDAS} rondas")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=500)
+    parser.add_argument("--jugadores", type=int, default=8, help="jugadores por partida")
+    parser.add_argument("--simultaneas", type=int, default=200, help="partidas jugándose a la vez")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--limite-global", type=int, default=50, help="peticiones por segundo")
+    parser.add_argument("--limite-destino", type=int, default=5, help="mensajes por destino cada 5 s")
+    parser.add_argument("--fallos", type=float, default=0.0, help="probabilidad de un 500 por petición")
+    parser.add_argument("--dm-cerrados", type=float, default=0.0, help="fracción de jugadores con DMs cerrados")
+    parser.add_argument("--responder-429", action="store_true",
+                        help="al pasar un límite, devolver 429 con Retry-After en vez de esperar")
+    parser.add_argument("--buscar", action="store_true", help="juntar a los jugadores con `!mafia buscar`")
+    parser.add_argument("--barra", action="store_true", help="jugar con comandos de barra (MODO_INTERACCION=barra)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    # Todo en un directorio temporal y sin plazos automáticos: las fases las avanza !siguiente
+    directorio = tempfile.mkdtemp(prefix="carga-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "MAX_PARTIDAS": str(max(1000, args.simultaneas * 2)),
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "barra" if args.barra else "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+
+    resultado = asyncio.run(ejecutar(args))
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0 if resultado["terminadas"] == args.partidas else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
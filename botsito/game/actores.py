@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+Orden = Callable[[], Awaitable[Any]]
+
+MAX_ORDENES = 64   # Órdenes en el buzón de una partida antes de rechazar más
+INACTIVIDAD = 60   # Segundos sin órdenes tras los que se libera el actor
+PREFIJO_TAREA = "partida-"  # Nombre de la tarea de cada actor: prefijo + clave
+
+
+class BuzonLleno(Exception):
+    """La partida tiene demasiadas órdenes pendientes"""
+
+
+class ActorDetenido(Exception):
+    """El actor de la partida terminó antes de ejecutar la orden"""
+
+
+class Actores:
+    """Un actor por partida: su buzón y una tarea que atiende las órdenes de una en una.
+
+    Todo lo que cambia una partida (comandos, plazos que vencen, expulsiones)
+    entra por su buzón, así que ninguna otra orden de la misma partida se
+    cuela en los `await` de en medio. Las partidas distintas siguen en
+    paralelo. El buzón es acotado: lleno, `ejecutar` rechaza la orden con
+    BuzonLleno (o espera turno con `esperar=True`) en vez de acumular
+    trabajo sin límite.
+
+    Una orden no debe esperar a otro actor (dos que se esperan se bloquean
+    para siempre): para tocar otra partida se usa `enviar`, que no espera.
+    """
+
+    def __init__(self, max_ordenes: int = MAX_ORDENES):
+        self.max_ordenes = max_ordenes
+        self.rechazadas = 0
+        self.en_curso: Dict[str, str] = {}  # {clave: descripción de la orden que se ejecuta}
+        self._buzones: Dict[str, asyncio.Queue] = {}
+        self._tareas: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tareas)
+
+    def pendientes(self) -> int:
+        """Órdenes en cola sumando todos los buzones"""
+        return sum(buzon.qsize() for buzon in self._buzones.values())
+
+    def ocupado(self, clave: str) -> bool:
+        """Si una orden nueva para `clave` tendría que esperar a otras"""
+        buzon = self._buzones.get(clave)
+        return clave in self.en_curso or (buzon is not None and not buzon.empty())
+
+    def _buzon(self, clave: str) -> asyncio.Queue:
+        buzon = self._buzones.get(clave)
+        if buzon is None:
+            buzon = self._buzones[clave] = asyncio.Queue(self.max_ordenes)
+            self._tareas[clave] = asyncio.create_task(self._atender(clave, buzon),
+                                                      name=PREFIJO_TAREA + clave)
+        return buzon
+
+    def _encolar(self, clave: str, orden: Orden, futuro: Optional[asyncio.Future], descripcion: str):
+        try:
+            self._buzon(clave).put_nowait((orden, futuro, descripcion))
+        except asyncio.QueueFull:
+            self.rechazadas += 1
+            raise BuzonLleno(clave) from None
+
+    async def ejecutar(self, clave: str, orden: Orden, esperar: bool = False, descripcion: str = "") -> Any:
+        """Ejecuta `orden` en el actor de `clave` y devuelve su resultado.
+
+        `descripcion` (p. ej. el comando) solo sirve para saber qué hacía la
+        partida si bloquea el bucle (ver bot/vigilancia.py).
+        """
+        if self._tareas.get(clave) is asyncio.current_task():
+            # Ya estamos dentro del actor: encolarla sería esperarse a sí mismo
+            return await orden()
+
+        futuro = asyncio.get_running_loop().create_future()
+        if esperar:
+            await self._buzon(clave).put((orden, futuro, descripcion))
+        else:
+            self._encolar(clave, orden, futuro, descripcion)
+        return await futuro
+
+    def enviar(self, clave: str, orden: Orden, descripcion: str = "") -> bool:
+        """Encola `orden` sin esperarla (sus errores solo se registran); False si no cabe"""
+        try:
+            self._encolar(clave, orden, None, descripcion)
+        except BuzonLleno:
+            log.warning("Buzón lleno, orden descartada", extra={"canal_id": clave})
+            return False
+        return True
+
+    async def _atender(self, clave: str, buzon: asyncio.Queue):
+        tarea = asyncio.current_task()
+        futuro: Optional[asyncio.Future] = None
+        try:
+            while True:
+                futuro = None
+                try:
+                    async with asyncio.timeout(INACTIVIDAD):
+                        orden, futuro, descripcion = await buzon.get()
+                except TimeoutError:
+                    # Una orden encolada en la misma vuelta del bucle que el plazo sigue en el buzón
+                    if not buzon.empty():
+                        continue
+                    return
+
+                if futuro is not None and futuro.cancelled():
+                    continue  # Quien la pidió ya no la espera
+                self.en_curso[clave] = descripcion
+                try:
+                    resultado = await orden()
+                except BaseException as e:
+                    if isinstance(e, asyncio.CancelledError) and tarea.cancelling():
+                        raise  # Cancelan el actor, no la orden
+                    if futuro is None:
+                        log.error("Error en una orden de la partida", exc_info=e, extra={"canal_id": clave})
+                    elif not futuro.done():
+                        if isinstance(e, asyncio.CancelledError):
+                            futuro.cancel()  # Se canceló algo que la orden esperaba
+                        else:
+                            futuro.set_exception(e)
+                    if not isinstance(e, (Exception, asyncio.CancelledError)):
+                        raise  # KeyboardInterrupt y SystemExit paran el programa, no solo la orden
+                else:
+                    if futuro is not None and not futuro.done():
+                        futuro.set_result(resultado)
+                finally:
+                    self.en_curso.pop(clave, None)
+        finally:
+            # Acabe como acabe, el actor se da de baja y nadie se queda esperando una orden que no llegará
+            if self._tareas.get(clave) is tarea:
+                del self._tareas[clave]
+                del self._buzones[clave]
+            pendientes = [futuro] if futuro is not None else []
+            while not buzon.empty():
+                pendientes.append(buzon.get_nowait()[1])
+            for pendiente in pendientes:
+                if pendiente is not None and not pendiente.done():
+                    pendiente.set_exception(ActorDetenido(clave))
+
+    def describir(self, tarea: Optional[asyncio.Task]) -> Dict[str, str]:
+        """Partida y orden que ejecuta `tarea` si es la de un actor ({} si no).
+
+        Se puede llamar desde otro hilo: solo lee el nombre de la tarea y un dict.
+        """
+        nombre = tarea.get_name() if tarea is not None else ""
+        if not nombre.startswith(PREFIJO_TAREA):
+            return {}
+        clave = nombre[len(PREFIJO_TAREA):]
+        return {"canal_id": clave, "comando": self.en_curso.get(clave, "")}
+
+    def detener(self):
+        """Cancela todos los actores; quien esperaba una orden pendiente recibe ActorDetenido"""
+        for tarea in self._tareas.values():
+            tarea.cancel()
+        self._buzones.clear()
+        self._tareas.clear()
+        self.en_curso.clear()
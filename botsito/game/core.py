@@ -0,0 +1,311 @@
+"""Reglas de la Mafia sin Discord: fases, votos, reparto de roles y fin de partida.
+
+Aquí no hay E/S ni asyncio. Cada transición de una partida es una función
+que recibe su estado (el dict de la partida y el plantel, que no se tocan) y
+devuelve un Paso: la partida nueva, quién muere y los efectos que mainnn.py
+tiene que llevar a cabo (avisos por Discord, el diario, los plazos).
+game/simulador.py juega con las mismas reglas partidas enteras sin conexión.
+"""
+import random
+from enum import Enum, auto
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from game.jugadores import Bando, Plantel, Rol, bando_del_rol
+from game.votos import Desempate, Recuento
+
+MINIMO_JUGADORES = 4
+
+Reparto = Dict[Rol, int]  # {rol: cantidad}, sin contar a los ciudadanos
+
+
+class FaseJuego(Enum):
+    ESPERANDO = auto()
+    NOCHE = auto()
+    DIA = auto()
+    VOTACION = auto()
+
+
+# Noche -> día -> votación -> noche, hasta que un bando gana
+SIGUIENTE_FASE = {
+    FaseJuego.ESPERANDO: FaseJuego.NOCHE,
+    FaseJuego.NOCHE: FaseJuego.DIA,
+    FaseJuego.DIA: FaseJuego.VOTACION,
+    FaseJuego.VOTACION: FaseJuego.NOCHE,
+}
+
+
+def reparto_por_defecto(num_jugadores: int) -> Reparto:
+    """Un mafioso por cada 4 jugadores, un doctor y un detective"""
+    return {Rol.MAFIOSO: max(1, num_jugadores // 4), Rol.DOCTOR: 1, Rol.DETECTIVE: 1}
+
+
+def reparto_roles(num_jugadores: int, tabla: Optional[Dict[int, Reparto]] = None) -> Reparto:
+    """Reparto recomendado para `num_jugadores` (el de siempre si la tabla no lo tiene)"""
+    if tabla and num_jugadores in tabla:
+        return dict(tabla[num_jugadores])
+    return reparto_por_defecto(num_jugadores)
+
+
+def lista_roles(num_jugadores: int, tabla: Optional[Dict[int, Reparto]] = None,
+                azar: random.Random = random) -> List[Rol]:
+    """Un rol por jugador, ya mezclados; los que sobran son ciudadanos"""
+    roles: List[Rol] = []
+    for rol, cantidad in reparto_roles(num_jugadores, tabla).items():
+        roles.extend([rol] * cantidad)
+    roles = roles[:num_jugadores]
+    roles.extend([Rol.CIUDADANO] * (num_jugadores - len(roles)))
+    azar.shuffle(roles)
+    return roles
+
+
+def ganador(mafiosos_vivos: int, resto_vivos: int) -> Optional[Bando]:
+    """La mafia gana si iguala en número al resto; el pueblo, si no queda mafia"""
+    if mafiosos_vivos >= resto_vivos:
+        return Bando.MAFIA
+    if mafiosos_vivos == 0:
+        return Bando.PUEBLO
+    return None
+
+
+def ganador_del_plantel(jugadores: Plantel) -> Optional[Bando]:
+    """Tiempo constante: el plantel lleva la cuenta de vivos por bando"""
+    return ganador(jugadores.num_vivos_del_bando(Bando.MAFIA), jugadores.num_vivos_del_bando(Bando.PUEBLO))
+
+
+def victima_de_la_noche(victima_id: Optional[str], protegido_id: Optional[str]) -> Optional[str]:
+    """A quién mata la mafia esta noche: a nadie si el doctor protegió a su objetivo"""
+    if victima_id is None or victima_id == protegido_id:
+        return None
+    return victima_id
+
+
+def ganador_tras_muertes(jugadores: Plantel, muertos: Tuple[str, ...]) -> Optional[Bando]:
+    """Como ganador_del_plantel, contando ya como muertos a `muertos` (sin tocar el plantel)"""
+    mafiosos = jugadores.num_vivos_del_bando(Bando.MAFIA)
+    resto = jugadores.num_vivos_del_bando(Bando.PUEBLO)
+    for jugador_id in muertos:
+        if bando_del_rol(jugadores.obtener(jugador_id).rol) == Bando.MAFIA:
+            mafiosos -= 1
+        else:
+            resto -= 1
+    return ganador(mafiosos, resto)
+
+
+# Efectos: lo que mainnn.py tiene que hacer tras cada paso, en orden
+
+class Guardar(NamedTuple):
+    """Anotar en el diario la partida tal como quedó tras `evento`"""
+    evento: str
+    partida: Dict
+
+
+class Plazo(NamedTuple):
+    """Programar el fin de `fase`: al cumplir su duración o, con `ya`, en cuanto se pueda"""
+    fase: FaseJuego
+    ya: bool = False
+
+
+class Anochecer(NamedTuple):
+    """Anunciar la noche y mandar a cada rol sus instrucciones"""
+
+
+class VotoRegistrado(NamedTuple):
+    """Confirmar al votante su voto de la noche (matar) o de la votación (linchar)"""
+    votante_id: str
+    objetivo_id: str
+    fase: FaseJuego
+
+
+class DecisionMafia(NamedTuple):
+    """Contar a los mafiosos a quién matan (None: empate sin víctima)"""
+    victima_id: Optional[str]
+
+
+class Amanecer(NamedTuple):
+    """Anunciar cómo acabó la noche: la víctima, o si el doctor la salvó"""
+    victima_id: Optional[str]
+    atacado: bool
+
+
+class VotacionAbierta(NamedTuple):
+    """Anunciar la votación con la lista de vivos"""
+
+
+class Linchamiento(NamedTuple):
+    victima_id: str
+
+
+class SinLinchamiento(NamedTuple):
+    empate: bool  # False: nadie recibió votos
+
+
+class FinPartida(NamedTuple):
+    """Anunciar al ganador, registrar el resultado y liberar la partida"""
+    ganador: Bando
+
+
+Efecto = Union[Guardar, Plazo, Anochecer, VotoRegistrado, DecisionMafia, Amanecer,
+               VotacionAbierta, Linchamiento, SinLinchamiento, FinPartida]
+
+
+class Paso(NamedTuple):
+    """Resultado de una transición: la partida nueva, los muertos y los efectos"""
+    partida: Dict
+    efectos: List[Efecto]
+    muertos: Tuple[str, ...] = ()
+
+    @property
+    def terminada(self) -> bool:
+        return any(isinstance(efecto, FinPartida) for efecto in self.efectos)
+
+
+def encadenar(primero: Paso, segundo: Paso) -> Paso:
+    """Un paso seguido de otro que parte de la partida que dejó el primero"""
+    return Paso(segundo.partida, primero.efectos + segundo.efectos, primero.muertos + segundo.muertos)
+
+
+def _con(partida: Dict, **cambios) -> Dict:
+    """Copia de la partida con `cambios` (la original no se toca)"""
+    nueva = dict(partida)
+    nueva.update(cambios)
+    return nueva
+
+
+def _fin_si_gana(jugadores: Plantel, muertos: Tuple[str, ...]) -> List[Efecto]:
+    bando = ganador_tras_muertes(jugadores, muertos)
+    return [] if bando is None else [FinPartida(bando)]
+
+
+def iniciar_noche(partida: Dict, desempate: Desempate) -> Paso:
+    nueva = _con(partida, estado=FaseJuego.NOCHE, victima_noche=None, protegido=None,
+                 investigado=None, votos_matar=Recuento(desempate))
+    return Paso(nueva, [Guardar("noche", nueva), Plazo(FaseJuego.NOCHE), Anochecer()])
+
+
+def noche_completa(partida: Dict, jugadores: Plantel) -> bool:
+    """Si ya actuaron la mafia, el doctor y el detective (no hace falta esperar al plazo)"""
+    if len(partida["votos_matar"]) < jugadores.num_vivos_con_rol(Rol.MAFIOSO):
+        return False
+    if jugadores.num_vivos_con_rol(Rol.DOCTOR) and partida.get("protegido") is None:
+        return False
+    if jugadores.num_vivos_con_rol(Rol.DETECTIVE) and partida.get("investigado") is None:
+        return False
+    return True
+
+
+def _acciones_de_noche(nueva: Dict, jugadores: Plantel, evento: str) -> List[Efecto]:
+    efectos: List[Efecto] = [Guardar(evento, nueva)]
+    if noche_completa(nueva, jugadores):
+        efectos.append(Plazo(FaseJuego.NOCHE, ya=True))
+    return efectos
+
+
+def votar_matar(partida: Dict, jugadores: Plantel, mafioso_id: str,
+                victima_id: Optional[str]) -> Optional[Paso]:
+    """Voto de un mafioso vivo contra alguien vivo que no es de la mafia (None si no vale)"""
+    if partida["estado"] != FaseJuego.NOCHE:
+        return None
+    mafioso = jugadores.obtener(mafioso_id)
+    if not mafioso or mafioso.rol != Rol.MAFIOSO or not mafioso.vivo:
+        return None
+    victima = jugadores.obtener(victima_id) if victima_id else None
+    if not victima or not victima.vivo or victima.rol == Rol.MAFIOSO:
+        return None
+
+    votos = partida["votos_matar"].copia()
+    votos.votar(mafioso_id, victima.id)
+    nueva = _con(partida, votos_matar=votos)
+    efectos: List[Efecto] = [VotoRegistrado(mafioso_id, victima.id, FaseJuego.NOCHE)]
+    # Cuando han votado todos se decide la víctima (los empates según el desempate del recuento)
+    if len(votos) == jugadores.num_vivos_con_rol(Rol.MAFIOSO):
+        nueva["victima_noche"] = votos.ganador()
+        efectos.append(DecisionMafia(nueva["victima_noche"]))
+    return Paso(nueva, efectos + _acciones_de_noche(nueva, jugadores, "voto_matar"))
+
+
+def proteger(partida: Dict, jugadores: Plantel, protegido_id: Optional[str]) -> Optional[Paso]:
+    """El doctor protege a alguien vivo; puede cambiar de idea hasta que termine la noche"""
+    protegido = jugadores.obtener(protegido_id) if protegido_id else None
+    if partida["estado"] != FaseJuego.NOCHE or not protegido or not protegido.vivo:
+        return None
+    nueva = _con(partida, protegido=protegido.id)
+    return Paso(nueva, _acciones_de_noche(nueva, jugadores, "proteger"))
+
+
+def investigar(partida: Dict, jugadores: Plantel, detective_id: str,
+               investigado_id: Optional[str]) -> Optional[Paso]:
+    """El detective investiga a otro jugador vivo, una vez por noche"""
+    if partida["estado"] != FaseJuego.NOCHE or partida.get("investigado"):
+        return None
+    investigado = jugadores.obtener(investigado_id) if investigado_id else None
+    if not investigado or not investigado.vivo or investigado.id == detective_id:
+        return None
+    nueva = _con(partida, investigado=investigado.id)
+    return Paso(nueva, _acciones_de_noche(nueva, jugadores, "investigar"))
+
+
+def resolver_noche(partida: Dict, jugadores: Plantel) -> Paso:
+    """Amanece: muere la víctima de la mafia (si el doctor no la salvó) y empieza el día"""
+    victima_id = victima_de_la_noche(partida["victima_noche"], partida.get("protegido"))
+    muertos = (victima_id,) if victima_id else ()
+    nueva = _con(partida, estado=SIGUIENTE_FASE[FaseJuego.NOCHE])
+    efectos: List[Efecto] = [Guardar("dia", nueva), Plazo(nueva["estado"]),
+                             Amanecer(victima_id, partida["victima_noche"] is not None)]
+    return Paso(nueva, efectos + _fin_si_gana(jugadores, muertos), muertos)
+
+
+def iniciar_votacion(partida: Dict, desempate: Desempate) -> Paso:
+    nueva = _con(partida, estado=FaseJuego.VOTACION, votos_lynch=Recuento(desempate))
+    return Paso(nueva, [Guardar("votacion", nueva), Plazo(FaseJuego.VOTACION), VotacionAbierta()])
+
+
+def votar_linchar(partida: Dict, jugadores: Plantel, votante_id: str,
+                  votado_id: Optional[str]) -> Optional[Paso]:
+    """Voto de un jugador vivo contra otro jugador vivo (None si no vale)"""
+    if partida["estado"] != FaseJuego.VOTACION:
+        return None
+    votante = jugadores.obtener(votante_id)
+    votado = jugadores.obtener(votado_id) if votado_id else None
+    if not votante or not votante.vivo or not votado or not votado.vivo or votado.id == votante_id:
+        return None
+
+    votos = partida["votos_lynch"].copia()
+    votos.votar(votante_id, votado.id)
+    nueva = _con(partida, votos_lynch=votos)
+    efectos: List[Efecto] = [Guardar("voto_lynch", nueva)]
+    # Con mayoría absoluta el resultado ya no puede cambiar: se cierra la votación
+    if votos.mayoria(jugadores.num_vivos()):
+        efectos.append(Plazo(FaseJuego.VOTACION, ya=True))
+    efectos.append(VotoRegistrado(votante_id, votado.id, FaseJuego.VOTACION))
+    return Paso(nueva, efectos)
+
+
+def resolver_votacion(partida: Dict, jugadores: Plantel) -> Paso:
+    """Lincha al más votado (los empates según el desempate del recuento)"""
+    votos = partida["votos_lynch"]
+    victima_id = votos.ganador()
+    if victima_id is None:
+        return Paso(partida, [SinLinchamiento(votos.empate)])
+    muertos = (victima_id,)
+    efectos: List[Efecto] = [Guardar("linchamiento", partida), Linchamiento(victima_id)]
+    return Paso(partida, efectos + _fin_si_gana(jugadores, muertos), muertos)
+
+
+def avanzar(partida: Dict, jugadores: Plantel, desempate_noche: Desempate,
+            desempate_dia: Desempate) -> Paso:
+    """De la fase actual a la de SIGUIENTE_FASE (al vencer el plazo o con !siguiente)"""
+    actual = partida["estado"]
+    if actual == FaseJuego.ESPERANDO:
+        return Paso(partida, [])  # La sala empieza sola al llenarse
+    paso = Paso(partida, [])
+    if actual == FaseJuego.VOTACION:
+        paso = resolver_votacion(partida, jugadores)
+        if paso.terminada:
+            return paso
+
+    siguiente = SIGUIENTE_FASE[actual]
+    if siguiente == FaseJuego.NOCHE:
+        return encadenar(paso, iniciar_noche(paso.partida, desempate_noche))
+    if siguiente == FaseJuego.DIA:
+        return resolver_noche(partida, jugadores)
+    return iniciar_votacion(partida, desempate_dia)
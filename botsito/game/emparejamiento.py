@@ -0,0 +1,147 @@
+import heapq
+import time
+from itertools import islice
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class Solicitud(NamedTuple):
+    """Un jugador esperando partida"""
+    jugador_id: str
+    nombre: str
+    canal_id: str      # Desde donde la pidió (allí se le avisa)
+    servidor_id: str
+    tamano: int        # Jugadores que prefiere
+    idioma: str
+    llegada: float
+
+
+ClaveCubo = Tuple[str, int, str]  # (servidor_id, tamano, idioma)
+
+
+def clave_cubo(solicitud: Solicitud) -> ClaveCubo:
+    return solicitud.servidor_id, solicitud.tamano, solicitud.idioma
+
+
+class Emparejador:
+    """Cola de emparejamiento que forma salas con jugadores de cualquier canal.
+
+    Cada solicitud va a un cubo según servidor, tamaño preferido e idioma.
+    Los cubos son dicts en orden de llegada: encolar, cancelar y sacar una
+    sala cuestan O(1) por jugador, sin recorrer la cola. En cuanto un cubo
+    junta `tamano` solicitudes salen las más antiguas como una sala.
+
+    Ninguna solicitud espera más de `espera` segundos: los vencimientos van
+    en un montículo, como en el Planificador, y las entradas de solicitudes
+    ya atendidas no se buscan, se descartan al llegar arriba. Al vencer una,
+    su cubo sale como una sala más pequeña si tiene al menos `minimo`
+    jugadores; si no, la solicitud caduca.
+    """
+
+    def __init__(self, espera: float, minimo: int, reloj: Callable[[], float] = time.monotonic):
+        self.espera = espera
+        self.minimo = minimo
+        self.reloj = reloj
+        self.salas = 0      # Formadas desde el arranque
+        self.caducadas = 0
+        self._cubos: Dict[ClaveCubo, Dict[str, Solicitud]] = {}
+        self._solicitudes: Dict[str, Solicitud] = {}  # {jugador_id: solicitud}
+        self._vencimientos: List[Tuple[float, str, float]] = []  # Montículo [(vence, jugador_id, llegada)]
+
+    def __len__(self) -> int:
+        return len(self._solicitudes)
+
+    def __contains__(self, jugador_id: str) -> bool:
+        return jugador_id in self._solicitudes
+
+    def en_cubo(self, solicitud: Solicitud) -> int:
+        """Cuántos esperan en el cubo de la solicitud"""
+        return len(self._cubos.get(clave_cubo(solicitud), ()))
+
+    def encolar(self, solicitud: Solicitud) -> Optional[List[Solicitud]]:
+        """Añade la solicitud (reemplaza la anterior del jugador) y devuelve la sala si se llenó"""
+        self.cancelar(solicitud.jugador_id)
+        clave = clave_cubo(solicitud)
+        cubo = self._cubos.setdefault(clave, {})
+        cubo[solicitud.jugador_id] = solicitud
+        self._solicitudes[solicitud.jugador_id] = solicitud
+        self._vencer_en(solicitud)
+        if len(cubo) >= solicitud.tamano:
+            return self._sacar(clave, solicitud.tamano)
+        return None
+
+    def _vencer_en(self, solicitud: Solicitud):
+        heapq.heappush(self._vencimientos, (solicitud.llegada + self.espera, solicitud.jugador_id, solicitud.llegada))
+
+    def cancelar(self, jugador_id: str) -> Optional[Solicitud]:
+        """Saca al jugador de la cola; devuelve su solicitud si estaba"""
+        solicitud = self._solicitudes.pop(jugador_id, None)
+        if solicitud is not None:
+            clave = clave_cubo(solicitud)
+            cubo = self._cubos[clave]
+            del cubo[jugador_id]
+            if not cubo:
+                del self._cubos[clave]
+        return solicitud
+
+    def _sacar(self, clave: ClaveCubo, cuantas: int) -> List[Solicitud]:
+        """Saca las `cuantas` solicitudes más antiguas del cubo como una sala"""
+        cubo = self._cubos[clave]
+        sala = [cubo[jugador_id] for jugador_id in list(islice(cubo, cuantas))]
+        for solicitud in sala:
+            del cubo[solicitud.jugador_id]
+            del self._solicitudes[solicitud.jugador_id]
+        if not cubo:
+            del self._cubos[clave]
+        self.salas += 1
+        return sala
+
+    def devolver(self, sala: List[Solicitud], ahora: Optional[float] = None) -> List[Solicitud]:
+        """Vuelve a poner al principio de su cubo una sala que no se pudo jugar.
+
+        Conservan su turno y su plazo; devuelve las que ya habían vencido
+        (esas caducan en vez de volver a la cola).
+        """
+        ahora = self.reloj() if ahora is None else ahora
+        vencidas = [s for s in sala if s.llegada + self.espera <= ahora]
+        self.caducadas += len(vencidas)
+        por_cubo: Dict[ClaveCubo, Dict[str, Solicitud]] = {}
+        for solicitud in sala:
+            if solicitud.llegada + self.espera > ahora and solicitud.jugador_id not in self._solicitudes:
+                por_cubo.setdefault(clave_cubo(solicitud), {})[solicitud.jugador_id] = solicitud
+                self._solicitudes[solicitud.jugador_id] = solicitud
+                # Su vencimiento pudo descartarse mientras estaba fuera; si sigue, sobra uno
+                self._vencer_en(solicitud)
+        for clave, primeras in por_cubo.items():
+            primeras.update(self._cubos.get(clave, {}))
+            self._cubos[clave] = primeras
+        return vencidas
+
+    def _limpiar_cima(self):
+        """Quita de la cima los vencimientos de solicitudes ya atendidas o reemplazadas"""
+        while self._vencimientos:
+            _, jugador_id, llegada = self._vencimientos[0]
+            solicitud = self._solicitudes.get(jugador_id)
+            if solicitud is not None and solicitud.llegada == llegada:
+                return
+            heapq.heappop(self._vencimientos)
+
+    def proximo_vencimiento(self) -> Optional[float]:
+        self._limpiar_cima()
+        return self._vencimientos[0][0] if self._vencimientos else None
+
+    def vencer(self, ahora: Optional[float] = None) -> Tuple[List[List[Solicitud]], List[Solicitud]]:
+        """Atiende las solicitudes cuyo plazo pasó: (salas incompletas formadas, caducadas)"""
+        ahora = self.reloj() if ahora is None else ahora
+        salas: List[List[Solicitud]] = []
+        caducadas: List[Solicitud] = []
+        while True:
+            self._limpiar_cima()
+            if not self._vencimientos or self._vencimientos[0][0] > ahora:
+                return salas, caducadas
+            _, jugador_id, _ = heapq.heappop(self._vencimientos)
+            clave = clave_cubo(self._solicitudes[jugador_id])
+            if len(self._cubos[clave]) >= self.minimo:
+                salas.append(self._sacar(clave, len(self._cubos[clave])))
+            else:
+                caducadas.append(self.cancelar(jugador_id))
+                self.caducadas += 1
@@ -0,0 +1,237 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MAX_LOTE = 200   # Partidas por transacción como máximo
+TOP_RANKING = 10
+
+_FIN = object()  # Señal para que el hilo escritor termine
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS partidas_terminadas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        canal_id TEXT NOT NULL,
+        ganador TEXT NOT NULL,
+        terminada REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS resultados (
+        partida INTEGER NOT NULL REFERENCES partidas_terminadas(id),
+        jugador_id TEXT NOT NULL,
+        rol TEXT NOT NULL,
+        gano INTEGER NOT NULL,
+        sobrevivio INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS jugadores (
+        jugador_id TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        partidas INTEGER NOT NULL,
+        victorias INTEGER NOT NULL,
+        supervivencias INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS jugadores_por_victorias ON jugadores (victorias DESC, partidas);
+    CREATE TABLE IF NOT EXISTS por_rol (
+        jugador_id TEXT NOT NULL,
+        rol TEXT NOT NULL,
+        partidas INTEGER NOT NULL,
+        victorias INTEGER NOT NULL,
+        supervivencias INTEGER NOT NULL,
+        PRIMARY KEY (jugador_id, rol)
+    ) WITHOUT ROWID;
+"""
+
+
+class Resultado(NamedTuple):
+    """Cómo le fue a un jugador en una partida terminada"""
+    jugador_id: str
+    nombre: str
+    rol: str
+    gano: bool
+    sobrevivio: bool
+
+
+class Totales(NamedTuple):
+    partidas: int
+    victorias: int
+    supervivencias: int
+
+
+class FichaJugador(NamedTuple):
+    nombre: str
+    totales: Totales
+    por_rol: Dict[str, Totales]
+
+
+class Estadisticas:
+    """Historial de partidas terminadas y contadores por jugador en SQLite.
+
+    Al terminar una partida se encola su resultado; un hilo escribe los que
+    se hayan juntado en una sola transacción. En esa misma transacción se
+    suman a los contadores de cada jugador (totales y por rol), así que las
+    consultas leen una fila por clave primaria y el ranking sale de un
+    índice sobre las victorias, sin recorrer el historial.
+
+    El ranking se guarda en memoria y solo se vuelve a leer cuando el hilo
+    ha escrito algo nuevo.
+
+    No toca el disco hasta que se usa: el hilo arranca con la primera partida
+    terminada y la base se abre (y se crea) con la primera conexión.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.escritas = 0  # Partidas escritas desde el arranque
+        self._cola: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._version = 0  # Sube con cada lote escrito
+        self._ranking: Optional[Tuple[int, int, List[Tuple[str, Totales]]]] = None  # (versión, n, filas)
+        self._lectura: Optional[sqlite3.Connection] = None
+        self._cerrojo_lectura = threading.Lock()
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        # Perder el último lote si se va la luz no es grave: no hace falta fsync en cada commit
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript(ESQUEMA)
+        return conexion
+
+    def iniciar(self):
+        """Arranca el hilo escritor"""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._escribir, name="estadisticas", daemon=True)
+            self._hilo.start()
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._hilo is not None:
+            self._cola.put(_FIN)
+            self._hilo.join()
+            self._hilo = None
+        if self._lectura is not None:
+            self._lectura.close()
+            self._lectura = None
+
+    def registrar(self, canal_id: str, ganador: str, resultados: List[Resultado]):
+        """Encola el resultado de una partida terminada (no bloquea)"""
+        self._cola.put((canal_id, ganador, time.time(), resultados))
+        self.iniciar()
+
+    def pendientes(self) -> int:
+        """Partidas encoladas que el hilo aún no ha escrito"""
+        return self._cola.qsize()
+
+    def _escribir(self):
+        conexion = self._conectar()
+        terminar = False
+        while not terminar:
+            lote = [self._cola.get()]
+            while len(lote) < MAX_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            if _FIN in lote:
+                terminar = True
+                lote = [p for p in lote if p is not _FIN]
+            if not lote:
+                continue
+            try:
+                self.guardar_lote(conexion, lote)
+            except sqlite3.Error:
+                log.exception("No se pudieron guardar las estadísticas de %d partidas", len(lote))
+        conexion.close()
+
+    def guardar_lote(self, conexion: sqlite3.Connection, lote: List[tuple]):
+        """Escribe partidas [(canal_id, ganador, instante, resultados)] en una transacción"""
+        jugadores: Dict[str, list] = {}  # {jugador_id: [nombre, partidas, victorias, supervivencias]}
+        por_rol: Dict[Tuple[str, str], list] = {}
+        with conexion:
+            for canal_id, ganador, instante, resultados in lote:
+                partida = conexion.execute(
+                    "INSERT INTO partidas_terminadas (canal_id, ganador, terminada) VALUES (?, ?, ?)",
+                    (canal_id, ganador, instante)
+                ).lastrowid
+                conexion.executemany(
+                    "INSERT INTO resultados (partida, jugador_id, rol, gano, sobrevivio) VALUES (?, ?, ?, ?, ?)",
+                    [(partida, r.jugador_id, r.rol, r.gano, r.sobrevivio) for r in resultados]
+                )
+                # Los contadores se suman primero en memoria: una fila por jugador y lote
+                for r in resultados:
+                    jugador = jugadores.setdefault(r.jugador_id, [r.nombre, 0, 0, 0])
+                    jugador[0] = r.nombre  # Se queda el nombre más reciente
+                    self._sumar(jugador, 1, r)
+                    self._sumar(por_rol.setdefault((r.jugador_id, r.rol), [0, 0, 0]), 0, r)
+
+            conexion.executemany(
+                "INSERT INTO jugadores (jugador_id, nombre, partidas, victorias, supervivencias) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (jugador_id) DO UPDATE SET "
+                "nombre = excluded.nombre, partidas = partidas + excluded.partidas, "
+                "victorias = victorias + excluded.victorias, "
+                "supervivencias = supervivencias + excluded.supervivencias",
+                [(jugador_id, *fila) for jugador_id, fila in jugadores.items()]
+            )
+            conexion.executemany(
+                "INSERT INTO por_rol (jugador_id, rol, partidas, victorias, supervivencias) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (jugador_id, rol) DO UPDATE SET "
+                "partidas = partidas + excluded.partidas, victorias = victorias + excluded.victorias, "
+                "supervivencias = supervivencias + excluded.supervivencias",
+                [(jugador_id, rol, *fila) for (jugador_id, rol), fila in por_rol.items()]
+            )
+        self.escritas += len(lote)
+        self._version += 1
+
+    @staticmethod
+    def _sumar(fila: list, inicio: int, resultado: Resultado):
+        fila[inicio] += 1
+        fila[inicio + 1] += resultado.gano
+        fila[inicio + 2] += resultado.sobrevivio
+
+    def _consultar(self, sql: str, parametros: tuple = ()) -> list:
+        with self._cerrojo_lectura:
+            if self._lectura is None:
+                self._lectura = self._conectar()
+            return self._lectura.execute(sql, parametros).fetchall()
+
+    def ficha(self, jugador_id: str) -> Optional[FichaJugador]:
+        """Contadores de un jugador (None si no ha terminado ninguna partida). Bloquea"""
+        filas = self._consultar(
+            "SELECT nombre, partidas, victorias, supervivencias FROM jugadores WHERE jugador_id = ?",
+            (jugador_id,)
+        )
+        if not filas:
+            return None
+        nombre, *totales = filas[0]
+        por_rol = {
+            rol: Totales(*cuentas) for rol, *cuentas in self._consultar(
+                "SELECT rol, partidas, victorias, supervivencias FROM por_rol WHERE jugador_id = ?",
+                (jugador_id,)
+            )
+        }
+        return FichaJugador(nombre, Totales(*totales), por_rol)
+
+    def ranking(self, n: int = TOP_RANKING) -> List[Tuple[str, Totales]]:
+        """Los `n` jugadores con más victorias [(nombre, totales)]. Bloquea si no está en memoria"""
+        guardado = self.ranking_en_memoria(n)
+        if guardado is not None:
+            return guardado
+        version = self._version  # Antes de leer: si el hilo escribe mientras, se volverá a leer
+        filas = [
+            (nombre, Totales(*totales)) for nombre, *totales in self._consultar(
+                "SELECT nombre, partidas, victorias, supervivencias FROM jugadores "
+                "ORDER BY victorias DESC, partidas LIMIT ?", (n,)
+            )
+        ]
+        self._ranking = (version, n, filas)
+        return filas
+
+    def ranking_en_memoria(self, n: int = TOP_RANKING) -> Optional[List[Tuple[str, Totales]]]:
+        """El ranking si está al día en memoria (no bloquea); None si hay que leerlo"""
+        guardado = self._ranking
+        if guardado is not None and guardado[0] == self._version and guardado[1] >= n:
+            return guardado[2][:n]
+        return None
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+
+class RegistroActividad:
+    """Última actividad de cada partida, ordenada de la más antigua a la más reciente.
+
+    Tocar una partida la mueve al final, así que tanto las inactivas como las
+    que sobran por presupuesto (LRU) están siempre al principio y buscarlas
+    no obliga a recorrer todas.
+    """
+
+    def __init__(self, reloj: Callable[[], float] = time.monotonic):
+        self.reloj = reloj
+        self._ultima: "OrderedDict[str, float]" = OrderedDict()  # {clave: instante}
+
+    def __len__(self) -> int:
+        return len(self._ultima)
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in self._ultima
+
+    def tocar(self, clave: str):
+        self._ultima[clave] = self.reloj()
+        self._ultima.move_to_end(clave)
+
+    def olvidar(self, clave: str):
+        self._ultima.pop(clave, None)
+
+    def segundos_inactiva(self, clave: str, ahora: Optional[float] = None) -> float:
+        """Tiempo desde la última actividad de la clave (0 si no está)"""
+        instante = self._ultima.get(clave)
+        if instante is None:
+            return 0.0
+        return (self.reloj() if ahora is None else ahora) - instante
+
+    def inactivas(self, ttl_de: Callable[[str], float], ttl_minimo: float,
+                  ahora: Optional[float] = None) -> List[str]:
+        """Claves que llevan sin actividad más que su TTL (`ttl_de(clave)`).
+
+        Se recorre desde la más antigua y se para en la primera que aún no
+        lleva `ttl_minimo` inactiva: las siguientes son más recientes.
+        """
+        ahora = self.reloj() if ahora is None else ahora
+        caducadas = []
+        for clave, instante in self._ultima.items():
+            inactiva = ahora - instante
+            if inactiva < ttl_minimo:
+                break
+            if inactiva >= ttl_de(clave):
+                caducadas.append(clave)
+        return caducadas
+
+    def sobrantes(self, maximo: int) -> List[str]:
+        """Las claves menos recientes que exceden el máximo permitido"""
+        exceso = len(self._ultima) - maximo
+        if exceso <= 0:
+            return []
+        claves = iter(self._ultima)
+        return [next(claves) for _ in range(exceso)]
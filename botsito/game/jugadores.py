@@ -0,0 +1,193 @@
+import os
+import unicodedata
+from bisect import bisect_left, insort
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class Rol(Enum):
+    MAFIOSO = "Mafioso"
+    CIUDADANO = "Ciudadano"
+    DOCTOR = "Doctor"
+    DETECTIVE = "Detective"
+
+
+class Bando(Enum):
+    MAFIA = "Mafia"
+    PUEBLO = "Pueblo"
+
+
+def bando_del_rol(rol: Rol) -> Bando:
+    return Bando.MAFIA if rol == Rol.MAFIOSO else Bando.PUEBLO
+
+
+# Con COMPROBAR_INVARIANTES=1 cada cambio del plantel recalcula los contadores
+# desde cero y falla si no cuadran (lento: solo para depurar o en pruebas)
+COMPROBAR_INVARIANTES = bool(os.getenv('COMPROBAR_INVARIANTES'))
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Pasa un nombre a minúsculas y sin tildes para poder compararlo"""
+    descompuesto = unicodedata.normalize("NFKD", nombre.strip().lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class Jugador:
+    """Un jugador dentro de una partida"""
+    __slots__ = ("id", "nombre", "rol", "vivo")
+
+    def __init__(self, id: str, nombre: str):
+        self.id = id
+        self.nombre = nombre
+        self.rol: Optional[Rol] = None
+        self.vivo = True
+
+    def __repr__(self):
+        return f"Jugador({self.id!r}, {self.nombre!r}, {self.rol}, vivo={self.vivo})"
+
+
+class Plantel:
+    """Jugadores de una partida con índices por id, nombre y rol.
+
+    Los índices se mantienen al añadir jugadores, asignar roles y matar, así
+    que ninguna consulta necesita recorrer la lista completa.
+    """
+
+    def __init__(self):
+        self._por_id: Dict[str, Jugador] = {}
+        self._por_nombre: Dict[str, Jugador] = {}
+        self._nombres: List[Tuple[str, str]] = []  # [(nombre_normalizado, id)] ordenada
+        self._vivos: Set[str] = set()
+        self._vivos_por_rol: Dict[Rol, Set[str]] = {rol: set() for rol in Rol}
+        self._vivos_por_bando: Dict[Bando, int] = {bando: 0 for bando in Bando}  # Solo con rol
+        # Sube con cada alta, rol asignado o muerte: sirve para saber si un texto sigue valiendo
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def __iter__(self) -> Iterator[Jugador]:
+        return iter(self._por_id.values())
+
+    def __contains__(self, jugador_id: str) -> bool:
+        return jugador_id in self._por_id
+
+    def agregar(self, jugador_id: str, nombre: str) -> Jugador:
+        jugador = Jugador(jugador_id, nombre)
+        self._por_id[jugador_id] = jugador
+        normalizado = normalizar_nombre(nombre)
+        self._por_nombre.setdefault(normalizado, jugador)
+        insort(self._nombres, (normalizado, jugador_id))
+        self._vivos.add(jugador_id)
+        self._cambio()
+        return jugador
+
+    def obtener(self, jugador_id: str) -> Optional[Jugador]:
+        return self._por_id.get(jugador_id)
+
+    def asignar_rol(self, jugador_id: str, rol: Rol):
+        jugador = self._por_id[jugador_id]
+        if jugador.vivo and jugador.rol is not None:
+            self._vivos_por_rol[jugador.rol].discard(jugador_id)
+            self._vivos_por_bando[bando_del_rol(jugador.rol)] -= 1
+        jugador.rol = rol
+        if jugador.vivo:
+            self._vivos_por_rol[rol].add(jugador_id)
+            self._vivos_por_bando[bando_del_rol(rol)] += 1
+        self._cambio()
+
+    def matar(self, jugador_id: str):
+        jugador = self._por_id[jugador_id]
+        if not jugador.vivo:
+            return
+        jugador.vivo = False
+        self._vivos.discard(jugador_id)
+        if jugador.rol is not None:
+            self._vivos_por_rol[jugador.rol].discard(jugador_id)
+            self._vivos_por_bando[bando_del_rol(jugador.rol)] -= 1
+        self._cambio()
+
+    def revivir(self, jugador_id: str):
+        jugador = self._por_id[jugador_id]
+        if jugador.vivo:
+            return
+        jugador.vivo = True
+        self._vivos.add(jugador_id)
+        if jugador.rol is not None:
+            self._vivos_por_rol[jugador.rol].add(jugador_id)
+            self._vivos_por_bando[bando_del_rol(jugador.rol)] += 1
+        self._cambio()
+
+    def _cambio(self):
+        self.version += 1
+        if COMPROBAR_INVARIANTES:
+            self.comprobar_invariantes()
+
+    def comprobar_invariantes(self):
+        """Recalcula los contadores recorriendo todo el plantel; AssertionError si no cuadran"""
+        vivos = {j.id for j in self if j.vivo}
+        assert self._vivos == vivos, f"vivos: {self._vivos} != {vivos}"
+        for rol in Rol:
+            esperados = {j.id for j in self if j.vivo and j.rol == rol}
+            assert self._vivos_por_rol[rol] == esperados, \
+                f"vivos con rol {rol.value}: {self._vivos_por_rol[rol]} != {esperados}"
+        for bando in Bando:
+            esperados = sum(1 for j in self if j.vivo and j.rol is not None and bando_del_rol(j.rol) == bando)
+            assert self._vivos_por_bando[bando] == esperados, \
+                f"vivos del bando {bando.value}: {self._vivos_por_bando[bando]} != {esperados}"
+
+    def vivos(self) -> List[Jugador]:
+        """Jugadores vivos en orden de llegada"""
+        return [j for j in self._por_id.values() if j.vivo]
+
+    def vivos_con_rol(self, rol: Rol) -> List[Jugador]:
+        return [self._por_id[i] for i in self._vivos_por_rol[rol]]
+
+    def num_vivos(self) -> int:
+        return len(self._vivos)
+
+    def num_vivos_con_rol(self, rol: Rol) -> int:
+        return len(self._vivos_por_rol[rol])
+
+    def num_vivos_del_bando(self, bando: Bando) -> int:
+        return self._vivos_por_bando[bando]
+
+    def a_lista(self) -> List[list]:
+        """Representación JSON del plantel: [[id, nombre, rol, vivo], ...]"""
+        return [[j.id, j.nombre, j.rol.value if j.rol else None, j.vivo] for j in self]
+
+    @classmethod
+    def desde_lista(cls, datos: List[list]) -> "Plantel":
+        plantel = cls()
+        for jugador_id, nombre, rol, vivo in datos:
+            plantel.agregar(jugador_id, nombre)
+            if rol is not None:
+                plantel.asignar_rol(jugador_id, Rol(rol))
+            if not vivo:
+                plantel.matar(jugador_id)
+        return plantel
+
+    def buscar_por_prefijo(self, prefijo: str) -> Optional[Jugador]:
+        """Primer jugador (en orden alfabético) cuyo nombre empieza por el prefijo"""
+        prefijo = normalizar_nombre(prefijo)
+        pos = bisect_left(self._nombres, (prefijo, ""))
+        if pos < len(self._nombres) and self._nombres[pos][0].startswith(prefijo):
+            return self._por_id[self._nombres[pos][1]]
+        return None
+
+    def buscar(self, texto: str) -> Optional[Jugador]:
+        """Convierte '@Bianca', '<@ID>' o 'Bianca' al jugador correspondiente"""
+        texto = texto.strip()
+
+        # Caso 1: Es una mención (<@ID> o <@!ID>)
+        if texto.startswith('<@') and texto.endswith('>'):
+            return self.obtener(texto[2:-1].replace('!', ''))
+
+        # Caso 2: @Bianca o Bianca: exacto, prefijo y por último contenido
+        normalizado = normalizar_nombre(texto[1:] if texto.startswith('@') else texto)
+        if not normalizado:
+            return None
+        jugador = self._por_nombre.get(normalizado) or self.buscar_por_prefijo(normalizado)
+        if jugador:
+            return jugador
+        return next((j for j in self if normalizado in normalizar_nombre(j.nombre)), None)
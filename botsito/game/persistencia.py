@@ -0,0 +1,193 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+MAX_LOTE = 500           # Eventos por transacción como máximo
+COMPACTAR_CADA = 5000    # Eventos escritos entre compactaciones
+RETENCION_ARCHIVO = 7 * 24 * 3600  # Segundos que se guarda una partida archivada
+
+ARCHIVAR = "archivar"  # Evento que saca la partida del diario y la guarda aparte
+
+_FIN = object()  # Señal para que el hilo escritor termine
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS diario (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        canal_id TEXT NOT NULL,
+        evento TEXT NOT NULL,
+        estado TEXT
+    );
+    CREATE TABLE IF NOT EXISTS instantaneas (
+        canal_id TEXT PRIMARY KEY,
+        estado TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS archivadas (
+        canal_id TEXT PRIMARY KEY,
+        estado TEXT NOT NULL,
+        archivada REAL NOT NULL
+    );
+"""
+
+
+class Diario:
+    """Diario de partidas en SQLite (modo WAL) con escritura en segundo plano.
+
+    Cada transición (crear, unirse, votar, cambio de fase, muerte, fin) añade
+    una fila con el estado completo de la partida tras el cambio. Un hilo
+    agrupa las filas pendientes en una sola transacción, así el bucle de
+    eventos nunca espera al disco. Cada COMPACTAR_CADA eventos el diario se
+    resume en una instantánea por partida y se vacía.
+
+    Para recuperar basta con la instantánea más la última fila de cada
+    partida en el diario; una fila sin estado significa que la partida terminó.
+
+    Las partidas archivadas (expulsadas de memoria, ver game/inactividad.py)
+    no se restauran al arrancar: esperan en su propia tabla a que alguien
+    las reanude.
+
+    Crearlo no toca el disco: las tablas se crean con la primera conexión,
+    la de cargar() o la del hilo escritor.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.escritos = 0
+        self._desde_compactar = 0
+        self._cola: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        # FULL: fsync en cada commit; como los commits van por lotes sale barato
+        conexion.execute("PRAGMA synchronous=FULL")
+        conexion.executescript(ESQUEMA)
+        return conexion
+
+    def iniciar(self):
+        """Arranca el hilo escritor"""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._escribir, name="diario-partidas", daemon=True)
+            self._hilo.start()
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._hilo is not None:
+            self._cola.put(_FIN)
+            self._hilo.join()
+            self._hilo = None
+
+    def registrar(self, canal_id: str, evento: str, estado: Optional[Dict]):
+        """Encola una transición; estado=None indica que la partida terminó.
+
+        No bloquea: la serialización a JSON y la escritura ocurren en el hilo.
+        `estado` debe ser un dict nuevo que nadie vaya a modificar después.
+        """
+        self._cola.put((canal_id, evento, estado))
+
+    def archivar(self, canal_id: str, estado: Dict):
+        """Saca la partida de las activas y guarda su estado para reanudarla más tarde"""
+        self._cola.put((canal_id, ARCHIVAR, estado))
+
+    def sacar_archivada(self, canal_id: str) -> Optional[Dict]:
+        """Devuelve (y borra) la partida archivada del canal. Bloquea: usar desde un executor"""
+        conexion = self._conectar()
+        try:
+            with conexion:
+                fila = conexion.execute(
+                    "SELECT estado FROM archivadas WHERE canal_id = ?", (canal_id,)
+                ).fetchone()
+                if fila is None:
+                    return None
+                conexion.execute("DELETE FROM archivadas WHERE canal_id = ?", (canal_id,))
+            return json.loads(fila[0])
+        finally:
+            conexion.close()
+
+    def pendientes(self) -> int:
+        """Eventos encolados que el hilo aún no ha escrito"""
+        return self._cola.qsize()
+
+    def _escribir(self):
+        conexion = self._conectar()
+        terminar = False
+        while not terminar:
+            lote = [self._cola.get()]
+            while len(lote) < MAX_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            if _FIN in lote:
+                terminar = True
+                lote = [e for e in lote if e is not _FIN]
+
+            filas = []
+            archivadas = []
+            for canal_id, evento, estado in lote:
+                if evento == ARCHIVAR:
+                    # Para el diario la partida termina; su estado pasa a la tabla de archivadas
+                    archivadas.append((canal_id, json.dumps(estado), time.time()))
+                    estado = None
+                filas.append((canal_id, evento, json.dumps(estado) if estado is not None else None))
+            try:
+                with conexion:
+                    conexion.executemany(
+                        "INSERT INTO diario (canal_id, evento, estado) VALUES (?, ?, ?)", filas
+                    )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO archivadas (canal_id, estado, archivada) VALUES (?, ?, ?)",
+                        archivadas
+                    )
+                self.escritos += len(filas)
+                self._desde_compactar += len(filas)
+                if self._desde_compactar >= COMPACTAR_CADA:
+                    self._compactar(conexion)
+            except sqlite3.Error:
+                log.exception("No se pudieron escribir %d eventos en el diario", len(filas))
+        conexion.close()
+
+    def _compactar(self, conexion: sqlite3.Connection):
+        """Resume el diario en instantáneas (una fila por partida) y lo vacía"""
+        with conexion:
+            ultimo = conexion.execute("SELECT MAX(seq) FROM diario").fetchone()[0]
+            if ultimo is None:
+                return
+            ultimas = conexion.execute(
+                "SELECT canal_id, estado FROM diario WHERE seq IN "
+                "(SELECT MAX(seq) FROM diario WHERE seq <= ? GROUP BY canal_id)", (ultimo,)
+            ).fetchall()
+            conexion.executemany(
+                "INSERT OR REPLACE INTO instantaneas (canal_id, estado) VALUES (?, ?)",
+                [(c, e) for c, e in ultimas if e is not None]
+            )
+            conexion.executemany(
+                "DELETE FROM instantaneas WHERE canal_id = ?",
+                [(c,) for c, e in ultimas if e is None]
+            )
+            conexion.execute("DELETE FROM diario WHERE seq <= ?", (ultimo,))
+            conexion.execute("DELETE FROM archivadas WHERE archivada < ?",
+                             (time.time() - RETENCION_ARCHIVO,))
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._desde_compactar = 0
+
+    def cargar(self) -> Dict[str, Dict]:
+        """Devuelve el estado de todas las partidas activas {canal_id: estado}.
+
+        Bloquea (lee el disco): llamar antes de iniciar() o desde un executor.
+        """
+        conexion = self._conectar()
+        try:
+            self._compactar(conexion)
+            return {
+                canal_id: json.loads(estado)
+                for canal_id, estado in conexion.execute("SELECT canal_id, estado FROM instantaneas")
+            }
+        finally:
+            conexion.close()
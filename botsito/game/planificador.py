@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+Accion = Callable[[], Awaitable[None]]
+
+
+class Planificador:
+    """Plazos de todas las partidas en un único montículo y una sola tarea.
+
+    Cada clave (el canal de la partida) tiene como mucho un plazo pendiente;
+    programar otro reemplaza al anterior. Las entradas reemplazadas o
+    canceladas no se buscan en el montículo: se descartan al llegar arriba
+    (su número de secuencia ya no coincide), así todo cuesta O(log n).
+
+    `reloj` se puede sustituir por un reloj virtual: `extraer_vencidos()` no
+    depende del bucle de eventos.
+    """
+
+    def __init__(self, reloj: Callable[[], float] = time.monotonic):
+        self.reloj = reloj
+        self._monticulo: List[Tuple[float, int, str]] = []  # [(vence, seq, clave)]
+        self._pendientes: Dict[str, Tuple[int, Accion]] = {}  # {clave: (seq, accion)}
+        self._seq = 0
+        self._tarea: Optional[asyncio.Task] = None
+        self._despertar: Optional[asyncio.Event] = None
+        self._en_curso: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pendientes)
+
+    def programar(self, clave: str, segundos: float, accion: Accion):
+        """Ejecuta `accion` dentro de `segundos`, reemplazando el plazo anterior de la clave"""
+        self._seq += 1
+        vence = self.reloj() + segundos
+        self._pendientes[clave] = (self._seq, accion)
+        heapq.heappush(self._monticulo, (vence, self._seq, clave))
+
+        # Si el nuevo plazo es el más próximo hay que despertar a la tarea
+        if self._monticulo[0][1] == self._seq and self._despertar is not None:
+            self._despertar.set()
+        self._asegurar_tarea()
+
+    def cancelar(self, clave: str):
+        self._pendientes.pop(clave, None)
+
+    def pendiente(self, clave: str) -> bool:
+        return clave in self._pendientes
+
+    def _limpiar_cima(self):
+        """Quita de la cima las entradas canceladas o reemplazadas"""
+        while self._monticulo:
+            _, seq, clave = self._monticulo[0]
+            actual = self._pendientes.get(clave)
+            if actual is not None and actual[0] == seq:
+                return
+            heapq.heappop(self._monticulo)
+
+    def proximo_vencimiento(self) -> Optional[float]:
+        self._limpiar_cima()
+        return self._monticulo[0][0] if self._monticulo else None
+
+    def extraer_vencidos(self, ahora: Optional[float] = None) -> List[Accion]:
+        """Saca del montículo y devuelve las acciones cuyo plazo ya pasó"""
+        ahora = self.reloj() if ahora is None else ahora
+        vencidas = []
+        while True:
+            self._limpiar_cima()
+            if not self._monticulo or self._monticulo[0][0] > ahora:
+                return vencidas
+            _, _, clave = heapq.heappop(self._monticulo)
+            vencidas.append(self._pendientes.pop(clave)[1])
+
+    def _asegurar_tarea(self):
+        if self._tarea is None or self._tarea.done():
+            self._despertar = asyncio.Event()
+            self._tarea = asyncio.get_running_loop().create_task(self._ejecutar())
+
+    def detener(self):
+        """Cancela la tarea del planificador y todos los plazos pendientes"""
+        self._pendientes.clear()
+        self._monticulo.clear()
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+
+    async def _ejecutar(self):
+        while True:
+            self._despertar.clear()
+            vence = self.proximo_vencimiento()
+            espera = None if vence is None else max(0.0, vence - self.reloj())
+            if espera is None or espera > 0:
+                try:
+                    async with asyncio.timeout(espera):
+                        await self._despertar.wait()
+                    continue  # Cambió el plazo más próximo: recalcular
+                except TimeoutError:
+                    pass
+
+            for accion in self.extraer_vencidos():
+                # Cada acción en su propia tarea: una lenta no retrasa al resto
+                tarea = asyncio.create_task(self._lanzar(accion))
+                self._en_curso.add(tarea)
+                tarea.add_done_callback(self._en_curso.discard)
+
+    async def _lanzar(self, accion: Accion):
+        try:
+            await accion()
+        except Exception:
+            log.exception("Error al ejecutar un plazo programado")
@@ -0,0 +1,262 @@
+"""Simulador de partidas sin Discord para equilibrar el reparto de roles.
+
+Uso: python -m game.simulador --partidas 20000 --min 4 --max 16 --procesos 4
+
+Juega muchas partidas con jugadores automáticos para cada número de
+jugadores y cada reparto posible, estima cuántas gana la mafia y guarda la
+tabla con el reparto más cercano al 50 % (ver game/tabla_roles.py). Al
+terminar muestra cuántas partidas por segundo jugó.
+
+El bot solo usa la tabla si se le indica con TABLA_ROLES: mientras los
+jugadores automáticos decidan al azar, sus repartos (p. ej. un solo mafioso
+hasta 13 jugadores) no reflejan partidas reales.
+
+Las partidas se juegan por lotes con NumPy: el estado de un lote son
+matrices de booleanos (fila = partida, columna = jugador) para los vivos,
+los investigados y los mafiosos descubiertos, y cada ronda se resuelve a
+la vez en todas las partidas del lote que siguen en juego.
+"""
+import argparse
+import multiprocessing
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from game import core, tabla_roles
+from game.jugadores import Rol
+
+LOTE = 4096  # Partidas que se juegan a la vez (acota la memoria de la votación: lote × jugadores²)
+
+# Valores de Mesa.ganador
+SIN_GANADOR, GANA_PUEBLO, GANA_MAFIA = 0, 1, 2
+NADIE = -1  # Índice de jugador cuando no hay objetivo
+
+
+def elegir(candidatos: np.ndarray, azar: np.random.Generator) -> np.ndarray:
+    """Un candidato al azar por fila (en la última dimensión); NADIE si la fila no tiene ninguno"""
+    claves = azar.random(candidatos.shape)
+    claves[~candidatos] = -1.0
+    elegido = claves.argmax(axis=-1)
+    return np.where(candidatos.any(axis=-1), elegido, NADIE)
+
+
+class Mesa:
+    """Estado de un lote de partidas simuladas con el mismo reparto.
+
+    Como los jugadores automáticos no saben quién es quién salvo por lo que
+    averigua el detective, los roles se colocan en orden fijo: primero los
+    mafiosos, luego el doctor y el detective, y el resto ciudadanos.
+    """
+
+    def __init__(self, partidas: int, num_jugadores: int, reparto: core.Reparto):
+        mafiosos = reparto.get(Rol.MAFIOSO, 0)
+        siguiente = mafiosos
+        self.doctor = self.detective = NADIE
+        if reparto.get(Rol.DOCTOR, 0):
+            self.doctor, siguiente = siguiente, siguiente + 1
+        if reparto.get(Rol.DETECTIVE, 0):
+            self.detective, siguiente = siguiente, siguiente + 1
+
+        self.num_jugadores = num_jugadores
+        self.mafia = np.arange(num_jugadores) < mafiosos       # (jugadores,)
+        self.vivos = np.ones((partidas, num_jugadores), bool)  # (partidas, jugadores)
+        self.investigados = np.zeros_like(self.vivos)  # Ya investigados por el detective
+        self.descubiertos = np.zeros_like(self.vivos)  # Mafiosos que el detective conoce
+        self.ganador = np.full(partidas, SIN_GANADOR, np.int8)
+        self.rondas = 0
+
+    @property
+    def en_juego(self) -> np.ndarray:
+        return self.ganador == SIN_GANADOR
+
+    def vivo(self, jugador: int) -> np.ndarray:
+        """Por partida, si `jugador` está vivo (siempre False para NADIE)"""
+        if jugador == NADIE:
+            return np.zeros(len(self.vivos), bool)
+        return self.vivos[:, jugador]
+
+    def matar(self, victimas: np.ndarray):
+        """Mata a victimas[i] en la partida i (si no es NADIE y la partida sigue)"""
+        filas = np.flatnonzero((victimas != NADIE) & self.en_juego)
+        self.vivos[filas, victimas[filas]] = False
+
+    def comprobar_ganador(self):
+        """La misma regla que core.ganador, en todas las partidas que siguen en juego"""
+        mafiosos = (self.vivos & self.mafia).sum(axis=1)
+        resto = self.vivos.sum(axis=1) - mafiosos
+        ganador = np.where(mafiosos >= resto, GANA_MAFIA,
+                           np.where(mafiosos == 0, GANA_PUEBLO, SIN_GANADOR))
+        self.ganador = np.where(self.en_juego, ganador, self.ganador).astype(np.int8)
+
+
+class Estrategia:
+    """Decisiones de los jugadores automáticos: todo al azar entre lo permitido.
+
+    Cada método decide a la vez para todas las partidas del lote y devuelve
+    un índice de jugador por partida (o por partida y votante), NADIE si no
+    hay a quién elegir.
+    """
+
+    def victima(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        return elegir(mesa.vivos & ~mesa.mafia, azar)
+
+    def protegido(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        return elegir(mesa.vivos, azar)
+
+    def investigado(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        candidatos = mesa.vivos & ~mesa.investigados
+        candidatos[:, mesa.detective] = False
+        return elegir(candidatos, azar)
+
+    def votos(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        """Matriz (partidas, votantes): a quién vota cada jugador"""
+        # Los mafiosos votan a alguien que no es de la mafia; el resto, a cualquiera menos a sí mismo
+        permitidos = np.where(mesa.mafia[:, None], ~mesa.mafia[None, :], ~np.eye(mesa.num_jugadores, dtype=bool))
+        return elegir(mesa.vivos[:, None, :] & permitidos[None, :, :], azar)
+
+
+class EstrategiaDetective(Estrategia):
+    """Como la aleatoria, pero el detective revela a los mafiosos que descubre.
+
+    Mientras quede vivo un mafioso descubierto y el detective siga vivo para
+    contarlo, todo el pueblo vota contra él y la mafia va a por el detective.
+    """
+
+    def _revelados(self, mesa: Mesa) -> Tuple[np.ndarray, np.ndarray]:
+        """Por partida: si hay un mafioso descubierto que el detective puede señalar, y cuál"""
+        descubiertos = mesa.descubiertos & mesa.vivos
+        hay = mesa.vivo(mesa.detective) & descubiertos.any(axis=1)
+        return hay, descubiertos.argmax(axis=1)  # El primero, como en la versión por partida
+
+    def victima(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        hay, _ = self._revelados(mesa)
+        return np.where(hay, mesa.detective, super().victima(mesa, azar))
+
+    def votos(self, mesa: Mesa, azar: np.random.Generator) -> np.ndarray:
+        votos = super().votos(mesa, azar)
+        hay, revelado = self._revelados(mesa)
+        pueblo = hay[:, None] & ~mesa.mafia[None, :]
+        return np.where(pueblo, revelado[:, None], votos)
+
+
+ESTRATEGIAS = {
+    "aleatoria": Estrategia,
+    "detective": EstrategiaDetective,
+}
+
+
+def jugar(partidas: int, num_jugadores: int, reparto: core.Reparto, estrategia: Estrategia,
+          azar: np.random.Generator, max_rondas: int = 100) -> np.ndarray:
+    """Juega un lote de partidas completas; devuelve por partida si ganó la mafia"""
+    mesa = Mesa(partidas, num_jugadores, reparto)
+    mesa.comprobar_ganador()
+    while mesa.en_juego.any() and mesa.rondas < max_rondas:
+        mesa.rondas += 1
+
+        # Noche: todas las acciones se deciden antes de resolver ninguna
+        victima = estrategia.victima(mesa, azar)
+        protegido = np.where(mesa.vivo(mesa.doctor), estrategia.protegido(mesa, azar), NADIE)
+        if mesa.detective != NADIE:
+            investigado = np.where(mesa.vivo(mesa.detective) & mesa.en_juego,
+                                   estrategia.investigado(mesa, azar), NADIE)
+            filas = np.flatnonzero(investigado != NADIE)
+            mesa.investigados[filas, investigado[filas]] = True
+            mesa.descubiertos[filas, investigado[filas]] = mesa.mafia[investigado[filas]]
+        # Como core.victima_de_la_noche: si el doctor protegió a la víctima no muere nadie
+        mesa.matar(np.where(victima == protegido, NADIE, victima))
+        mesa.comprobar_ganador()
+
+        # Votación: el más votado es linchado; con empate, nadie
+        votos = estrategia.votos(mesa, azar)
+        votos = np.where(mesa.vivos, votos, NADIE)
+        conteo = (votos[:, :, None] == np.arange(num_jugadores)).sum(axis=1)
+        maximo = conteo.max(axis=1)
+        unico = (maximo > 0) & ((conteo == maximo[:, None]).sum(axis=1) == 1)
+        mesa.matar(np.where(unico, conteo.argmax(axis=1), NADIE))
+        mesa.comprobar_ganador()
+
+    # No debería pasar: cada noche muere alguien o no; si se alarga, gana el pueblo
+    return mesa.ganador == GANA_MAFIA
+
+
+def repartos_posibles(num_jugadores: int) -> List[core.Reparto]:
+    """Todos los repartos razonables: la mafia empieza en minoría"""
+    repartos = []
+    for mafiosos in range(1, (num_jugadores - 1) // 2 + 1):
+        for doctor in (0, 1):
+            for detective in (0, 1):
+                if mafiosos + doctor + detective <= num_jugadores:
+                    repartos.append({Rol.MAFIOSO: mafiosos, Rol.DOCTOR: doctor,
+                                     Rol.DETECTIVE: detective})
+    return repartos
+
+
+def victorias_mafia(tarea: Tuple[int, core.Reparto, str, int, int]) -> Tuple[int, core.Reparto, float]:
+    """Fracción de partidas que gana la mafia con un reparto"""
+    num_jugadores, reparto, nombre_estrategia, partidas, semilla = tarea
+    azar = np.random.default_rng(semilla)
+    estrategia = ESTRATEGIAS[nombre_estrategia]()
+    ganadas = 0
+    for inicio in range(0, partidas, LOTE):
+        ganadas += int(jugar(min(LOTE, partidas - inicio), num_jugadores, reparto, estrategia, azar).sum())
+    return num_jugadores, reparto, ganadas / partidas
+
+
+def recomendar(resultados: List[Tuple[int, core.Reparto, float]]) -> Dict[int, Dict]:
+    """Para cada número de jugadores, el reparto más equilibrado.
+
+    Si dos repartos quedan igual de cerca del 50 % se prefiere el que tiene
+    más roles especiales, que dan más juego.
+    """
+    mejores: Dict[int, Tuple[Tuple[float, int], core.Reparto, float]] = {}
+    for num_jugadores, reparto, tasa in resultados:
+        clave = (round(abs(tasa - 0.5), 3), -sum(reparto.values()))
+        if num_jugadores not in mejores or clave < mejores[num_jugadores][0]:
+            mejores[num_jugadores] = (clave, reparto, tasa)
+    return {
+        num_jugadores: {**reparto, "victorias_mafia": round(tasa, 3)}
+        for num_jugadores, (_, reparto, tasa) in mejores.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=20000, help="partidas por reparto")
+    parser.add_argument("--min", type=int, default=core.MINIMO_JUGADORES)
+    parser.add_argument("--max", type=int, default=16)
+    parser.add_argument("--estrategia", choices=sorted(ESTRATEGIAS), default="detective")
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=tabla_roles.RUTA_TABLA_ROLES)
+    args = parser.parse_args(argv)
+
+    tareas = []
+    for num_jugadores in range(args.min, args.max + 1):
+        for reparto in repartos_posibles(num_jugadores):
+            tareas.append((num_jugadores, reparto, args.estrategia, args.partidas,
+                           args.semilla + len(tareas)))
+
+    inicio = time.perf_counter()
+    if args.procesos > 1:
+        with multiprocessing.Pool(args.procesos) as pool:
+            resultados = pool.map(victorias_mafia, tareas)
+    else:
+        resultados = [victorias_mafia(tarea) for tarea in tareas]
+    duracion = time.perf_counter() - inicio
+
+    tabla = recomendar(resultados)
+    tabla_roles.guardar_tabla_roles(tabla, args.salida)
+
+    print(f"{'Jugadores':>9}  {'Mafiosos':>8}  {'Doctor':>6}  {'Detective':>9}  {'Mafia gana':>10}")
+    for num_jugadores, fila in sorted(tabla.items()):
+        print(f"{num_jugadores:>9}  {fila[Rol.MAFIOSO]:>8}  {fila[Rol.DOCTOR]:>6}  "
+              f"{fila[Rol.DETECTIVE]:>9}  {fila['victorias_mafia']:>10.1%}")
+
+    total = len(tareas) * args.partidas
+    print(f"\n{total} partidas en {duracion:.1f} s ({total / duracion:,.0f} partidas/s)")
+    print(f"Tabla guardada en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
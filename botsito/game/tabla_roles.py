@@ -0,0 +1,36 @@
+"""Lectura y escritura de la tabla de repartos de roles que genera game/simulador.py"""
+import json
+import os
+from typing import Dict
+
+from game.core import Reparto
+from game.jugadores import Rol
+
+RUTA_TABLA_ROLES = os.path.join(os.path.dirname(__file__), "reparto_roles.json")
+
+
+def cargar_tabla_roles(ruta: str = RUTA_TABLA_ROLES) -> Dict[int, Reparto]:
+    """Lee la tabla {num_jugadores: reparto}; vacía si el archivo no existe"""
+    try:
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+    except FileNotFoundError:
+        return {}
+
+    tabla = {}
+    for num_jugadores, fila in datos.items():
+        tabla[int(num_jugadores)] = {rol: int(fila.get(rol.value, 0))
+                                     for rol in Rol if rol != Rol.CIUDADANO}
+    return tabla
+
+
+def guardar_tabla_roles(filas: Dict[int, Dict], ruta: str = RUTA_TABLA_ROLES):
+    """Escribe la tabla; cada fila puede llevar datos extra (p. ej. la tasa de victorias)"""
+    datos = {}
+    for num_jugadores in sorted(filas):
+        fila = {rol.value: cantidad for rol, cantidad in filas[num_jugadores].items() if isinstance(rol, Rol)}
+        fila.update((clave, valor) for clave, valor in filas[num_jugadores].items() if not isinstance(clave, Rol))
+        datos[str(num_jugadores)] = fila
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+        archivo.write("\n")
@@ -0,0 +1,125 @@
+import random
+from enum import Enum
+from typing import Dict, List, Optional, Set
+
+
+class Desempate(Enum):
+    SIN_DECISION = "sin_decision"  # Empate = nadie muere
+    ALEATORIO = "aleatorio"        # Se sortea entre los empatados
+    PRIMERO = "primero"            # Gana quien llegó antes al máximo de votos
+
+
+class Recuento:
+    """Recuento de votos que se actualiza en O(1) por voto.
+
+    Además del conteo por objetivo se guardan los objetivos agrupados por
+    número de votos, así el líder y los empates se conocen sin recorrer nada.
+    """
+
+    def __init__(self, desempate: Desempate = Desempate.SIN_DECISION,
+                 semilla: Optional[int] = None):
+        self.desempate = desempate
+        self.votos: Dict[str, str] = {}          # {votante: objetivo}
+        self.conteo: Dict[str, int] = {}         # {objetivo: votos}
+        self._por_conteo: Dict[int, Set[str]] = {}  # {votos: {objetivos}}
+        self._llegada: Dict[str, int] = {}       # {objetivo: orden en que alcanzó su conteo}
+        self._orden = 0
+        self._azar = random.Random(semilla)
+        self.maximo = 0
+
+    def __len__(self) -> int:
+        """Número de votantes que tienen un voto registrado"""
+        return len(self.votos)
+
+    def _mover(self, objetivo: str, antes: int, despues: int):
+        if antes:
+            grupo = self._por_conteo[antes]
+            grupo.discard(objetivo)
+            if not grupo:
+                del self._por_conteo[antes]
+        if despues:
+            self._por_conteo.setdefault(despues, set()).add(objetivo)
+            self.conteo[objetivo] = despues
+            self._orden += 1
+            self._llegada[objetivo] = self._orden
+        else:
+            del self.conteo[objetivo]
+            del self._llegada[objetivo]
+
+        if despues > self.maximo:
+            self.maximo = despues
+        elif antes == self.maximo and antes not in self._por_conteo:
+            # Los conteos cambian de uno en uno: el nuevo máximo es el anterior - 1
+            self.maximo = antes - 1
+
+    def votar(self, votante: str, objetivo: str):
+        """Registra (o cambia) el voto de un votante"""
+        anterior = self.votos.get(votante)
+        if anterior == objetivo:
+            return
+        if anterior is not None:
+            self.retirar(votante)
+        self.votos[votante] = objetivo
+        actual = self.conteo.get(objetivo, 0)
+        self._mover(objetivo, actual, actual + 1)
+
+    def retirar(self, votante: str):
+        """Retira el voto de un votante (si tenía)"""
+        objetivo = self.votos.pop(votante, None)
+        if objetivo is None:
+            return
+        actual = self.conteo[objetivo]
+        self._mover(objetivo, actual, actual - 1)
+
+    def lideres(self) -> List[str]:
+        """Objetivos con el máximo de votos"""
+        return list(self._por_conteo.get(self.maximo, ()))
+
+    @property
+    def empate(self) -> bool:
+        return len(self._por_conteo.get(self.maximo, ())) > 1
+
+    def ganador(self) -> Optional[str]:
+        """Objetivo elegido según la regla de desempate (None si no hay)"""
+        lideres = self._por_conteo.get(self.maximo)
+        if not lideres:
+            return None
+        if len(lideres) == 1:
+            return next(iter(lideres))
+
+        if self.desempate == Desempate.ALEATORIO:
+            return self._azar.choice(sorted(lideres))
+        if self.desempate == Desempate.PRIMERO:
+            return min(lideres, key=self._llegada.__getitem__)
+        return None
+
+    def copia(self) -> "Recuento":
+        """Recuento independiente con los mismos votos (comparte el generador de azar)"""
+        nuevo = Recuento.__new__(Recuento)
+        nuevo.desempate = self.desempate
+        nuevo.votos = dict(self.votos)
+        nuevo.conteo = dict(self.conteo)
+        nuevo._por_conteo = {votos: set(objetivos) for votos, objetivos in self._por_conteo.items()}
+        nuevo._llegada = dict(self._llegada)
+        nuevo._orden = self._orden
+        nuevo._azar = self._azar
+        nuevo.maximo = self.maximo
+        return nuevo
+
+    def a_dict(self) -> Dict:
+        """Representación JSON del recuento (los votos en orden de llegada)"""
+        # Cambiar de voto lo retira y lo vuelve a añadir, así que el dict ya está en orden
+        return {"desempate": self.desempate.value, "votos": [list(v) for v in self.votos.items()]}
+
+    @classmethod
+    def desde_dict(cls, datos: Dict) -> "Recuento":
+        recuento = cls(Desempate(datos["desempate"]))
+        for votante, objetivo in datos["votos"]:
+            recuento.votar(votante, objetivo)
+        return recuento
+
+    def mayoria(self, total_votantes: int) -> Optional[str]:
+        """Objetivo con mayoría absoluta de los votantes posibles, si ya lo hay"""
+        if self.maximo * 2 <= total_votantes:
+            return None
+        return next(iter(self._por_conteo[self.maximo]))
@@ -0,0 +1,59 @@
+"""Lanza el bot repartiendo los shards entre varios procesos.
+
+Uso: SHARD_COUNT=16 PROCESOS=4 python lanzador.py
+
+Cada proceso abre las conexiones de su rango de shards, así que es dueño de
+las partidas de los servidores de esos shards. Los DMs llegan siempre al
+shard 0 y se reenvían al proceso que tiene la partida del autor.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+from bot.fragmentos import Reenvio, repartir_shards
+
+
+def por_proceso(variable: str, defecto: str, indice: int):
+    """Añade el índice del proceso a la ruta de la variable: partidas.db -> partidas-1.db"""
+    base, extension = os.path.splitext(os.getenv(variable, defecto))
+    os.environ[variable] = f"{base}-{indice}{extension}"
+
+
+def trabajador(indice: int, shard_ids, shard_count: int, colas):
+    os.environ['SHARD_IDS'] = ','.join(str(i) for i in shard_ids)
+    os.environ['SHARD_COUNT'] = str(shard_count)
+    # Cada proceso escribe en sus propios archivos: su diario (sus partidas no se
+    # comparten), sus estadísticas (las de las partidas de sus servidores) y sus perfiles
+    por_proceso('DIARIO_PARTIDAS', 'partidas.db', indice)
+    por_proceso('ESTADISTICAS', 'estadisticas.db', indice)
+    por_proceso('PERFILES', 'perfiles', indice)
+    # Y su propio puerto de métricas, consecutivos a partir del configurado
+    puerto = os.getenv('METRICAS_PUERTO')
+    if puerto:
+        os.environ['METRICAS_PUERTO'] = str(int(puerto) + indice)
+
+    import main
+    main.main(reenvio=Reenvio(indice, colas))
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    shard_count = int(os.getenv('SHARD_COUNT', '1'))
+    procesos = int(os.getenv('PROCESOS', str(os.cpu_count() or 1)))
+    rangos = repartir_shards(shard_count, procesos)
+
+    # Por las colas viajan los DMs reenviados y quién lleva a cada jugador (ver bot/fragmentos.py)
+    colas = [multiprocessing.Queue() for _ in rangos]
+
+    hijos = [
+        multiprocessing.Process(
+            target=trabajador, args=(i, shard_ids, shard_count, colas),
+            name=f"bot-{i}"
+        )
+        for i, shard_ids in enumerate(rangos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    for hijo in hijos:
+        hijo.join()
@@ -1,9 +1,21 @@
-from bot.client import setup_client
+"""Punto de entrada del bot: python main.py
+
+Importa bot.arranque antes que nada para que las marcas de arranque cuenten
+también los imports (discord.py y el bot). lanzador.py arranca cada proceso
+con main(); con shards, cada uno con su Reenvio.
+"""
+from bot import arranque  # noqa: F401 (primero: pone en marcha el reloj del arranque)
+
 from dotenv import load_dotenv
-import os
 
-load_dotenv()
+
+def main(reenvio=None):
+    load_dotenv()
+    import mainnn  # Aquí y no arriba: .env ya está cargado cuando mainnn lee el entorno
+    if reenvio is not None:
+        mainnn.reenvio = reenvio
+    mainnn.iniciar()
+
 
 if __name__ == "__main__":
-    client = setup_client()
-    client.run(os.getenv('DISCORD_TOKEN'))
\ No newline at end of file
+    main()
@@ -1,58 +1,295 @@
-import discord
+import asyncio
+import logging
 import os
-import random
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
 from dotenv import load_dotenv
-from enum import Enum, auto 
+
+from bot import arranque
+from bot.barra import registrar_comandos_barra, sincronizar
+from bot.cache import CacheEntidades
+from bot.client import setup_client
+from bot.commands import Ambito, Contexto, Router
+from bot.envios import EsperasPorRuta, enviar_privados
+from bot.events import registrar_eventos
+from bot.fragmentos import Reenvio
+from bot.metricas import METRICAS, puerto_configurado
+from bot.registro import configurar_registro, registro_con_contexto
+from bot.salida import ColaSalida
+from bot.textos import Textos
+from game.actores import Actores
+from game.estadisticas import Estadisticas, FichaJugador, Resultado
+from game.inactividad import RegistroActividad
+from game.emparejamiento import Emparejador, Solicitud
+from game import core
+from game.core import Bando, FaseJuego, lista_roles
+from game.jugadores import Jugador, Plantel, Rol, bando_del_rol
+from game.persistencia import Diario
+from game.planificador import Planificador
+from game.tabla_roles import cargar_tabla_roles
+from game.votos import Desempate, Recuento
 
 # Cargar variables de entorno
 load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 
-intents = discord.Intents.default()
-intents.message_content = True  # Para leer mensajes
-intents.messages = True        # Necesario para DMs
-intents.dm_messages = True     # Específico para mensajes directos
-intents.members = True         # Para ver información de usuarios
+configurar_registro()
+log = logging.getLogger("mafia")
+
+# "mensajes": comandos de texto y DMs; "barra": comandos de barra y respuestas
+# efímeras, sin leer mensajes ni abrir DMs (ver bot/barra.py)
+MODO_BARRA = os.getenv('MODO_INTERACCION', 'mensajes') == 'barra'
+PREFIJO = "/" if MODO_BARRA else "!"  # Con el que se anuncian los comandos en los textos
+AVISO_PRIVADO = ("Cada jugador puede ver su rol e instrucciones con `/mafia rol`." if MODO_BARRA
+                 else "Los jugadores especiales recibirán instrucciones por mensaje privado.")
 
-client = discord.Client(intents=intents)
+# Con SHARD_COUNT/SHARD_IDS en el entorno se usa un AutoShardedClient;
+# PERFIL_CLIENTE elige qué intents y cachés usa (ver bot/client.py)
+client = setup_client(perfil="interacciones" if MODO_BARRA else None)
+cache = CacheEntidades(client)
+salida = ColaSalida()  # Agrupa los mensajes seguidos a un mismo canal en un solo envío
+esperas_privados = EsperasPorRuta()  # DMs frenados por un 429, compartido entre lotes
 
 # Estructura para almacenar partidas
 partidas: Dict[str, Dict] = {}  # {canal_id: partida_info}
-jugadores_por_partida: Dict[str, List[Dict]] = {}  # {canal_id: [jugadores]}
+jugadores_por_partida: Dict[str, Plantel] = {}  # {canal_id: plantel}
+partida_por_usuario: Dict[str, str] = {}  # {jugador_id: canal_id}, para enrutar los DMs
+
+# Solo con lanzador.py: reenvía DMs entre procesos (ver bot/fragmentos.py)
+reenvio: Optional[Reenvio] = None
+
+# Diario en disco para no perder las partidas si el bot se reinicia
+diario = Diario(os.getenv('DIARIO_PARTIDAS', 'partidas.db'))
+TIEMPO_MAXIMO_RESTAURAR = 30  # segundos
+lectura_diario: Optional[Future] = None  # diario.cargar() en otro hilo, desde iniciar()
+
+# Resultados de las partidas terminadas, para !mafia stats y !mafia ranking;
+# se abren con la primera partida que termina o el primer comando que las lee
+estadisticas: Optional[Estadisticas] = None
+partidas_restauradas = False
+
+# Un solo temporizador para los plazos de todas las partidas
+planificador = Planificador()
+
+# Cada partida atiende sus comandos y plazos de uno en uno (ver game/actores.py);
+# los DMs salen aparte para que sus reintentos no frenen el turno de la partida
+actores = Actores()
+envios_privados: Dict[str, asyncio.Task] = {}  # {canal_id: último lote de DMs}
+
+# Partidas abandonadas: se cierran tras un tiempo sin que ningún jugador haga nada,
+# y si hay demasiadas en memoria se expulsan las menos recientes (LRU)
+actividad = RegistroActividad()
+TTL_SALA = int(os.getenv('TTL_SALA', '1800'))           # Partida esperando jugadores
+TTL_PARTIDA = int(os.getenv('TTL_PARTIDA', '3600'))     # Partida empezada
+MAX_PARTIDAS = int(os.getenv('MAX_PARTIDAS', '1000'))   # Partidas en memoria a la vez
+ARCHIVAR_EXPULSADAS = os.getenv('ARCHIVAR_EXPULSADAS', '1') == '1'  # Guardarlas para reanudarlas
+BARRIDO_INACTIVIDAD = 60  # Segundos entre comprobaciones
+CLAVE_BARRIDO = "barrido-inactividad"  # Su plazo en el planificador (las demás claves son canales)
+expulsiones_pendientes: Set[str] = set()  # Ya encoladas en el actor de su partida
+
+# `!mafia buscar`: una cola para todo el servidor que forma partidas con jugadores
+# de cualquier canal, por tamaño e idioma (ver game/emparejamiento.py)
+ESPERA_EMPAREJAMIENTO = int(os.getenv('ESPERA_EMPAREJAMIENTO', '180'))  # Segundos como mucho en la cola
+IDIOMA = os.getenv('IDIOMA', 'es')  # El de las partidas que se buscan si no se indica
+TAMANO_EMPAREJAMIENTO = 6  # Jugadores si no se indican
+MIN_JUGADORES = 5          # Una sala incompleta empieza si llega a esto al vencer la espera
+CLAVE_EMPAREJAMIENTO = "emparejamiento"  # Su plazo en el planificador
+emparejador: Optional[Emparejador] = None  # Con el primer `!mafia buscar`
+vencimiento_programado: Optional[float] = None
+ESPERAS_EMPAREJAMIENTO = METRICAS.histograma(
+    "mafia_emparejamiento_espera_segundos", "Tiempo en la cola de emparejamiento hasta formar sala",
+    limites=(0.01, 0.1, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 180.0, 300.0))
+
+# Solo lo que hacen los jugadores cuenta como actividad (las fases avanzan solas)
+EVENTOS_DE_JUGADOR = {"crear", "unirse", "voto_matar", "proteger", "investigar", "voto_lynch", "reanudar"}
 
+# Con METRICAS_PUERTO en el entorno se sirven en http://127.0.0.1:<puerto>/metrics
+servidor_metricas = None
 
-class FaseJuego(Enum):
-    ESPERANDO = auto()
-    NOCHE = auto()
-    DIA = auto()
-    VOTACION = auto()
+# Avisa (con la partida y el comando) cuando algo bloquea el bucle; !mafia perfil guarda un perfil.
+# Los dos (bot/vigilancia.py) se crean al conectar y con el primer !mafia perfil
+VIGILAR_BUCLE = os.getenv('VIGILAR_BUCLE', '1') == '1'
+vigilante = None
+perfilador = None
+SEGUNDOS_PERFIL = 10  # Si no se indican
+captura_perfil: Optional[asyncio.Task] = None
+
+# Cómo se resuelven los empates en cada votación
+DESEMPATE_NOCHE = Desempate.ALEATORIO     # La mafia siempre mata a alguien
+DESEMPATE_DIA = Desempate.SIN_DECISION    # Empate en el pueblo = nadie es linchado
+
+# Duración máxima de cada fase (segundos); al vencer se pasa a la siguiente
+DURACION_NOCHE = int(os.getenv('DURACION_NOCHE', '120'))
+DURACION_DIA = int(os.getenv('DURACION_DIA', '90'))
+DURACION_VOTACION = int(os.getenv('DURACION_VOTACION', '90'))
+
+# Con TABLA_ROLES se usan los repartos que recomienda game/simulador.py. Sin
+# ella, 1 mafioso por cada 4 jugadores, un doctor y un detective: los jugadores
+# del simulador aún deciden casi al azar y su tabla no vale como reparto por defecto
+TABLA_ROLES = cargar_tabla_roles(os.environ['TABLA_ROLES']) if os.getenv('TABLA_ROLES') else {}
 
 # Roles disponibles
 ROLES = {
-    "Mafioso": {
+    Rol.MAFIOSO: {
         "descripcion": "Perteneces a la mafia. De noche, eliminan a un jugador.",
-        "maximo": 1  # Por cada 4-5 jugadores se añade otro mafioso
+        "maximo": 1  # Depende del número de jugadores (ver TABLA_ROLES)
     },
-    "Ciudadano": {
+    Rol.CIUDADANO: {
         "descripcion": "Eres un ciudadano inocente. Debes encontrar a los mafiosos.",
         "maximo": None  # El resto de jugadores
     },
-    "Doctor": {
+    Rol.DOCTOR: {
         "descripcion": "Puedes salvar a un jugador cada noche.",
         "maximo": 1
     },
-    "Detective": {
+    Rol.DETECTIVE: {
         "descripcion": "Puedes investigar a un jugador cada noche para saber su rol.",
         "maximo": 1
     }
 }
 
+# Listas de jugadores y mensajes repetidos, calculados una vez por cambio en el plantel
+textos = Textos({rol: info["descripcion"] for rol, info in ROLES.items()}, PREFIJO)
+
+def serializar_partida(canal_id: str, partida: Optional[Dict] = None) -> Dict:
+    """Copia JSON del estado completo de una partida"""
+    if partida is None:
+        partida = partidas[canal_id]
+    datos = dict(partida)
+    datos["estado"] = partida["estado"].name
+    for clave in ("votos_matar", "votos_lynch"):
+        if clave in partida:
+            datos[clave] = partida[clave].a_dict()
+    datos["jugadores"] = jugadores_por_partida[canal_id].a_lista()
+    return datos
+
+def restaurar_partida(canal_id: str, datos: Dict):
+    """Vuelve a cargar en memoria una partida guardada con serializar_partida"""
+    datos = dict(datos)
+    jugadores = Plantel.desde_lista(datos.pop("jugadores"))
+    datos["estado"] = FaseJuego[datos["estado"]]
+    for clave in ("votos_matar", "votos_lynch"):
+        if clave in datos:
+            datos[clave] = Recuento.desde_dict(datos[clave])
+    
+    partidas[canal_id] = datos
+    jugadores_por_partida[canal_id] = jugadores
+    for jugador in jugadores:
+        vincular_jugador(jugador.id, canal_id)
+    actividad.tocar(canal_id)
+
+def guardar_partida(canal_id: str, evento: str, partida: Optional[Dict] = None):
+    """Anota en el diario el estado de la partida (o `partida`, si se indica) tras una transición"""
+    diario.registrar(canal_id, evento, serializar_partida(canal_id, partida))
+    if evento in EVENTOS_DE_JUGADOR:
+        actividad.tocar(canal_id)
+
+def precargar_partidas():
+    """Empieza a leer el diario en otro hilo; restaurar_partidas recoge el resultado"""
+    global lectura_diario
+    if lectura_diario is None:
+        hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precarga")
+        lectura_diario = hilo.submit(diario.cargar)
+        hilo.shutdown(wait=False)  # El hilo termina en cuanto acaba de leer
+
+async def restaurar_partidas():
+    """Recupera del diario las partidas que estaban en curso (solo la primera vez)"""
+    global partidas_restauradas
+    if partidas_restauradas:
+        return
+    partidas_restauradas = True
+    
+    precargar_partidas()  # Si no se empezó a leer al arrancar
+    try:
+        estados = await asyncio.wait_for(asyncio.wrap_future(lectura_diario), TIEMPO_MAXIMO_RESTAURAR)
+    except Exception:
+        log.exception("No se pudieron restaurar las partidas guardadas")
+        estados = {}
+    
+    for canal_id, datos in estados.items():
+        if canal_id not in partidas:
+            restaurar_partida(canal_id, datos)
+            # El plazo que tenía la fase se perdió con el reinicio: empieza de nuevo
+            fase = partidas[canal_id]["estado"]
+            if fase in DURACION_FASE:
+                programar_fase(canal_id, fase, DURACION_FASE[fase])
+    diario.iniciar()
+    log.info("Partidas restauradas: %d", len(estados))
+
+async def avisar_no_alcanzados(canal, nombres: Dict[str, str], no_alcanzados: List[str]):
+    """Avisa en el canal qué jugadores no pudieron recibir su mensaje privado"""
+    if not no_alcanzados:
+        return
+    
+    await salida.enviar(canal, 
+        f"⚠️ No se pudo enviar mensaje privado a: {', '.join(nombres[i] for i in no_alcanzados)}\n"
+        "Revisen que tengan los mensajes directos abiertos."
+    )
+
+def privados_en_segundo_plano(canal, canal_id: str, mensajes: Dict[str, str]):
+    """Manda un lote de DMs fuera del turno de la partida, detrás del lote anterior"""
+    jugadores = jugadores_por_partida[canal_id]
+    nombres = {jugador_id: jugadores.obtener(jugador_id).nombre for jugador_id in mensajes}
+    anterior = envios_privados.get(canal_id)
+    
+    async def enviar():
+        if anterior is not None:
+            # El rol tiene que llegar antes que las instrucciones de la noche
+            await asyncio.wait([anterior])
+        try:
+            no_alcanzados = await enviar_privados(cache.obtener_canal_privado, mensajes,
+                                                  esperas=esperas_privados)
+            await avisar_no_alcanzados(canal, nombres, no_alcanzados)
+        except Exception:
+            log.exception("Error al enviar los mensajes privados", extra={"canal_id": canal_id})
+    
+    def terminado(tarea: asyncio.Task):
+        if envios_privados.get(canal_id) is tarea:
+            del envios_privados[canal_id]
+    
+    tarea = asyncio.create_task(enviar())
+    envios_privados[canal_id] = tarea
+    tarea.add_done_callback(terminado)
+
+def partida_del_jugador(jugador_id: str) -> Optional[str]:
+    """Devuelve el canal de la partida en la que está el jugador (si hay)"""
+    return partida_por_usuario.get(jugador_id)
+
+def vincular_jugador(jugador_id: str, canal_id: str):
+    """Apunta en el índice que el jugador está en la partida del canal"""
+    partida_por_usuario[jugador_id] = canal_id
+    if emparejador is not None:
+        emparejador.cancelar(jugador_id)  # Si estaba buscando partida, ya la tiene
+    if reenvio:
+        reenvio.vincular(jugador_id)
+
+def desvincular_jugador(jugador_id: str, canal_id: str):
+    """Quita al jugador del índice si seguía apuntando a esa partida"""
+    if partida_por_usuario.get(jugador_id) == canal_id:
+        del partida_por_usuario[jugador_id]
+        if reenvio:
+            reenvio.desvincular(jugador_id)
+
+def aviso_otra_partida(jugador_id: str) -> Optional[str]:
+    """Mensaje de rechazo si el jugador ya participa en otra partida"""
+    otra = partida_por_usuario.get(jugador_id)
+    if otra is not None:
+        return f"⚠️ Ya estás en otra partida (<#{otra}>). Solo puedes jugar una a la vez."
+    if reenvio and reenvio.propietario(jugador_id) is not None:
+        # La partida la lleva otro proceso del bot
+        return "⚠️ Ya estás en otra partida. Solo puedes jugar una a la vez."
+    return None
+
 async def crear_partida(canal_id: str, creador_id: str, num_jugadores: int):
     """Crea una nueva partida de mafia"""
     if canal_id in partidas:
         return "⚠️ Ya hay una partida en curso en este canal."
     
+    aviso = aviso_otra_partida(creador_id)
+    if aviso:
+        return aviso
+    
     if num_jugadores < 4:
         return "❌ Se necesitan al menos 5 jugadores para una partida de Mafia."
     
@@ -69,41 +306,50 @@ async def crear_partida(canal_id: str, creador_id: str, num_jugadores: int):
         "estado": FaseJuego.ESPERANDO,
         "roles_asignados": False,
         "victima_noche": None,
-        "votos_matar": {}
+        "votos_matar": Recuento(DESEMPATE_NOCHE)
     }
     
-    jugadores_por_partida[canal_id] = [{
-        "id": creador_id,
-        "nombre": f"<@{creador_id}>",
-        "rol": None,
-        "vivo": True
-    }]
+    jugadores_por_partida[canal_id] = Plantel()
+    jugadores_por_partida[canal_id].agregar(creador_id, f"<@{creador_id}>")
+    vincular_jugador(creador_id, canal_id)
+    guardar_partida(canal_id, "crear")
+    
+    # Sin sitio para otra partida: sale la que lleva más tiempo sin actividad
+    # (en su propio turno: aquí no se puede esperar a otro actor)
+    for sobrante in actividad.sobrantes(MAX_PARTIDAS):
+        pedir_expulsion(sobrante, "memoria")
     
-    return f"🎮 Se ha creado una partida de Mafia para {num_jugadores} jugadores. Usa `!mafia unirme` para participar."
+    return f"🎮 Se ha creado una partida de Mafia para {num_jugadores} jugadores. Usa `{PREFIJO}mafia unirme` para participar."
 
-async def unirse_a_partida(canal_id: str, jugador_id: str, jugador_nombre: str):
-    """Permite a un jugador unirse a una partida existente"""
+def sumar_jugador(canal_id: str, jugador_id: str, jugador_nombre: str) -> Optional[str]:
+    """Añade al jugador a la partida del canal sin esperar a nada; devuelve el motivo si no puede"""
     if canal_id not in partidas:
-        return "⚠️ No hay partidas activas en este canal. Usa `!mafia crear <número>` para empezar una."
-    
-    partida = partidas[canal_id]
+        return f"⚠️ No hay partidas activas en este canal. Usa `{PREFIJO}mafia crear <número>` para empezar una."
     
     # Verificar si el jugador ya está en la partida
-    for jugador in jugadores_por_partida[canal_id]:
-        if jugador["id"] == jugador_id:
-            return "⚠️ Ya estás en esta partida."
+    if jugador_id in jugadores_por_partida[canal_id]:
+        return "⚠️ Ya estás en esta partida."
+    
+    aviso = aviso_otra_partida(jugador_id)
+    if aviso:
+        return aviso
     
     # Verificar si hay espacio
-    if len(jugadores_por_partida[canal_id]) >= partida["max_jugadores"]:
+    if len(jugadores_por_partida[canal_id]) >= partidas[canal_id]["max_jugadores"]:
         return "❌ La partida ya está llena."
     
     # Añadir jugador
-    jugadores_por_partida[canal_id].append({
-        "id": jugador_id,
-        "nombre": jugador_nombre,
-        "rol": None,
-        "vivo": True
-    })
+    jugadores_por_partida[canal_id].agregar(jugador_id, jugador_nombre)
+    vincular_jugador(jugador_id, canal_id)
+    guardar_partida(canal_id, "unirse")
+    return None
+
+async def unirse_a_partida(canal_id: str, jugador_id: str, jugador_nombre: str):
+    """Permite a un jugador unirse a una partida existente"""
+    rechazo = sumar_jugador(canal_id, jugador_id, jugador_nombre)
+    if rechazo:
+        return rechazo
+    partida = partidas[canal_id]
     
     # Verificar si se alcanzó el número máximo de jugadores
     jugadores_actuales = len(jugadores_por_partida[canal_id])
@@ -114,6 +360,112 @@ async def unirse_a_partida(canal_id: str, jugador_id: str, jugador_nombre: str):
     
     return f"✅ {jugador_nombre} se ha unido. Jugadores actuales: {jugadores_actuales}/{partida['max_jugadores']}"
 
+def obtener_emparejador() -> Emparejador:
+    """La cola de emparejamiento, creada con el primer `!mafia buscar`"""
+    global emparejador
+    if emparejador is None:
+        emparejador = Emparejador(ESPERA_EMPAREJAMIENTO, MIN_JUGADORES)
+    return emparejador
+
+def programar_vencimientos():
+    """Programa la próxima espera de la cola que vence, si es antes de la ya programada"""
+    global vencimiento_programado
+    vence = emparejador.proximo_vencimiento()
+    if vence is None:
+        return
+    if vencimiento_programado is None or vence < vencimiento_programado or not planificador.pendiente(CLAVE_EMPAREJAMIENTO):
+        vencimiento_programado = vence
+        planificador.programar(CLAVE_EMPAREJAMIENTO, max(0.0, vence - time.monotonic()), vencer_esperas)
+
+async def vencer_esperas():
+    """Empieza las salas incompletas que ya esperaron bastante y avisa a los que se quedan sin partida"""
+    global vencimiento_programado
+    vencimiento_programado = None
+    try:
+        salas, caducadas = emparejador.vencer()
+        for sala in salas:
+            repartir_sala(sala)
+        await avisar_caducadas(caducadas)
+    finally:
+        programar_vencimientos()
+
+async def avisar_caducadas(caducadas: List[Solicitud]):
+    """Avisa en su canal a los que no encontraron partida a tiempo"""
+    por_canal: Dict[str, List[str]] = {}
+    for solicitud in caducadas:
+        por_canal.setdefault(solicitud.canal_id, []).append(f"<@{solicitud.jugador_id}>")
+    for canal_id, menciones in por_canal.items():
+        canal = await cache.obtener_canal(canal_id)
+        await salida.enviar(canal, f"⌛ {', '.join(menciones)}: no se juntaron jugadores suficientes a tiempo. "
+                                   f"Vuelve a intentarlo con `{PREFIJO}mafia buscar`.")
+
+def repartir_sala(sala: List[Solicitud]):
+    """Lleva una sala formada al primer canal libre de sus jugadores (en el turno de ese canal)"""
+    for canal_id in dict.fromkeys(solicitud.canal_id for solicitud in sala):
+        if canal_id not in partidas:
+            if actores.enviar(canal_id, lambda: formar_partida(canal_id, sala), descripcion="emparejar"):
+                return
+    # Ningún canal libre: la sala vuelve a la cola con su turno y la siguiente que se forme lo reintenta
+    emparejador.devolver(sala)
+    programar_vencimientos()
+
+async def formar_partida(canal_id: str, sala: List[Solicitud]):
+    """Crea en el canal la partida de una sala y la empieza"""
+    # Mientras esperaba turno el canal pudo ocuparse y algún jugador entrar en otra partida
+    libres = [solicitud for solicitud in sala if aviso_otra_partida(solicitud.jugador_id) is None]
+    if canal_id in partidas or len(libres) < MIN_JUGADORES:
+        await devolver_a_la_cola(libres)
+        return
+    
+    # Como si el primero la creara y los demás se unieran, pero todo seguido y sin
+    # esperar a ningún envío: nadie puede ocupar el canal ni a un jugador entre medias
+    creador, *resto = libres
+    await crear_partida(canal_id, creador.jugador_id, len(libres))  # No espera a nada
+    if creador.jugador_id not in jugadores_por_partida.get(canal_id, ()):
+        await devolver_a_la_cola(libres)
+        return
+    dentro, fallidas = [creador], []
+    for solicitud in resto:
+        if sumar_jugador(canal_id, solicitud.jugador_id, solicitud.nombre) is None:
+            dentro.append(solicitud)
+        else:
+            fallidas.append(solicitud)
+    if len(dentro) < MIN_JUGADORES:
+        # No llegan para empezar: la partida se deshace y todos vuelven a la cola
+        diario.registrar(canal_id, "fin", None)
+        liberar_partida(canal_id)
+        await devolver_a_la_cola(libres)
+        return
+    partidas[canal_id]["max_jugadores"] = len(dentro)
+    
+    ahora = time.monotonic()
+    for solicitud in dentro:
+        ESPERAS_EMPAREJAMIENTO.observar(ahora - solicitud.llegada)
+    
+    # Cada uno se entera en el canal desde el que buscó
+    por_canal: Dict[str, List[str]] = {}
+    for solicitud in dentro:
+        por_canal.setdefault(solicitud.canal_id, []).append(f"<@{solicitud.jugador_id}>")
+    for origen, menciones in por_canal.items():
+        canal = await cache.obtener_canal(origen)
+        if origen == canal_id:
+            await salida.enviar(canal, f"🎯 **¡Partida encontrada!** {', '.join(menciones)}: jugáis en este canal.")
+        else:
+            await salida.enviar(canal, f"🎯 **¡Partida encontrada!** {', '.join(menciones)}: jugáis en <#{canal_id}>.")
+    # Los que no pudieron entrar y siguen sin partida vuelven a buscar
+    fallidas = [solicitud for solicitud in fallidas if aviso_otra_partida(solicitud.jugador_id) is None]
+    if fallidas:
+        await devolver_a_la_cola(fallidas)
+    
+    # La partida ya está completa: se reparten los roles y empieza
+    await asignar_roles(canal_id)
+
+async def devolver_a_la_cola(solicitudes: List[Solicitud]):
+    """Las solicitudes que no entraron en una sala vuelven a la cola (o caducan si ya vencieron)"""
+    caducadas = obtener_emparejador().devolver(solicitudes)
+    programar_vencimientos()
+    await avisar_caducadas(caducadas)
+
 async def asignar_roles(canal_id: str):
     """Asigna roles aleatorios a los jugadores"""
     if canal_id not in partidas:
@@ -122,506 +474,749 @@ async def asignar_roles(canal_id: str):
     partida = partidas[canal_id]
     jugadores = jugadores_por_partida[canal_id]
     
-    # Calcular número de mafiosos (1 por cada 4 jugadores)
-    num_mafiosos = max(1, len(jugadores) // 4)
-    
-    # Preparar lista de roles a asignar
-    roles_a_asignar = []
-    
-    # Añadir mafiosos
-    roles_a_asignar.extend(["Mafioso"] * num_mafiosos)
-    
-    # Añadir roles especiales (doctor y detective)
-    roles_a_asignar.append("Doctor")
-    roles_a_asignar.append("Detective")
-    
-    # El resto son ciudadanos
-    roles_a_asignar.extend(["Ciudadano"] * (len(jugadores) - len(roles_a_asignar)))
-    
-    # Mezclar roles
-    random.shuffle(roles_a_asignar)
+    # Roles ya mezclados según la tabla (o 1 mafioso por cada 4, doctor y detective)
+    roles_a_asignar = lista_roles(len(jugadores), TABLA_ROLES)
     
     # Asignar roles a jugadores
-    for i, jugador in enumerate(jugadores):
-        jugador["rol"] = roles_a_asignar[i]
+    for jugador, rol in zip(jugadores, roles_a_asignar):
+        jugadores.asignar_rol(jugador.id, rol)
     
     partida["roles_asignados"] = True
     partida["estado"] = FaseJuego.NOCHE  # Corregir typo en "estado"
+    guardar_partida(canal_id, "roles")
 
 
-    # Enviar mensajes privados con los roles
-    for jugador in jugadores:
-        rol_info = ROLES[jugador["rol"]]
-        mensaje_rol = f"🔮 **Tu rol en la partida de Mafia es: {jugador['rol']}**\n\n"
-        mensaje_rol += f"{rol_info['descripcion']}\n\n"
-        
-        if jugador["rol"] == "Mafioso":
-            # Encontrar compañeros mafiosos
-            compañeros = [j["nombre"] for j in jugadores if j["rol"] == "Mafioso" and j["id"] != jugador["id"]]
-            if compañeros:
-                mensaje_rol += f"👥 Tus compañeros mafiosos son: {', '.join(compañeros)}"
-        
-        # Obtener el objeto User para enviar DM
-        user = await client.fetch_user(int(jugador["id"]))
-        await user.send(mensaje_rol)
-
      # Notificar en el canal
-    canal = client.get_channel(int(canal_id))
-    await canal.send("🎭 **¡Todos los roles han sido asignados!**\n"
-                   "La primera noche comienza ahora. Los jugadores especiales recibirán instrucciones por mensaje privado.")
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, "🎭 **¡Todos los roles han sido asignados!**\n"
+                        f"La primera noche comienza ahora. {AVISO_PRIVADO}")
+    
+    # Enviar mensajes privados con los roles (todos a la vez)
+    if not MODO_BARRA:
+        mensajes = {jugador.id: textos.mensaje_rol(canal_id, jugadores, jugador) for jugador in jugadores}
+        privados_en_segundo_plano(canal, canal_id, mensajes)
     
     await iniciar_noche(canal_id)
 
     return True
 
+async def aplicar_paso(canal_id: str, paso: core.Paso):
+    """Deja la partida como dice el paso y lleva a cabo sus efectos, en orden"""
+    partidas[canal_id] = paso.partida
+    jugadores = jugadores_por_partida[canal_id]
+    for muerto in paso.muertos:
+        jugadores.matar(muerto)
+    for efecto in paso.efectos:
+        await EFECTOS[type(efecto)](canal_id, efecto)
+
+async def efecto_guardar(canal_id: str, efecto: core.Guardar):
+    guardar_partida(canal_id, efecto.evento, efecto.partida)
+
+async def efecto_plazo(canal_id: str, efecto: core.Plazo):
+    programar_fase(canal_id, efecto.fase, 0 if efecto.ya else DURACION_FASE[efecto.fase])
+
+async def efecto_anochecer(canal_id: str, efecto: core.Anochecer):
+    # Notificar a todos los jugadores
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, "🌙 **Anochece en el pueblo... Todos a dormir!**\n"
+                        "Los mafiosos deben decidir a quién eliminar esta noche.")
+    if MODO_BARRA:
+        # Cada uno consulta sus instrucciones con /mafia rol: no hay DMs que mandar
+        return
+    
+    # Enviar instrucciones específicas por roles (todas a la vez)
+    jugadores = jugadores_por_partida[canal_id]
+    mensajes = {}
+    for jugador in jugadores.vivos():
+        # Los de un mismo rol reciben el mismo texto: se construye una sola vez
+        instrucciones = textos.instrucciones_noche(canal_id, jugadores, jugador)
+        if instrucciones:
+            mensajes[jugador.id] = instrucciones
+    
+    privados_en_segundo_plano(canal, canal_id, mensajes)
+
+async def efecto_voto(canal_id: str, efecto: core.VotoRegistrado):
+    # Con comandos de barra ya lo confirma la respuesta efímera
+    if MODO_BARRA:
+        return
+    objetivo = jugadores_por_partida[canal_id].obtener(efecto.objetivo_id)
+    accion = "eliminar" if efecto.fase == FaseJuego.NOCHE else "linchar"
+    try:
+        privado = await cache.obtener_canal_privado(efecto.votante_id)
+        await salida.enviar(privado, f"✅ Has votado por {accion} a {objetivo.nombre}.")
+    except Exception:
+        log.warning("No se pudo enviar DM de confirmación", exc_info=True,
+                    extra={"canal_id": canal_id, "usuario_id": efecto.votante_id})
+
+async def efecto_decision_mafia(canal_id: str, efecto: core.DecisionMafia):
+    # Con comandos de barra la ven con /mafia rol
+    if MODO_BARRA:
+        return
+    jugadores = jugadores_por_partida[canal_id]
+    if efecto.victima_id:
+        decision = f"☠️ Decisión final: Eliminar a {jugadores.obtener(efecto.victima_id).nombre}"
+    else:
+        decision = "🤝 Hubo empate: esta noche nadie será eliminado."
+    for mafioso in jugadores.vivos_con_rol(Rol.MAFIOSO):
+        try:
+            privado = await cache.obtener_canal_privado(mafioso.id)
+            await salida.enviar(privado, decision)
+        except Exception:
+            log.warning("No se pudo avisar al mafioso %s", mafioso.id, exc_info=True,
+                        extra={"canal_id": canal_id})
+
+async def efecto_amanecer(canal_id: str, efecto: core.Amanecer):
+    mensaje_amanecer = "☀️ **Amanece en el pueblo...**\n"
+    if efecto.victima_id:
+        victima = jugadores_por_partida[canal_id].obtener(efecto.victima_id)
+        mensaje_amanecer += f"🔪 {victima.nombre} ha sido encontrado/a muerto/a esta mañana.\n"
+    elif efecto.atacado:
+        mensaje_amanecer += "🛡️ La mafia atacó, pero el doctor llegó a tiempo. ¡Nadie ha muerto!\n"
+    else:
+        mensaje_amanecer += "¡Todos han sobrevivido la noche!\n"
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, mensaje_amanecer)
+
+async def efecto_votacion(canal_id: str, efecto: core.VotacionAbierta):
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, textos.inicio_votacion(canal_id, jugadores_por_partida[canal_id]))
+
+async def efecto_linchamiento(canal_id: str, efecto: core.Linchamiento):
+    victima = jugadores_por_partida[canal_id].obtener(efecto.victima_id)
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, f"⚖️ {victima.nombre} ha sido linchado por el pueblo!")
+
+async def efecto_sin_linchamiento(canal_id: str, efecto: core.SinLinchamiento):
+    canal = await cache.obtener_canal(canal_id)
+    if efecto.empate:
+        await salida.enviar(canal, "🤝 La votación terminó en empate. El pueblo no ha decidido linchar a nadie.")
+    else:
+        await salida.enviar(canal, "🤷 Nadie recibió votos hoy. El pueblo no ha decidido linchar a nadie.")
+
+async def efecto_fin(canal_id: str, efecto: core.FinPartida):
+    canal = await cache.obtener_canal(canal_id)
+    # Mafia gana si igualan o superan en número a los ciudadanos
+    if efecto.ganador == Bando.MAFIA:
+        mafiosos_vivos = jugadores_por_partida[canal_id].vivos_con_rol(Rol.MAFIOSO)
+        await salida.enviar(canal, 
+            "🎭 **¡La Mafia ha ganado!**\n"
+            f"Mafiosos restantes: {', '.join(m.nombre for m in mafiosos_vivos)}\n"
+            "El pueblo ha sido dominado por la mafia."
+        )
+    # Ciudadanos ganan si eliminan a todos los mafiosos
+    else:
+        await salida.enviar(canal, 
+            "🏡 **¡Los Ciudadanos han ganado!**\n"
+            "Todos los mafiosos han sido eliminados.\n"
+            "La paz ha vuelto al pueblo."
+        )
+    await terminar_partida(canal_id, efecto.ganador)
+
+# Qué hace mainnn con cada efecto que devuelven las reglas de game/core.py
+EFECTOS = {
+    core.Guardar: efecto_guardar,
+    core.Plazo: efecto_plazo,
+    core.Anochecer: efecto_anochecer,
+    core.VotoRegistrado: efecto_voto,
+    core.DecisionMafia: efecto_decision_mafia,
+    core.Amanecer: efecto_amanecer,
+    core.VotacionAbierta: efecto_votacion,
+    core.Linchamiento: efecto_linchamiento,
+    core.SinLinchamiento: efecto_sin_linchamiento,
+    core.FinPartida: efecto_fin,
+}
+
 async def iniciar_noche(canal_id: str):
     """Inicia la fase nocturna de la partida"""
     if canal_id not in partidas:
         return False
-    
-    partida = partidas[canal_id]
-    partida["estado"] = FaseJuego.NOCHE
-    partida["victima_noche"] = None
-    partida["votos_matar"] = {}
-    
-    # Notificar a todos los jugadores
-    canal = client.get_channel(int(canal_id))
-    await canal.send("🌙 **Anochece en el pueblo... Todos a dormir!**\n"
-                    "Los mafiosos deben decidir a quién eliminar esta noche.")
-    
-    # Enviar instrucciones específicas por roles
-    jugadores = jugadores_por_partida[canal_id]
-    for jugador in jugadores:
-        if not jugador["vivo"]:
-            continue
-            
-        user = await client.fetch_user(int(jugador["id"]))
-        
-        if jugador["rol"] == "Mafioso":
-            # Lista de jugadores vivos (excepto mafiosos)
-            posibles_victimas = [
-                j["nombre"] for j in jugadores 
-                if j["vivo"] and j["rol"] != "Mafioso"
-            ]
-            
-            await user.send(
-                f"🌑 **Es de noche, Mafioso**\n"
-                f"Jugadores disponibles para eliminar: {', '.join(posibles_victimas)}\n"
-                f"Usa el comando `!matar @jugador` para votar por eliminar a alguien."
-            )
-        elif jugador["rol"] == "Doctor":
-            # Lista de todos los jugadores vivos
-            posibles_protegidos = [j["nombre"] for j in jugadores if j["vivo"]]
-            
-            await user.send(
-                f"🏥 **Es de noche, Doctor**\n"
-                f"Puedes proteger a un jugador esta noche: {', '.join(posibles_protegidos)}\n"
-                f"Usa el comando `!proteger @jugador` para salvar a alguien."
-            )
-        elif jugador["rol"] == "Detective":
-            # Lista de todos los jugadores vivos (excepto sí mismo)
-            posibles_investigados = [
-                j["nombre"] for j in jugadores 
-                if j["vivo"] and j["id"] != jugador["id"]
-            ]
-            
-            await user.send(
-                f"🔍 **Es de noche, Detective**\n"
-                f"Puedes investigar a un jugador: {', '.join(posibles_investigados)}\n"
-                f"Usa el comando `!investigar @jugador` para descubrir su rol."
-            )
-    
+    await aplicar_paso(canal_id, core.iniciar_noche(partidas[canal_id], DESEMPATE_NOCHE))
     return True
 
-def procesar_nombre_jugador(input_str: str, jugadores: List[Dict]) -> Optional[Dict]:
+async def iniciar_votacion(canal_id: str):
+    """Inicia la fase de votación diurna"""
+    if canal_id not in partidas:
+        return False
+    await aplicar_paso(canal_id, core.iniciar_votacion(partidas[canal_id], DESEMPATE_DIA))
+    return True
+
+def procesar_nombre_jugador(input_str: str, jugadores: Plantel) -> Optional[Jugador]:
     """Convierte '@Bianca' o 'Bianca' al jugador correspondiente"""
-    input_str = input_str.strip()
-    
-    # Caso 1: Es una mención (@Bianca o <@ID>)
-    if input_str.startswith('@'):
-        nombre_buscado = input_str[1:].lower()
-        for j in jugadores:
-            if j["nombre"].lower().startswith(nombre_buscado):
-                return j
-    elif input_str.startswith('<@') and input_str.endswith('>'):
-        id_buscado = input_str[2:-1].replace('!', '')
-        return next((j for j in jugadores if j["id"] == id_buscado), None)
-    
-    # Caso 2: Es un nombre plano (Bianca)
-    input_lower = input_str.lower()
-    for j in jugadores:
-        if input_lower in j["nombre"].lower():
-            return j
-    
-    return None
+    return jugadores.buscar(input_str)
+
+def id_de_jugador(input_str: str, jugadores: Plantel) -> Optional[str]:
+    jugador = procesar_nombre_jugador(input_str, jugadores)
+    return jugador.id if jugador else None
 
 async def procesar_voto_matar(mafioso_id: str, nombre_victima: str, canal_id: str):
     """Procesa el voto de un mafioso para eliminar a un jugador por NOMBRE (no mención)"""
-    print(f"[DEBUG] Procesando voto para matar a '{nombre_victima}'")
+    log_voto = registro_con_contexto(log, canal_id=canal_id, usuario_id=mafioso_id)
+    log_voto.debug("Procesando voto para matar a %r", nombre_victima)
     
     if canal_id not in partidas:
-        print("[DEBUG] No hay partida activa en este canal")
-        return False
-    
-    partida = partidas[canal_id]
-    
-    # Verificar que sea de noche
-    if partida["estado"] != FaseJuego.NOCHE:
-        print(f"[DEBUG] No es noche (estado actual: {partida['estado']})")
+        log_voto.debug("No hay partida activa en este canal")
         return False
     
     jugadores = jugadores_por_partida[canal_id]
-    
-    # 1. Verificar que el votante es mafioso vivo
-    mafioso = next((j for j in jugadores if j["id"] == mafioso_id and j["rol"] == "Mafioso" and j["vivo"]), None)
-    if not mafioso:
-        print(f"[DEBUG] El jugador {mafioso_id} no es mafioso vivo")
-        return False
-    
-    # Buscar víctima (soporta ambos formatos)
-    victima = procesar_nombre_jugador(nombre_victima, jugadores)  # Cambiado de input_victima a nombre_victima
-    
-    if not victima:
-        print(f"[DEBUG] No se encontró jugador válido con nombre: {nombre_victima}")
-        print(f"[DEBUG] Jugadores disponibles: {[j['nombre'] for j in jugadores if j['vivo'] and j['rol'] != 'Mafioso']}")
-        return False
-    
-    if not victima["vivo"] or victima["rol"] == "Mafioso":
-        print(f"[DEBUG] Víctima no válida. Input: '{nombre_victima}'")
-        print(f"Jugadores válidos: {[j['nombre'] for j in jugadores if j['vivo'] and j['rol'] != 'Mafioso']}")
+    paso = core.votar_matar(partidas[canal_id], jugadores, mafioso_id,
+                            id_de_jugador(nombre_victima, jugadores))
+    if paso is None:
+        # La lista solo se construye si de verdad se va a registrar
+        if log_voto.isEnabledFor(logging.DEBUG):
+            log_voto.debug(
+                "Voto no válido contra %r (estado: %s). Jugadores válidos: %s", nombre_victima,
+                partidas[canal_id]["estado"], [j.nombre for j in jugadores.vivos() if j.rol != Rol.MAFIOSO]
+            )
         return False
     
-    # Registrar voto
-    partida["votos_matar"][mafioso_id] = victima["id"]
-    print(f"[DEBUG] Voto registrado: {mafioso_id} -> {victima['nombre']} ({victima['id']})")
-    
-    
-    # Notificar al mafioso
-    try:
-        user = await client.fetch_user(int(mafioso_id))
-        await user.send(f"✅ Has votado por eliminar a {victima['nombre']}.")
-    except Exception as e:
-        print(f"[ERROR] No se pudo enviar DM: {e}")
-    
-    # Verificar si todos los mafiosos han votado
-    mafiosos_vivos = [j for j in jugadores if j["rol"] == "Mafioso" and j["vivo"]]
-    if len(partida["votos_matar"]) == len(mafiosos_vivos):
-        print("[DEBUG] Todos los mafiosos han votado")
-        # Decidir víctima por mayoría
-        victima_id = max(
-            set(partida["votos_matar"].values()), 
-            key=list(partida["votos_matar"].values()).count
-        )
-        victima = next(j for j in jugadores if j["id"] == victima_id)
-        partida["victima_noche"] = victima_id
-        
-        # Notificar a los mafiosos
-        for m in mafiosos_vivos:
-            try:
-                user = await client.fetch_user(int(m["id"]))
-                await user.send(f"☠️ Decisión final: Eliminar a {victima['nombre']}")
-            except:
-                continue
-    
+    await aplicar_paso(canal_id, paso)
+    log_voto.debug("Voto registrado contra %r", nombre_victima)
     return True
 
-async def finalizar_noche(canal_id: str):
-    """Finaliza la fase nocturna y procesa las acciones"""
+async def procesar_voto_lynch(jugador_id: str, votado_nombre: str, canal_id: str):
+    """Procesa el voto de un jugador para linchar a otro"""
     if canal_id not in partidas:
         return False
     
-    partida = partidas[canal_id]
-    
-    # Verificar que sea de noche
-    if partida["estado"] != FaseJuego.NOCHE:
-        return False
-    
-    # Procesar la víctima (si hay)
-    mensaje_amanecer = "☀️ **Amanece en el pueblo...**\n"
     jugadores = jugadores_por_partida[canal_id]
-    
-    if partida["victima_noche"]:
-        victima = next(j for j in jugadores if j["id"] == partida["victima_noche"])
-        victima["vivo"] = False
-        mensaje_amanecer += f"🔪 {victima['nombre']} ha sido encontrado/a muerto/a esta mañana.\n"
-    else:
-        mensaje_amanecer += "¡Todos han sobrevivido la noche!\n"
-    
-    # Cambiar a fase diurna
-    partida["estado"] = FaseJuego.DIA
-    canal = client.get_channel(int(canal_id))
-    await canal.send(mensaje_amanecer)
-    
+    paso = core.votar_linchar(partidas[canal_id], jugadores, jugador_id,
+                              id_de_jugador(votado_nombre, jugadores))
+    if paso is None:
+        return False
+    await aplicar_paso(canal_id, paso)
     return True
 
-async def iniciar_votacion(canal_id: str):
-    """Inicia la fase de votación diurna"""
+
+def obtener_estadisticas() -> Estadisticas:
+    """Las estadísticas, creadas la primera vez que se guardan o se consultan"""
+    global estadisticas
+    if estadisticas is None:
+        estadisticas = Estadisticas(os.getenv('ESTADISTICAS', 'estadisticas.db'))
+    return estadisticas
+
+def cerrar_almacenes():
+    """Escribe lo pendiente del diario y de las estadísticas y detiene sus hilos"""
+    diario.cerrar()
+    if estadisticas is not None:
+        estadisticas.cerrar()
+
+async def terminar_partida(canal_id: str, ganador: Optional[Bando] = None):
+    """Finaliza la partida y limpia los datos"""
     if canal_id not in partidas:
-        return False
-    
-    partida = partidas[canal_id]
-    partida["estado"] = FaseJuego.VOTACION
-    partida["votos_lynch"] = {}  # {jugador_id: jugador_votado}
+        return
     
-    # Obtener lista de jugadores vivos
+    # Mostrar todos los roles
     jugadores = jugadores_por_partida[canal_id]
-    vivos = [j for j in jugadores if j["vivo"]]
-    
-    # Notificar a todos los jugadores
-    canal = client.get_channel(int(canal_id))
-    await canal.send(
-        "🗳️ **Comienza la votación diurna!**\n"
-        f"Jugadores vivos: {', '.join(j['nombre'] for j in vivos)}\n"
-        "Usa `!votar @jugador` para votar por linchar a alguien."
-    )
-    
-    return True
+    canal = await cache.obtener_canal(canal_id)
+    await salida.enviar(canal, textos.roles_finales(jugadores))
+    
+    if ganador is not None:
+        obtener_estadisticas().registrar(canal_id, ganador.value, [
+            Resultado(j.id, j.nombre, j.rol.value, bando_del_rol(j.rol) == ganador, j.vivo)
+            for j in jugadores if j.rol is not None
+        ])
+    diario.registrar(canal_id, "fin", None)
+    liberar_partida(canal_id)
+
+def liberar_partida(canal_id: str):
+    """Quita de memoria todo lo de una partida (no toca el diario)"""
+    for jugador in jugadores_por_partida.pop(canal_id):
+        desvincular_jugador(jugador.id, canal_id)
+    del partidas[canal_id]
+    textos.olvidar(canal_id)
+    planificador.cancelar(canal_id)
+    actividad.olvidar(canal_id)
+
+AVISOS_EXPULSION = {
+    "inactividad": "⏰ La partida se ha cerrado por inactividad.",
+    "memoria": "💾 La partida se ha cerrado para dejar sitio a otras partidas.",
+}
 
-async def finalizar_votacion(canal_id: str):
-    """Finaliza la votación y procesa el resultado"""
+async def expulsar_partida(canal_id: str, motivo: str):
+    """Cierra una partida abandonada o que no cabe, archivándola si está configurado"""
     if canal_id not in partidas:
-        return False
-    
-    partida = partidas[canal_id]
-    
-    # Verificar que sea fase de votación
-    if partida["estado"] != FaseJuego.VOTACION:
-        return False
+        actividad.olvidar(canal_id)
+        return
     
-    jugadores = jugadores_por_partida[canal_id]
-    vivos = [j for j in jugadores if j["vivo"]]
-    
-    # Determinar el jugador más votado
-    votos = list(partida["votos_lynch"].values())
-    if votos:
-        victima_id = max(set(votos), key=votos.count)
-        victima = next(j for j in jugadores if j["id"] == victima_id)
-        victima["vivo"] = False
-        
-        # Notificar al canal
-        canal = client.get_channel(int(canal_id))
-        await canal.send(f"⚖️ {victima['nombre']} ha sido linchado por el pueblo!")
-        
-        # Verificar si el juego ha terminado
-        if await verificar_fin_juego(canal_id):
-            return True
+    log.info("Expulsando partida (%s)", motivo, extra={"canal_id": canal_id})
+    if ARCHIVAR_EXPULSADAS:
+        diario.archivar(canal_id, serializar_partida(canal_id))
     else:
-        await canal.send("🤷 Nadie recibió votos hoy. El pueblo no ha decidido linchar a nadie.")
+        diario.registrar(canal_id, "fin", None)
+    liberar_partida(canal_id)
     
-    return True
+    aviso = AVISOS_EXPULSION[motivo]
+    if ARCHIVAR_EXPULSADAS:
+        aviso += f" Usa `{PREFIJO}mafia reanudar` para continuarla."
+    try:
+        canal = await cache.obtener_canal(canal_id)
+        await salida.enviar(canal, aviso)
+    except Exception:
+        log.warning("No se pudo avisar de la expulsión", exc_info=True, extra={"canal_id": canal_id})
 
-async def procesar_voto_lynch(jugador_id: str, votado_nombre: str, canal_id: str):
-    """Procesa el voto de un jugador para linchar a otro"""
+def sigue_sobrando(canal_id: str, motivo: str) -> bool:
+    """Si la partida aún merece expulsarse (pudo tener actividad desde que se pidió)"""
     if canal_id not in partidas:
-        return False
+        return True  # expulsar_partida solo limpiará el registro de actividad
+    if motivo == "inactividad":
+        return actividad.segundos_inactiva(canal_id) >= ttl_de_partida(canal_id)
+    return canal_id in actividad.sobrantes(MAX_PARTIDAS)
+
+def pedir_expulsion(canal_id: str, motivo: str):
+    """Encola la expulsión en el turno de la partida (una sola vez aunque se pida varias)"""
+    if canal_id in expulsiones_pendientes:
+        return
     
-    partida = partidas[canal_id]
+    async def en_turno():
+        expulsiones_pendientes.discard(canal_id)
+        if sigue_sobrando(canal_id, motivo):
+            await expulsar_partida(canal_id, motivo)
     
-    # Verificar que sea fase de votación
-    if partida["estado"] != FaseJuego.VOTACION:
-        return False
+    # Si el buzón está lleno la partida no está abandonada: ya se verá en el siguiente barrido
+    if actores.enviar(canal_id, en_turno, descripcion=f"expulsar ({motivo})"):
+        expulsiones_pendientes.add(canal_id)
+
+def ttl_de_partida(canal_id: str) -> float:
+    return TTL_SALA if partidas[canal_id]["estado"] == FaseJuego.ESPERANDO else TTL_PARTIDA
+
+async def barrer_partidas():
+    """Cierra las partidas inactivas y las que exceden MAX_PARTIDAS; se reprograma sola"""
+    try:
+        for canal_id in actividad.inactivas(ttl_de_partida, min(TTL_SALA, TTL_PARTIDA)):
+            pedir_expulsion(canal_id, "inactividad")
+        for canal_id in actividad.sobrantes(MAX_PARTIDAS):
+            pedir_expulsion(canal_id, "memoria")
+    finally:
+        planificador.programar(CLAVE_BARRIDO, BARRIDO_INACTIVIDAD, barrer_partidas)
+
+async def avanzar_fase(canal_id: str):
+    """Pasa a la siguiente fase (a mano con !siguiente o al vencer el plazo)"""
+    partida = partidas.get(canal_id)
+    if partida is None:
+        return
     
-    jugadores = jugadores_por_partida[canal_id]
+    # Si el linchamiento termina la partida ya no hay noche que iniciar
+    await aplicar_paso(canal_id, core.avanzar(partida, jugadores_por_partida[canal_id],
+                                              DESEMPATE_NOCHE, DESEMPATE_DIA))
+
+DURACION_FASE = {
+    FaseJuego.NOCHE: DURACION_NOCHE,
+    FaseJuego.DIA: DURACION_DIA,
+    FaseJuego.VOTACION: DURACION_VOTACION,
+}
+
+def programar_fase(canal_id: str, fase: FaseJuego, segundos: float):
+    """Avanza la partida cuando pasen `segundos` si para entonces sigue en `fase`"""
+    async def avanzar_si_sigue():
+        partida = partidas.get(canal_id)
+        if partida is not None and partida["estado"] == fase:
+            await avanzar_fase(canal_id)
+    
+    async def vencer():
+        # El plazo no se descarta aunque el buzón esté lleno: espera su turno
+        await actores.ejecutar(canal_id, avanzar_si_sigue, esperar=True, descripcion=f"plazo {fase.name.lower()}")
+    
+    planificador.programar(canal_id, segundos, vencer)
+
+def resolver_partida(autor_id: str, canal_id: str, es_privado: bool):
+    """Encuentra la partida (y el jugador) a la que va dirigido un comando"""
+    # El canal de un DM no es el de la partida: buscarla por el autor
+    if es_privado:
+        canal_id = partida_del_jugador(autor_id)
+    partida = partidas.get(canal_id)
+    if partida is None:
+        return None, None, None
+    return canal_id, partida, jugadores_por_partida[canal_id].obtener(autor_id)
+
+router = Router(resolver_partida, enviar=salida.enviar, actores=actores)
+
+# Comandos de Mafia (!mafia crear/unirme)
+@router.comando("!mafia crear")
+async def comando_crear(ctx: Contexto):
+    if not ctx.args:
+        await ctx.responder("❌ Debes especificar el número de jugadores. Ejemplo: `!mafia crear 6`")
+        return
     
-    # Verificar que el votante está vivo
-    votante = next((j for j in jugadores if j["id"] == jugador_id and j["vivo"]), None)
-    if not votante:
-        return False
+    try:
+        num_jugadores = int(ctx.args[0])
+    except ValueError:
+        await ctx.responder("❌ El número de jugadores debe ser un valor numérico.")
+        return
     
-    # Verificar que el votado existe y está vivo
-    votado = next((j for j in jugadores if j["nombre"] == votado_nombre and j["vivo"]), None)
-    if not votado or votado["id"] == jugador_id:
-        return False
+    respuesta = await crear_partida(str(ctx.canal.id), ctx.autor_id, num_jugadores)
+    if ctx.autor_id in partida_por_usuario:
+        cache.recordar_usuario(ctx.autor)
+    await ctx.responder(respuesta)
+
+@router.comando("!mafia unirme")
+async def comando_unirme(ctx: Contexto):
+    # Sin caché de miembros: el autor es el único miembro que necesitamos y ya lo tenemos
+    cache.recordar_usuario(ctx.autor)
+    respuesta = await unirse_a_partida(
+        str(ctx.canal.id),
+        ctx.autor_id,
+        ctx.autor.display_name
+    )
+    await ctx.responder(respuesta)
+
+@router.comando("!mafia buscar", Ambito.SERVIDOR)
+async def comando_buscar(ctx: Contexto):
+    # `!mafia buscar [jugadores] [idioma]`, en cualquier orden
+    tamano, idioma = TAMANO_EMPAREJAMIENTO, IDIOMA
+    for arg in ctx.args:
+        if arg.isdigit():
+            tamano = int(arg)
+        elif arg.isalpha() and len(arg) == 2:
+            idioma = arg.lower()
+        else:
+            await ctx.responder(f"❌ Usa: `{PREFIJO}mafia buscar [jugadores] [idioma]`, p. ej. `{PREFIJO}mafia buscar 8 es`")
+            return
+    if tamano < MIN_JUGADORES:
+        await ctx.responder(f"❌ Se necesitan al menos {MIN_JUGADORES} jugadores para una partida de Mafia.")
+        return
+    aviso = aviso_otra_partida(ctx.autor_id)
+    if aviso:
+        await ctx.responder(aviso)
+        return
     
-    # Registrar voto
-    partida["votos_lynch"][jugador_id] = votado["id"]
+    cache.recordar_usuario(ctx.autor)
+    solicitud = Solicitud(ctx.autor_id, ctx.autor.display_name, str(ctx.canal.id), str(ctx.canal.guild.id),
+                          tamano, idioma, time.monotonic())
+    sala = obtener_emparejador().encolar(solicitud)
+    if sala is not None:
+        repartir_sala(sala)
+        await ctx.responder(f"🎯 ¡Ya sois {len(sala)}! Preparando la partida...")
+        return
     
-    # Notificar al votante
-    user = await client.fetch_user(int(jugador_id))
-    await user.send(f"✅ Has votado por linchar a {votado_nombre}.")
+    programar_vencimientos()
+    espera = (f"{ESPERA_EMPAREJAMIENTO // 60} min" if ESPERA_EMPAREJAMIENTO >= 60
+              else f"{ESPERA_EMPAREJAMIENTO} s")
+    await ctx.responder(f"🔎 Buscando partida de {tamano} jugadores ({idioma}): {emparejador.en_cubo(solicitud)}/{tamano} "
+                        f"en la cola. Si en {espera} no se llena, empieza con los que haya (mínimo {MIN_JUGADORES}). "
+                        f"`{PREFIJO}mafia cancelar` para salir de la cola.")
+
+@router.comando("!mafia cancelar")
+async def comando_cancelar(ctx: Contexto):
+    if emparejador is None or emparejador.cancelar(ctx.autor_id) is None:
+        await ctx.responder("⚠️ No estás buscando partida.")
+    else:
+        await ctx.responder("👋 Has salido de la cola de emparejamiento.")
+
+@router.comando("!mafia reanudar", Ambito.SERVIDOR)
+async def comando_reanudar(ctx: Contexto):
+    canal_id = str(ctx.canal.id)
+    if canal_id in partidas:
+        await ctx.responder("⚠️ Ya hay una partida en curso en este canal.")
+        return
     
-    return True
+    datos = await asyncio.get_running_loop().run_in_executor(None, diario.sacar_archivada, canal_id)
+    if datos is None:
+        await ctx.responder("⚠️ No hay ninguna partida guardada en este canal.")
+        return
+    
+    ocupados = [nombre for jugador_id, nombre, _, _ in datos["jugadores"] if partida_del_jugador(jugador_id)]
+    if ocupados:
+        diario.archivar(canal_id, datos)  # Se deja guardada para más adelante
+        await ctx.responder(f"⚠️ Estos jugadores están ahora en otra partida: {', '.join(ocupados)}")
+        return
+    
+    restaurar_partida(canal_id, datos)
+    fase = partidas[canal_id]["estado"]
+    if fase in DURACION_FASE:
+        programar_fase(canal_id, fase, DURACION_FASE[fase])
+    guardar_partida(canal_id, "reanudar")
+    await ctx.responder(f"▶️ Partida reanudada ({fase.name.lower()}).")
 
-async def verificar_fin_juego(canal_id: str):
-    """Verifica si el juego ha terminado (mafia o ciudadanos ganan)"""
-    if canal_id not in partidas:
-        return False
+@router.comando("!mafia rol", Ambito.PRIVADO, en_partida=True)
+async def comando_rol(ctx: Contexto):
+    jugador = ctx.jugador
+    if jugador is None or jugador.rol is None:
+        await ctx.responder("⚠️ Aún no se han repartido los roles.")
+        return
     
-    jugadores = jugadores_por_partida[canal_id]
-    vivos = [j for j in jugadores if j["vivo"]]
-    mafiosos_vivos = [j for j in vivos if j["rol"] == "Mafioso"]
-    ciudadanos_vivos = [j for j in vivos if j["rol"] != "Mafioso"]
+    jugadores = jugadores_por_partida[ctx.canal_id]
+    texto = textos.mensaje_rol(ctx.canal_id, jugadores, jugador)
+    if jugador.vivo and ctx.partida["estado"] == FaseJuego.NOCHE:
+        instrucciones = textos.instrucciones_noche(ctx.canal_id, jugadores, jugador)
+        if instrucciones:
+            texto = texto.rstrip() + "\n\n" + instrucciones
+        victima_id = ctx.partida["victima_noche"]
+        if jugador.rol == Rol.MAFIOSO and victima_id:
+            texto += f"\n☠️ Decisión final: Eliminar a {jugadores.obtener(victima_id).nombre}"
+    await ctx.responder(texto)
+
+def porcentaje(parte: int, total: int) -> str:
+    return f"{100 * parte // total}%" if total else "-"
+
+def texto_ficha(ficha: FichaJugador) -> str:
+    totales = ficha.totales
+    lineas = [
+        f"📊 **Estadísticas de {ficha.nombre}**",
+        f"Partidas: {totales.partidas} · Victorias: {totales.victorias} "
+        f"({porcentaje(totales.victorias, totales.partidas)}) · "
+        f"Sobrevivió: {porcentaje(totales.supervivencias, totales.partidas)}",
+    ]
+    for rol in Rol:
+        por_rol = ficha.por_rol.get(rol.value)
+        if por_rol:
+            lineas.append(f"- {rol.value}: {por_rol.partidas} partidas, {por_rol.victorias} victorias")
+    return "\n".join(lineas)
+
+@router.comando("!mafia stats")
+async def comando_stats(ctx: Contexto):
+    # `!mafia stats` para uno mismo, `!mafia stats @jugador` para otro
+    jugador_id = ctx.autor_id
+    if ctx.args:
+        mencion = ctx.args[0]
+        if not (mencion.startswith("<@") and mencion.endswith(">")):
+            await ctx.responder(f"❌ Usa: `{PREFIJO}mafia stats` o `{PREFIJO}mafia stats @jugador`")
+            return
+        jugador_id = mencion[2:-1].replace("!", "")
     
-    canal = client.get_channel(int(canal_id))
+    ficha = await asyncio.get_running_loop().run_in_executor(None, obtener_estadisticas().ficha, jugador_id)
+    if ficha is None:
+        await ctx.responder("📊 Todavía no hay partidas terminadas de ese jugador.")
+        return
+    await ctx.responder(texto_ficha(ficha))
+
+@router.comando("!mafia ranking")
+async def comando_ranking(ctx: Contexto):
+    # Casi siempre está en memoria; solo tras terminar alguna partida hay que leer el disco
+    ranking = obtener_estadisticas().ranking_en_memoria()
+    if ranking is None:
+        ranking = await asyncio.get_running_loop().run_in_executor(None, obtener_estadisticas().ranking)
+    if not ranking:
+        await ctx.responder("🏆 Todavía no ha terminado ninguna partida.")
+        return
     
-    # Mafia gana si igualan o superan en número a los ciudadanos
-    if len(mafiosos_vivos) >= len(ciudadanos_vivos):
-        await canal.send(
-            "🎭 **¡La Mafia ha ganado!**\n"
-            f"Mafiosos restantes: {', '.join(m['nombre'] for m in mafiosos_vivos)}\n"
-            "El pueblo ha sido dominado por la mafia."
-        )
-        await terminar_partida(canal_id)
-        return True
+    lineas = ["🏆 **Ranking de la Mafia**"]
+    for puesto, (nombre, totales) in enumerate(ranking, 1):
+        lineas.append(f"{puesto}. {nombre}: {totales.victorias} victorias en {totales.partidas} partidas")
+    await ctx.responder("\n".join(lineas))
+
+@router.comando("!mafia")
+async def comando_mafia_invalido(ctx: Contexto):
+    if not ctx.args:
+        await ctx.responder("❌ Comando inválido. Usa `!mafia crear <jugadores>`, `!mafia unirme` o `!mafia buscar`")
+    else:
+        await ctx.responder("❌ Comando no reconocido. Usa `!mafia crear <jugadores>`, `!mafia unirme` o `!mafia buscar`")
+
+# Comandos de noche (DMs)
+@router.comando("!matar", Ambito.PRIVADO, fases={FaseJuego.NOCHE}, roles={Rol.MAFIOSO})
+async def comando_matar(ctx: Contexto):
+    input_victima = ctx.texto
+    if not input_victima:
+        await ctx.responder("❌ Usa: `!matar @jugador` o `!matar Nombre`")
+        return
     
-    # Ciudadanos ganan si eliminan a todos los mafiosos
-    if not mafiosos_vivos:
-        await canal.send(
-            "🏡 **¡Los Ciudadanos han ganado!**\n"
-            "Todos los mafiosos han sido eliminados.\n"
-            "La paz ha vuelto al pueblo."
-        )
-        await terminar_partida(canal_id)
-        return True
+    if await procesar_voto_matar(
+        mafioso_id=ctx.autor_id, 
+        nombre_victima=input_victima,
+        canal_id=ctx.canal_id
+    ):
+        await ctx.responder(f"✅ Voto registrado contra {input_victima}")
+    else:
+        await ctx.responder("❌ No puedes matar a ese jugador. Razones:")
+        await ctx.responder("- No existe/no está vivo")
+        await ctx.responder("- Es otro mafioso")
+        await ctx.responder("- Comando mal formado")
+
+@router.comando("!proteger", Ambito.PRIVADO, fases={FaseJuego.NOCHE}, roles={Rol.DOCTOR})
+async def comando_proteger(ctx: Contexto):
+    jugadores = jugadores_por_partida[ctx.canal_id]
+    # Se puede cambiar de idea hasta que termine la noche
+    paso = core.proteger(ctx.partida, jugadores, id_de_jugador(ctx.texto, jugadores))
+    if paso is None:
+        await ctx.responder("❌ Ese jugador no existe o no está vivo.")
+        return
     
-    return False
+    await ctx.responder(f"🛡️ Has protegido a {jugadores.obtener(paso.partida['protegido']).nombre} esta noche.")
+    await aplicar_paso(ctx.canal_id, paso)
 
-async def terminar_partida(canal_id: str):
-    """Finaliza la partida y limpia los datos"""
-    if canal_id not in partidas:
+@router.comando("!investigar", Ambito.PRIVADO, fases={FaseJuego.NOCHE}, roles={Rol.DETECTIVE})
+async def comando_investigar(ctx: Contexto):
+    if ctx.partida.get("investigado"):
+        await ctx.responder("⚠️ Ya has investigado a alguien esta noche.")
         return
     
-    # Mostrar todos los roles
-    jugadores = jugadores_por_partida[canal_id]
-    mensaje = "🔍 **Roles de todos los jugadores:**\n"
-    for jugador in jugadores:
-        mensaje += f"- {jugador['nombre']}: {jugador['rol']}\n"
+    jugadores = jugadores_por_partida[ctx.canal_id]
+    paso = core.investigar(ctx.partida, jugadores, ctx.autor_id, id_de_jugador(ctx.texto, jugadores))
+    if paso is None:
+        await ctx.responder("❌ No puedes investigar a ese jugador.")
+        return
+    
+    investigado = jugadores.obtener(paso.partida["investigado"])
+    await ctx.responder(f"🔍 {investigado.nombre} es **{investigado.rol.value}**.")
+    await aplicar_paso(ctx.canal_id, paso)
+
+# Comandos de votación diurna (DMs)
+@router.comando("!votar", Ambito.PRIVADO, fases={FaseJuego.VOTACION})
+async def comando_votar(ctx: Contexto):
+    if await procesar_voto_lynch(ctx.autor_id, ctx.texto, ctx.canal_id):
+        await ctx.responder(f"✅ Voto para linchar a {ctx.texto} registrado.")
+    else:
+        await ctx.responder("❌ Voto no válido.")
+
+# Comandos PÚBLICOS (solo para moderadores)
+@router.comando("!mafia perfil", Ambito.SERVIDOR, admin=True)
+async def comando_perfil(ctx: Contexto):
+    global captura_perfil, perfilador
+    from bot.vigilancia import MAX_SEGUNDOS_PERFIL, Perfilador
+    try:
+        segundos = int(ctx.args[0]) if ctx.args else SEGUNDOS_PERFIL
+    except ValueError:
+        segundos = 0
+    if not 1 <= segundos <= MAX_SEGUNDOS_PERFIL:
+        await ctx.responder(f"❌ Usa: `{PREFIJO}mafia perfil [segundos]` (de 1 a {MAX_SEGUNDOS_PERFIL})")
+        return
+    if not Perfilador.disponible():
+        await ctx.responder("❌ Los perfiles solo funcionan en Linux o macOS.")
+        return
+    if perfilador is None:
+        perfilador = Perfilador(os.getenv('PERFILES', 'perfiles'))
+    if perfilador.ocupado:
+        await ctx.responder("⏳ Ya se está capturando un perfil. Espera a que termine.")
+        return
     
-    canal = client.get_channel(int(canal_id))
-    await canal.send(mensaje)
+    # Se captura fuera del turno de la partida: sus comandos siguen atendiéndose (y saliendo en el perfil)
+    async def capturar():
+        perfil = await perfilador.capturar(segundos)
+        if perfil is None:
+            return
+        ruta, muestras = perfil
+        await salida.enviar(canal, f"📈 Perfil guardado en `{ruta}` ({muestras} muestras). "
+                                   "Ábrelo con speedscope o flamegraph.pl.")
     
-    # Limpiar datos de la partida
-    del partidas[canal_id]
-    del jugadores_por_partida[canal_id]
+    canal = ctx.canal
+    captura_perfil = asyncio.create_task(capturar())
+    await ctx.responder(f"⏱️ Capturando un perfil del bot durante {segundos} s...")
+
+@router.comando("!siguiente", Ambito.SERVIDOR, admin=True,
+                fases={FaseJuego.NOCHE, FaseJuego.DIA, FaseJuego.VOTACION})
+async def comando_siguiente(ctx: Contexto):
+    era_de_noche = ctx.partida["estado"] == FaseJuego.NOCHE
+    actividad.tocar(ctx.canal_id)
+    await avanzar_fase(ctx.canal_id)
+    if era_de_noche:
+        await ctx.responder("🌅 La noche ha terminado. ¡Es de día!")
+
+def desviar_mensaje(message) -> bool:
+    """Si un DM es de un jugador cuya partida lleva otro proceso, se lo reenvía"""
+    if reenvio is None or message.guild is not None:
+        return False
+    autor_id = str(message.author.id)
+    if autor_id in partida_por_usuario:
+        return False
+    return reenvio.reenviar_si_ajeno(autor_id, message.channel.id, message.id)
 
-@client.event
-async def on_ready():
-    print(f'✅ Bot conectado como {client.user}')
-    print('✅ Bot conectado - Debug inicial funcionando')  # <-- Añade esto
+async def procesar_reenviado(canal_id: int, mensaje_id: int):
+    """Procesa un DM que recibió otro proceso pero cuya partida es nuestra"""
+    canal = await client.fetch_channel(canal_id)
+    mensaje = await canal.fetch_message(mensaje_id)
+    await router.despachar(mensaje)
 
-@client.event
-async def on_message(message):
+async def precalentar(canales: List[str]):
+    """Resuelve en segundo plano los canales (y DMs) de las partidas restauradas"""
+    privados = [] if MODO_BARRA else [
+        jugador.id for canal_id in canales if canal_id in jugadores_por_partida
+        for jugador in jugadores_por_partida[canal_id] if jugador.vivo
+    ]
+    fallos = await cache.precalentar(canales, privados)
+    arranque.marcar("precalentado")
+    if fallos:
+        log.warning("No se pudieron precalentar %d canales o DMs", fallos)
 
-    # Debug para todos los mensajes
-    print(f"\n📨 Mensaje recibido - Tipo: {'DM' if isinstance(message.channel, discord.DMChannel) else 'Server'}")
-    print(f"Contenido: {repr(message.content)}")
-    print(f"Autor: {message.author} (ID: {message.author.id})")
-    print(f"Canal: {message.channel} (ID: {message.channel.id})")
+async def preparar_partidas():
+    """Restaura las partidas y deja pasar los comandos que esperaban"""
+    global tarea_precalentar
+    await restaurar_partidas()
+    if router.preparado is not None:
+        router.preparado.set()
+    arranque.marcar("listo")
+    if not planificador.pendiente(CLAVE_BARRIDO):
+        planificador.programar(CLAVE_BARRIDO, BARRIDO_INACTIVIDAD, barrer_partidas)
+    if reenvio:
+        reenvio.escuchar(asyncio.get_running_loop(), procesar_reenviado)
+    if tarea_precalentar is None:
+        tarea_precalentar = asyncio.create_task(precalentar(list(partidas)), name="precalentar")
 
-    if isinstance(message.channel, discord.DMChannel):
-        print("🔒 Este es un mensaje directo (DM)")
-        # Debug adicional para DMs
-        print(f"Bot puede ver DM: {message.channel.me}")  # Debería mostrar info del bot
+async def servir_metricas(puerto: int):
+    global servidor_metricas
+    from bot.metricas import servir
+    registrar_medidores()
+    servidor_metricas = await servir(METRICAS, puerto=puerto)
 
-    if message.author == client.user:
+def vigilar_bucle():
+    """Arranca el vigilante del bucle (ver bot/vigilancia.py) si VIGILAR_BUCLE lo permite"""
+    global vigilante
+    if not VIGILAR_BUCLE:
         return
-    
-    # Comando básico de prueba
-    if message.content.lower() == 'hola':
-        await message.channel.send('¡Hola! Soy un bot de Mafia. 🤖')
-    
-    # Comandos de Mafia (!mafia crear/unirme)
-    if message.content.startswith('!mafia'):
-        comando = message.content.split()
-        
-        if len(comando) < 2:
-            await message.channel.send("❌ Comando inválido. Usa `!mafia crear <jugadores>` o `!mafia unirme`")
-            return
-        
-        if comando[1].lower() == "crear":
-            if len(comando) < 3:
-                await message.channel.send("❌ Debes especificar el número de jugadores. Ejemplo: `!mafia crear 6`")
-                return
-            
-            try:
-                num_jugadores = int(comando[2])
-                respuesta = await crear_partida(str(message.channel.id), str(message.author.id), num_jugadores)
-                await message.channel.send(respuesta)
-            except ValueError:
-                await message.channel.send("❌ El número de jugadores debe ser un valor numérico.")
-        
-        elif comando[1].lower() == "unirme":
-            respuesta = await unirse_a_partida(
-                str(message.channel.id),
-                str(message.author.id),
-                message.author.display_name
-            )
-            await message.channel.send(respuesta)
-        
-        else:
-            await message.channel.send("❌ Comando no reconocido. Usa `!mafia crear <jugadores>` o `!mafia unirme`")
+    if vigilante is None:
+        from bot.vigilancia import Vigilante
+        vigilante = Vigilante(describir=actores.describir)
+    vigilante.iniciar()
 
-    # Comandos durante el juego (DMs y canal)
-    canal_id = str(message.channel.id)
-    if canal_id in partidas and partidas[canal_id]["estado"] != FaseJuego.ESPERANDO:
-        partida = partidas[canal_id]
-        
-        # Comandos PRIVADOS (DMs)
-        if isinstance(message.channel, discord.DMChannel):
-            print(f'[DM] De {message.author}: {message.content}')
-            jugadores = jugadores_por_partida[canal_id]
-            jugador = next((j for j in jugadores if j["id"] == str(message.author.id)), None)
-            
-            if not jugador:
-                await message.channel.send("⚠️ No estás en una partida activa.")
-                return
-                
-            if not jugador["vivo"]:
-                await message.channel.send("💀 Ya has sido eliminado de la partida.")
-                return
-            
-            # Comandos de noche
-            if partida["estado"] == FaseJuego.NOCHE:
-                if message.content.startswith('!matar') and jugador["rol"] == "Mafioso":
-                    input_victima = message.content[len('!matar'):].strip()
-                    
-                    if not input_victima:
-                        await message.channel.send("❌ Usa: `!matar @jugador` o `!matar Nombre`")
-                        return
-                    
-                    if await procesar_voto_matar(
-                        mafioso_id=str(message.author.id), 
-                        nombre_victima=input_victima,  # Nombre del parámetro corregido
-                        canal_id=canal_id
-                    ):
-                        await message.channel.send(f"✅ Voto registrado contra {input_victima}")
-                    else:
-                        await message.channel.send("❌ No puedes matar a ese jugador. Razones:")
-                        await message.channel.send("- No existe/no está vivo")
-                        await message.channel.send("- Es otro mafioso")
-                        await message.channel.send("- Comando mal formado")
-                    
-                elif message.content.startswith('!proteger') and jugador["rol"] == "Doctor":
-                    protegido = ' '.join(message.content.split()[1:])
-                    # Implementación real de protección
-                    await message.channel.send(f"🛡️ Has protegido a {protegido} (acción registrada)")
-                    return
-                    
-                elif message.content.startswith('!investigar') and jugador["rol"] == "Detective":
-                    investigado = ' '.join(message.content.split()[1:])
-                    # Implementación real de investigación
-                    await message.channel.send(f"🔍 Has investigado a {investigado} (acción registrada)")
-                    return
-            
-            # Comandos de votación diurna
-            elif partida["estado"] == FaseJuego.VOTACION:
-                if message.content.startswith('!votar'):
-                    votado = ' '.join(message.content.split()[1:])
-                    if await procesar_voto_lynch(str(message.author.id), votado, canal_id):
-                        await message.channel.send(f"✅ Voto para linchar a {votado} registrado.")
-                    else:
-                        await message.channel.send("❌ Voto no válido.")
-                    return
-        
-        # Comandos PÚBLICOS (solo para moderadores)
-        if message.content.startswith('!siguiente') and message.author.guild_permissions.administrator:
-            if partida["estado"] == FaseJuego.NOCHE:
-                await finalizar_noche(canal_id)
-                await message.channel.send("🌅 La noche ha terminado. ¡Es de día!")
-            elif partida["estado"] == FaseJuego.DIA:
-                await iniciar_votacion(canal_id)
-            elif partida["estado"] == FaseJuego.VOTACION:
-                await finalizar_votacion(canal_id)
-                await iniciar_noche(canal_id)
-# Iniciar el bot
-client.run(TOKEN)
\ No newline at end of file
+async def al_conectar():
+    global comandos_sincronizados
+    arranque.marcar("conectado")
+    vigilar_bucle()
+    # Nada de esto depende de lo demás: se hace a la vez y los comandos solo esperan a las partidas
+    pasos = [preparar_partidas()]
+    if arbol is not None and not comandos_sincronizados:
+        comandos_sincronizados = True
+        pasos.append(sincronizar(arbol))
+    puerto = puerto_configurado()
+    if puerto and servidor_metricas is None:
+        pasos.append(servir_metricas(puerto))
+    await asyncio.gather(*pasos)
+
+registrar_eventos(client, router, cache, al_conectar=al_conectar, desviar=desviar_mensaje)
+arbol = registrar_comandos_barra(client, router) if MODO_BARRA else None
+comandos_sincronizados = False
+tarea_precalentar: Optional[asyncio.Task] = None
+
+def partidas_por_fase() -> Dict[str, int]:
+    conteo = {fase.name: 0 for fase in FaseJuego}
+    for partida in partidas.values():
+        conteo[partida["estado"].name] += 1
+    return conteo
+
+def registrar_medidores():
+    """Medidores que se calculan solo cuando se piden; hacen falta solo si se sirven las métricas"""
+    METRICAS.medidor("mafia_partidas", "Partidas activas por fase", partidas_por_fase, ("fase",))
+    METRICAS.medidor("mafia_jugadores", "Jugadores en alguna partida", lambda: len(partida_por_usuario))
+    METRICAS.medidor("mafia_cola_salida", "Mensajes pendientes de enviar", lambda: sum(salida.profundidades().values()))
+    METRICAS.medidor("mafia_actores", "Actores de partida vivos, órdenes en sus buzones y rechazadas por buzón lleno",
+                     lambda: {("actores",): len(actores), ("pendientes",): actores.pendientes(),
+                              ("rechazadas",): actores.rechazadas}, ("tipo",))
+    METRICAS.medidor("mafia_plazos_pendientes", "Fases con plazo programado", lambda: len(planificador))
+    METRICAS.medidor("mafia_diario_pendientes", "Eventos del diario sin escribir", diario.pendientes)
+    METRICAS.medidor("mafia_estadisticas_pendientes", "Partidas terminadas sin guardar en las estadísticas",
+                     lambda: estadisticas.pendientes() if estadisticas is not None else 0)
+    METRICAS.medidor("mafia_emparejamiento", "Jugadores en la cola de emparejamiento, salas formadas y esperas caducadas",
+                     lambda: {("en_cola",): len(emparejador), ("salas",): emparejador.salas,
+                              ("caducadas",): emparejador.caducadas} if emparejador is not None else {},
+                     ("tipo",))
+    METRICAS.medidor("mafia_salida", "Mensajes encolados y envíos realizados desde el arranque",
+                     lambda: {("mensajes",): salida.mensajes, ("envios",): salida.envios}, ("tipo",))
+    METRICAS.medidor("mafia_arranque_segundos", "Segundos desde el arranque hasta cada etapa (ver bot/arranque.py)",
+                     lambda: {(etapa,): segundos for etapa, segundos in arranque.ETAPAS.items()}, ("etapa",))
+
+def iniciar():
+    """Conecta el bot (bloquea hasta que se cierra). Se arranca desde main.py"""
+    # El diario se lee mientras se inicia sesión y se conecta el gateway
+    precargar_partidas()
+    # Los comandos que lleguen antes de restaurar las partidas esperan a que estén
+    router.preparado = asyncio.Event()
+    try:
+        client.run(TOKEN, log_handler=None)  # El logging ya está configurado
+    finally:
+        # El diario y las estadísticas escriben en su hilo: lo que quede en la cola se guarda antes de salir
+        cerrar_almacenes()
+
+arranque.marcar("importado")
+
+if __name__ == "__main__":
+    # El arranque de siempre sigue funcionando, pero las marcas de arranque no cuentan los imports
+    log.warning("Arrancado con 'python mainnn.py': usa 'python main.py' (o lanzador.py con shards)")
+    iniciar()
@@ -0,0 +1,164 @@
+"""Mide el diario de partidas: eventos escritos por segundo y tiempo de recuperación.
+
+Uso: python medir_diario.py --partidas 10000 --eventos 200000
+
+Primero juega `--partidas` partidas hasta la primera noche contra el
+Discord falso, como carga.py, y mide cuánto tarda el diario en dejar
+escrito todo lo que registraron. Después escribe `--eventos` estados de
+esas partidas directamente en un diario nuevo (sin el bot delante: solo el
+hilo escritor, SQLite en WAL y los fsync por lote) y mide eventos por
+segundo. Por último, en un proceso nuevo para que nada esté ya en memoria,
+mide cuánto tarda el bot en restaurar todas las partidas desde el diario
+(lectura y compactación de SQLite, y reconstrucción en memoria).
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+JUGADORES = 8
+
+
+def cliente_falso(red):
+    """Apunta bot/client.py al cliente falso; hay que llamarlo antes de importar mainnn"""
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso
+
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+
+
+async def jugar(args, directorio: str) -> Dict[str, float]:
+    """Llena las partidas y mide el diario con el bot y sin él"""
+    from bot.falso import RedFalsa
+    from game.persistencia import Diario
+
+    # Sin latencia ni límites: aquí solo interesa el diario
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    cliente_falso(red)
+    import mainnn as bot
+
+    async def partida(numero: int):
+        canal = red.canal(10**9 + numero)
+        primero = 10**6 * (numero + 1)
+        await bot.client.entregar(red.usuario(primero, admin=True), f"!mafia crear {JUGADORES}", canal)
+        for i in range(1, JUGADORES):
+            await bot.client.entregar(red.usuario(primero + i), "!mafia unirme", canal)
+
+    await bot.client.conectar()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(partida(n) for n in range(args.partidas)))
+    jugado = time.perf_counter() - inicio
+    while bot.envios_privados:
+        await asyncio.gather(*list(bot.envios_privados.values()))
+    await bot.salida.vaciar()
+    pendientes = bot.diario.pendientes()
+    inicio_vaciado = time.perf_counter()
+    bot.diario.cerrar()
+    vaciado = time.perf_counter() - inicio_vaciado
+    escritos_bot = bot.diario.escritos
+
+    # El mismo tipo de estados, escritos sin el bot delante
+    estados = [(canal_id, bot.serializar_partida(canal_id)) for canal_id in bot.partidas]
+    diario = Diario(os.path.join(directorio, "solo-diario.db"))
+    diario.iniciar()
+    inicio = time.perf_counter()
+    for i in range(args.eventos):
+        canal_id, estado = estados[i % len(estados)]
+        diario.registrar(canal_id, "votar", estado)
+    diario.cerrar()
+    escritura = time.perf_counter() - inicio
+    bot.cerrar_almacenes()
+
+    return {
+        "partidas": len(bot.partidas),
+        "eventos_bot": escritos_bot,
+        "jugar_s": round(jugado, 3),
+        "pendientes_al_terminar": pendientes,
+        "vaciar_s": round(vaciado, 3),
+        "eventos_por_segundo": round(args.eventos / escritura, 1),
+    }
+
+
+def restaurar() -> Dict[str, float]:
+    """En un proceso nuevo: restaura todas las partidas del diario"""
+    from bot.falso import RedFalsa
+
+    inicio = time.perf_counter()
+    cliente_falso(RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9))
+    import mainnn as bot
+
+    importado = time.perf_counter()
+    asyncio.run(bot.restaurar_partidas())
+    restaurado = time.perf_counter()
+    bot.diario.cerrar()
+    return {
+        "restauradas": len(bot.partidas),
+        "importar_s": round(importado - inicio, 3),
+        "restaurar_s": round(restaurado - importado, 3),
+    }
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    for clave, valor in resultado.items():
+        texto = f"{clave:<26}{valor}"
+        if anterior and anterior.get(clave) and clave.endswith(("_s", "_por_segundo")):
+            texto += f"  ({(valor - anterior[clave]) / anterior[clave]:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=10000)
+    parser.add_argument("--eventos", type=int, default=200000, help="eventos escritos sin el bot")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    parser.add_argument("--directorio", help=argparse.SUPPRESS)
+    parser.add_argument("--fase", choices=("jugar", "restaurar"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.fase is not None:
+        os.environ.update({
+            "DIARIO_PARTIDAS": os.path.join(args.directorio, "partidas.db"),
+            "ESTADISTICAS": os.path.join(args.directorio, "estadisticas.db"),
+            "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+            "MAX_PARTIDAS": str(max(1000, args.partidas * 2)),
+            "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+        })
+        os.environ.setdefault("LOG_NIVEL", "ERROR")
+        os.environ.pop("METRICAS_PUERTO", None)
+        if args.fase == "jugar":
+            resultado = asyncio.run(jugar(args, args.directorio))
+        else:
+            resultado = restaurar()
+        print(json.dumps(resultado))
+        return 0
+
+    # Cada fase en un proceso nuevo: la restauración tiene que empezar en frío
+    directorio = tempfile.mkdtemp(prefix="diario-")
+    comando = [sys.executable, os.path.abspath(__file__), "--directorio", directorio] + (argv or sys.argv[1:])
+    resultado = {}
+    for fase in ("jugar", "restaurar"):
+        salida = subprocess.run(comando + ["--fase", fase], check=True, capture_output=True, text=True)
+        resultado.update(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
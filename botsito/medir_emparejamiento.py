@@ -0,0 +1,175 @@
+"""Mide el emparejamiento (game/emparejamiento.py): la cola sola y `!mafia buscar` en el bot.
+
+Uso: python medir_emparejamiento.py --solicitudes 1000000 --ritmo 2000
+
+- cola: encola `--solicitudes` solicitudes en un Emparejador con reloj
+  virtual, una cada 1/`--llegadas` segundos, repartidas entre `--servidores`
+  servidores, tamaños 5, 6, 8 y 10 e idiomas es/en, venciendo plazos cada
+  mil. Da encolados por segundo y cuántas salas salieron llenas, incompletas
+  o caducadas.
+- bot: `--comandos` jugadores escriben `!mafia buscar` contra el Discord
+  falso al ritmo de `--ritmo` por segundo, desde canales al azar de esos
+  servidores. Da el ritmo conseguido, la latencia p50/p99 de cada comando y
+  la espera p50/p99 en la cola hasta tener partida (la que anota
+  mafia_emparejamiento_espera_segundos).
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from game.emparejamiento import Emparejador, Solicitud
+
+TAMANOS = (5, 6, 8, 10)
+IDIOMAS = ("es", "en")
+CANALES_POR_SERVIDOR = 20
+
+
+def percentiles(valores: List[float], escala: float) -> Dict[str, float]:
+    valores = sorted(valores)
+    if not valores:
+        return {"p50": 0.0, "p99": 0.0}
+    return {"p50": round(valores[len(valores) // 2] * escala, 2),
+            "p99": round(valores[min(len(valores) - 1, int(len(valores) * 0.99))] * escala, 2)}
+
+
+def cola(args) -> Dict[str, float]:
+    azar = random.Random(args.semilla)
+    ahora = 0.0
+    emparejador = Emparejador(args.espera, args.minimo, reloj=lambda: ahora)
+    solicitudes = [
+        Solicitud(str(i), f"Jugador{i}", str(azar.randrange(args.servidores * CANALES_POR_SERVIDOR)),
+                  str(azar.randrange(args.servidores)), azar.choice(TAMANOS), azar.choice(IDIOMAS),
+                  i / args.llegadas)
+        for i in range(args.solicitudes)
+    ]
+    llenas = incompletas = 0
+    inicio = time.perf_counter()
+    for i, solicitud in enumerate(solicitudes):
+        ahora = solicitud.llegada
+        if emparejador.encolar(solicitud):
+            llenas += 1
+        if i % 1000 == 0:
+            salas, _ = emparejador.vencer()
+            incompletas += len(salas)
+    duracion = time.perf_counter() - inicio
+    return {
+        "encolados_por_segundo": round(args.solicitudes / duracion, 1),
+        "us_por_encolado": round(duracion / args.solicitudes * 1e6, 3),
+        "salas_llenas": llenas,
+        "salas_incompletas": incompletas,
+        "caducadas": emparejador.caducadas,
+        "en_cola": len(emparejador),
+    }
+
+
+async def bot_entero(args) -> Dict:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+
+    red = RedFalsa(latencia=args.latencia, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+    esperas: List[float] = []
+    observar = bot.ESPERAS_EMPAREJAMIENTO.observar
+    bot.ESPERAS_EMPAREJAMIENTO.observar = lambda valor, *valores: (esperas.append(valor), observar(valor, *valores))
+
+    azar = random.Random(args.semilla)
+    canales = [red.canal(10**9 + i, servidor_id=1 + i // CANALES_POR_SERVIDOR)
+               for i in range(args.servidores * CANALES_POR_SERVIDOR)]
+    latencias: List[float] = []
+
+    async def buscar(i: int):
+        usuario = red.usuario(10**6 + i)
+        inicio = time.perf_counter()
+        await bot.client.entregar(usuario, f"!mafia buscar {azar.choice(TAMANOS[:3])}", azar.choice(canales))
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    tareas = []
+    for i in range(args.comandos):
+        espera = inicio + i / args.ritmo - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tareas.append(asyncio.create_task(buscar(i)))
+    await asyncio.gather(*tareas)
+    duracion = time.perf_counter() - inicio
+    await bot.salida.vaciar()
+    resultado = {
+        "comandos_por_segundo": round(args.comandos / duracion, 1),
+        "comando_ms": percentiles(latencias, 1000),
+        "espera_ms": percentiles(esperas, 1000),
+        "emparejados": len(esperas),
+        "partidas": len(bot.partidas),
+        "en_cola": len(bot.emparejador),
+    }
+    bot.cerrar_almacenes()
+    return resultado
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    for parte, medidas in resultado.items():
+        for clave, valor in medidas.items():
+            previa = (anterior or {}).get(parte, {}).get(clave)
+            if isinstance(valor, dict):
+                texto = f"{parte + ' ' + clave:<34}p50 {valor['p50']:>9.2f}   p99 {valor['p99']:>9.2f}"
+                if previa and previa.get("p50"):
+                    texto += f"  ({(valor['p50'] - previa['p50']) / previa['p50']:+.1%})"
+            else:
+                texto = f"{parte + ' ' + clave:<34}{valor:>12}"
+                if previa and clave.endswith("_segundo"):
+                    texto += f"  ({(valor - previa) / previa:+.1%})"
+            print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--solicitudes", type=int, default=1_000_000, help="solicitudes encoladas en la cola sola")
+    parser.add_argument("--llegadas", type=float, default=1000.0, help="solicitudes por segundo (reloj virtual)")
+    parser.add_argument("--servidores", type=int, default=100)
+    parser.add_argument("--espera", type=float, default=180.0, help="plazo de la cola en segundos")
+    parser.add_argument("--minimo", type=int, default=5, help="jugadores para una sala incompleta")
+    parser.add_argument("--comandos", type=int, default=20_000, help="`!mafia buscar` contra el bot")
+    parser.add_argument("--ritmo", type=float, default=2000.0, help="`!mafia buscar` por segundo")
+    parser.add_argument("--latencia", type=float, default=0.005, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="emparejamiento-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "MAX_PARTIDAS": str(max(1000, args.comandos)),
+        "ESPERA_EMPAREJAMIENTO": str(int(args.espera)),
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = {"cola": cola(args), "bot": asyncio.run(bot_entero(args))}
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
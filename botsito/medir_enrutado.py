@@ -0,0 +1,109 @@
+"""Mide lo que tarda un comando por DM en llegar a su partida según las partidas en marcha.
+
+Uso: python medir_enrutado.py --partidas 50 3000 --muestra 300 --repeticiones 3
+
+Llena partidas de `--jugadores` contra el Discord falso, sin latencia ni
+límites, hasta cada total de `--partidas`, y mide los segundos por DM de
+`!mafia rol` de `--muestra` jugadores de las primeras partidas (lo mejor de
+`--repeticiones`). El DM se enruta por el índice partida_por_usuario, así
+que no debería costar más con más partidas.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+
+async def ejecutar(args) -> Dict[str, float]:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+
+    def jugadores(numero: int):
+        primero = 10**6 * (numero + 1)
+        return [red.usuario(primero + i, admin=(i == 0)) for i in range(args.jugadores)]
+
+    async def partida(numero: int):
+        canal = red.canal(10**9 + numero)
+        creador, *resto = jugadores(numero)
+        await bot.client.entregar(creador, f"!mafia crear {args.jugadores}", canal)
+        await asyncio.gather(*(bot.client.entregar(u, "!mafia unirme", canal) for u in resto))
+
+    autores = [u for n in range(min(args.partidas)) for u in jugadores(n)][:args.muestra]
+    resultado = {}
+    llenas = 0
+    for total in sorted(args.partidas):
+        await asyncio.gather(*(partida(n) for n in range(llenas, total)))
+        llenas = total
+        while bot.envios_privados:
+            await asyncio.gather(*list(bot.envios_privados.values()))
+        await bot.salida.vaciar()
+
+        mejor = float("inf")
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            await asyncio.gather(*(bot.client.entregar(u, "!mafia rol") for u in autores))
+            await bot.salida.vaciar()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        resultado[str(total)] = round(mejor / len(autores) * 10**6, 1)  # µs por DM
+    bot.cerrar_almacenes()
+    return resultado
+
+
+def mostrar(resultado: Dict[str, float], anterior: Optional[Dict] = None):
+    print(f"{'partidas':<12}{'µs por DM':>12}")
+    for total, valor in resultado.items():
+        texto = f"{total:<12}{valor:>12.1f}"
+        previo = (anterior or {}).get(total)
+        if previo:
+            texto += f"  ({(valor - previo) / previo:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, nargs="+", default=[50, 3000])
+    parser.add_argument("--jugadores", type=int, default=6, help="jugadores por partida")
+    parser.add_argument("--muestra", type=int, default=300, help="jugadores que piden su rol por DM")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="enrutado-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "MAX_PARTIDAS": str(max(args.partidas) + 1),
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = asyncio.run(ejecutar(args))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
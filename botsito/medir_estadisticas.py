@@ -0,0 +1,147 @@
+"""Mide las estadísticas de jugadores (game/estadisticas.py) con un historial grande.
+
+Uso: python medir_estadisticas.py --partidas 1000000 --base /tmp/estadisticas.db
+
+Llena la base hasta `--partidas` partidas terminadas de 8 jugadores
+elegidos entre `--jugadores`, por el mismo camino que el bot (registrar y
+el hilo escritor), y mide partidas escritas por segundo. Después mide la
+latencia p50/p99 de `!mafia stats` (Estadisticas.ficha), del ranking recién
+escrita una partida (se lee del índice) y del ranking ya en memoria. Como
+referencia, mide también lo que costarían las mismas consultas recorriendo
+el historial, que es lo que los contadores evitan.
+
+Con `--base` la base se conserva y la siguiente ejecución solo añade las
+partidas que falten. `--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from game.estadisticas import Estadisticas, Resultado
+
+ROLES = ["Mafioso", "Mafioso", "Doctor", "Detective", "Ciudadano", "Ciudadano", "Ciudadano", "Ciudadano"]
+BLOQUE = 10_000  # Partidas encoladas antes de esperar al hilo escritor
+
+
+def esperar_escritura(estadisticas: Estadisticas, objetivo: int):
+    while estadisticas.escritas < objetivo:
+        time.sleep(0.0005)
+
+
+def sembrar(estadisticas: Estadisticas, partidas: int, jugadores: int, azar: random.Random) -> float:
+    """Escribe `partidas` partidas al azar; devuelve partidas por segundo"""
+    inicio = time.perf_counter()
+    for hecho in range(0, partidas, BLOQUE):
+        for _ in range(min(BLOQUE, partidas - hecho)):
+            ids = azar.sample(range(jugadores), len(ROLES))
+            gana_mafia = azar.random() < 0.45
+            estadisticas.registrar("0", "Mafia" if gana_mafia else "Pueblo", [
+                Resultado(str(i), f"Jugador{i}", rol, (rol == "Mafioso") == gana_mafia, azar.random() < 0.4)
+                for i, rol in zip(ids, ROLES)
+            ])
+        # Sin esperar, la cola crecería con todo el historial en memoria
+        esperar_escritura(estadisticas, estadisticas.escritas + estadisticas.pendientes() - BLOQUE // 2)
+    esperar_escritura(estadisticas, partidas)
+    return partidas / (time.perf_counter() - inicio)
+
+
+def latencias(funcion: Callable[[], object], veces: int) -> Dict[str, float]:
+    tiempos = []
+    for _ in range(veces):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {"p50_us": round(tiempos[veces // 2] * 1e6, 1),
+            "p99_us": round(tiempos[min(veces - 1, int(veces * 0.99))] * 1e6, 1)}
+
+
+def ejecutar(args, ruta: str) -> Dict:
+    with sqlite3.connect(ruta) as conexion:
+        existe = conexion.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'partidas_terminadas'").fetchone()
+        guardadas = conexion.execute("SELECT COUNT(*) FROM partidas_terminadas").fetchone()[0] if existe else 0
+
+    azar = random.Random(args.semilla + guardadas)
+    estadisticas = Estadisticas(ruta)
+    resultado: Dict = {"partidas": max(guardadas, args.partidas)}
+    if guardadas < args.partidas:
+        resultado["partidas_por_segundo"] = round(sembrar(estadisticas, args.partidas - guardadas,
+                                                          args.jugadores, azar), 1)
+
+    resultado["ficha"] = latencias(lambda: estadisticas.ficha(str(azar.randrange(args.jugadores))), args.consultas)
+
+    def ranking_tras_escribir():
+        # Una partida nueva deja el ranking en memoria desfasado: se lee del índice
+        escritas = estadisticas.escritas
+        estadisticas.registrar("0", "Pueblo", [Resultado("0", "Jugador0", "Ciudadano", True, True)])
+        esperar_escritura(estadisticas, escritas + 1)
+        inicio = time.perf_counter()
+        estadisticas.ranking()
+        return time.perf_counter() - inicio
+
+    tiempos = sorted(ranking_tras_escribir() for _ in range(args.consultas // 10))
+    resultado["ranking_indice"] = {"p50_us": round(tiempos[len(tiempos) // 2] * 1e6, 1),
+                                   "p99_us": round(tiempos[int(len(tiempos) * 0.99)] * 1e6, 1)}
+    resultado["ranking_memoria"] = latencias(estadisticas.ranking, args.consultas)
+    estadisticas.cerrar()
+
+    # Lo que costaría sin contadores: recorrer el historial en cada consulta
+    with sqlite3.connect(ruta) as conexion:
+        inicio = time.perf_counter()
+        conexion.execute("SELECT jugador_id, SUM(gano), COUNT(*) FROM resultados "
+                         "GROUP BY jugador_id ORDER BY 2 DESC LIMIT 10").fetchall()
+        resultado["ranking_recorriendo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        inicio = time.perf_counter()
+        conexion.execute("SELECT rol, COUNT(*), SUM(gano), SUM(sobrevivio) FROM resultados "
+                         "WHERE jugador_id = ? GROUP BY rol", ("1",)).fetchall()
+        resultado["ficha_recorriendo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    for clave, valor in resultado.items():
+        if isinstance(valor, dict):
+            texto = f"{clave:<26}p50 {valor['p50_us']:>9.1f} µs   p99 {valor['p99_us']:>9.1f} µs"
+            previa = (anterior or {}).get(clave, {}).get("p50_us")
+            if previa:
+                texto += f"  ({(valor['p50_us'] - previa) / previa:+.1%})"
+        else:
+            texto = f"{clave:<26}{valor}"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=1_000_000, help="partidas terminadas en la base")
+    parser.add_argument("--jugadores", type=int, default=100_000, help="jugadores distintos")
+    parser.add_argument("--consultas", type=int, default=5000)
+    parser.add_argument("--base", help="base que conservar entre ejecuciones (por defecto, una temporal)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    ruta = args.base or os.path.join(tempfile.mkdtemp(prefix="estadisticas-"), "estadisticas.db")
+    resultado = ejecutar(args, ruta)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Compara las llamadas a la API por partida con comandos de texto y con comandos de barra.
+
+Uso: python medir_interacciones.py --partidas 200 --jugadores 8 --latencia 0.05
+
+Juega las mismas partidas (misma semilla) con carga.py dos veces, cada
+una en un proceso nuevo porque mainnn lee MODO_INTERACCION al importarse:
+una con comandos de texto y DMs y otra con `--barra`. Muestra, para cada
+modo, las llamadas a la API por partida completa, repartidas por ruta
+(con comandos de barra, "interaccion" es la respuesta a cada comando y
+"followup" lo que sale tras diferirla), y la latencia p50/p99.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+MODOS = {"texto": [], "barra": ["--barra"]}
+
+
+def jugar(args, extra: List[str]) -> Dict:
+    """Una ejecución de carga.py; devuelve su resultado (--json)"""
+    with tempfile.TemporaryDirectory(prefix="interacciones-") as directorio:
+        ruta = os.path.join(directorio, "resultado.json")
+        carga = os.path.join(os.path.dirname(os.path.abspath(__file__)), "carga.py")
+        subprocess.run([sys.executable, carga, "--partidas", str(args.partidas),
+                        "--jugadores", str(args.jugadores), "--simultaneas", str(args.simultaneas),
+                        "--latencia", str(args.latencia), "--semilla", str(args.semilla),
+                        "--json", ruta] + extra, check=True, capture_output=True)
+        with open(ruta, encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+
+def resumir(resultado: Dict) -> Dict:
+    partidas = max(1, resultado["partidas"])
+    return {
+        "terminadas": resultado["terminadas"],
+        "comandos_por_partida": round(resultado["comandos"] / partidas, 2),
+        "llamadas_por_partida": resultado["llamadas_por_partida"],
+        "por_ruta": {ruta: round(cantidad / partidas, 2)
+                     for ruta, cantidad in sorted(resultado["api"]["llamadas"].items())},
+        "p50_ms": resultado["p50_ms"],
+        "p99_ms": resultado["p99_ms"],
+    }
+
+
+def mostrar(resultado: Dict[str, Dict], anterior: Optional[Dict] = None):
+    for modo, medida in resultado.items():
+        texto = (f"{modo:<7}{medida['llamadas_por_partida']:>8.2f} llamadas/partida  "
+                 f"({medida['comandos_por_partida']:.1f} comandos, p50 {medida['p50_ms']} ms, "
+                 f"p99 {medida['p99_ms']} ms)")
+        previa = (anterior or {}).get(modo)
+        if previa and previa.get("llamadas_por_partida"):
+            cambio = (medida["llamadas_por_partida"] - previa["llamadas_por_partida"]) / previa["llamadas_por_partida"]
+            texto += f"  ({cambio:+.1%})"
+        print(texto)
+        for ruta, cantidad in medida["por_ruta"].items():
+            print(f"  {ruta:<20}{cantidad:>8.2f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--jugadores", type=int, default=8, help="jugadores por partida")
+    parser.add_argument("--simultaneas", type=int, default=50, help="partidas jugándose a la vez")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    resultado = {modo: resumir(jugar(args, extra)) for modo, extra in MODOS.items()}
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0 if all(m["terminadas"] == args.partidas for m in resultado.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
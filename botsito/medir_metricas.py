@@ -0,0 +1,148 @@
+"""Mide lo que cuestan las métricas (bot/metricas.py): por anotación y en partidas enteras.
+
+Uso: python medir_metricas.py --partidas 300 --repeticiones 3
+
+Primero mide en nanosegundos cada forma de anotar (Contador.inc,
+Histograma.observar, `with Histograma.medir()` y `with medir_api()`)
+frente a un `with` que no hace nada. Después juega partidas enteras contra
+el Discord falso, como carga.py, alternando métricas encendidas y apagadas
+(inc y observar sin hacer nada), y compara los comandos por segundo. Por
+último mide cuánto tarda en generarse la respuesta de /metrics.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from typing import Dict, List, Optional
+
+VUELTAS = 200_000
+
+
+def anotaciones() -> Dict[str, float]:
+    """Nanosegundos por anotación, lo mejor de 5"""
+    from bot.metricas import Contador, Histograma, medir_api
+
+    contador = Contador("prueba_total", "prueba", ("ruta", "estado"))
+    histograma = Histograma("prueba_segundos", "prueba", ("comando",))
+    casos = {
+        "with_vacio": lambda: _con(contextlib.nullcontext()),
+        "inc": lambda: contador.inc("send", "ok"),
+        "observar": lambda: histograma.observar(0.003, "!votar"),
+        "with_medir": lambda: _con(histograma.medir("!votar")),
+        "with_medir_api": lambda: _con(medir_api("send")),
+    }
+    return {nombre: round(min(timeit.repeat(caso, number=VUELTAS, repeat=5)) / VUELTAS * 1e9, 1)
+            for nombre, caso in casos.items()}
+
+
+def _con(gestor):
+    with gestor:
+        pass
+
+
+async def partidas(args) -> Dict[str, float]:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+    from bot.metricas import METRICAS, Contador, Histograma
+    from carga import Carga
+
+    # Sin latencia ni límites: así las métricas pesan lo más posible
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+    bot.registrar_medidores()  # Como al servirlas: exponer() incluye los medidores
+    originales = (Contador.inc, Histograma.observar)
+
+    async def jugar(desde: int) -> float:
+        carga = Carga(bot, red, args.jugadores, args.semilla)
+        inicio = time.perf_counter()
+        await asyncio.gather(*(carga.partida(n) for n in range(desde, desde + args.partidas)))
+        await bot.salida.vaciar()
+        return len(carga.latencias) / (time.perf_counter() - inicio)
+
+    encendidas, apagadas = [], []
+    for medida in range(2 * args.repeticiones):
+        desde = medida * args.partidas
+        # Se alternan para que ninguna de las dos salga siempre primero (caché fría)
+        if medida % 4 in (0, 3):
+            encendidas.append(await jugar(desde))
+            continue
+        Contador.inc = lambda self, *valores, cantidad=1: None
+        Histograma.observar = lambda self, valor, *valores: None
+        try:
+            apagadas.append(await jugar(desde))
+        finally:
+            Contador.inc, Histograma.observar = originales
+
+    inicio = time.perf_counter()
+    texto = METRICAS.exponer()
+    exponer = time.perf_counter() - inicio
+    bot.cerrar_almacenes()
+    return {
+        "comandos_por_segundo_con": round(max(encendidas), 1),
+        "comandos_por_segundo_sin": round(max(apagadas), 1),
+        "sobrecoste": round(1 - max(encendidas) / max(apagadas), 4),
+        "exponer_ms": round(exponer * 1000, 2),
+        "exponer_lineas": texto.count("\n"),
+    }
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    for nombre, ns in resultado["anotaciones_ns"].items():
+        texto = f"{nombre:<28}{ns:>10.1f} ns"
+        previa = (anterior or {}).get("anotaciones_ns", {}).get(nombre)
+        if previa:
+            texto += f"  ({(ns - previa) / previa:+.1%})"
+        print(texto)
+    for clave, valor in resultado["partidas"].items():
+        texto = f"{clave:<28}{valor:>10}"
+        previa = (anterior or {}).get("partidas", {}).get(clave)
+        if previa and clave != "sobrecoste":
+            texto += f"  ({(valor - previa) / previa:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--partidas", type=int, default=300, help="partidas por medida")
+    parser.add_argument("--jugadores", type=int, default=8, help="jugadores por partida")
+    parser.add_argument("--repeticiones", type=int, default=3, help="medidas con y sin métricas")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="metricas-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = {"anotaciones_ns": anotaciones(), "partidas": asyncio.run(partidas(args))}
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Mide el arranque y la memoria de cada perfil de cliente con servidores grandes.
+
+Uso: python medir_perfiles.py --servidores 20 --miembros 50000 --mensajes 20000
+
+Arranca el bot por main.py, en un proceso nuevo por perfil (ligero,
+completo e interacciones, ver bot/client.py) y repetición, contra un
+gateway falso con `--servidores` servidores de `--miembros` miembros cada
+uno. El perfil completo recibe y guarda todos los miembros al conectar
+(en bloques de 1000 que tardan `--latencia` cada uno); los otros no los
+piden. Una vez conectado, el gateway reparte `--mensajes` mensajes de
+charla entre los canales (el perfil interacciones no recibe mensajes).
+
+Para cada perfil muestra la mediana de los segundos hasta "conectado" y
+"listo" (bot/arranque.py) y de la memoria residente (RSS) al terminar,
+además de los miembros y mensajes que quedaron en la caché del cliente.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+PERFILES = ("ligero", "completo", "interacciones")
+
+
+def rss_mb() -> float:
+    """Memoria residente del proceso en MB (Linux); 0 si no se puede leer"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as estado:
+            for linea in estado:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def hijo(args):
+    """Un arranque con el perfil de PERFIL_CLIENTE: main.main() con un guion de charla"""
+    from bot import arranque
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+    import main as entrada
+
+    async def guion(cliente):
+        if getattr(cliente.intents, "guild_messages", False):
+            for numero in range(args.mensajes):
+                servidor = numero % args.servidores
+                canal = cliente.red.canal(10**9 + servidor, servidor_id=servidor)
+                autor = cliente.red.usuario(3 * 10**12 + numero % 1000)
+                await cliente.entregar(autor, f"¿Alguien para jugar? ({numero})", canal)
+        sys.modules["mainnn"].diario.cerrar()
+
+    red = RedFalsa(latencia=args.latencia, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(
+        red, gateway=args.gateway, guion=guion, servidores=args.servidores,
+        miembros=args.miembros, **opciones)
+    entrada.main()
+
+    cliente = sys.modules["mainnn"].client
+    print(json.dumps({
+        "conectado": arranque.ETAPAS.get("conectado"),
+        "listo": arranque.ETAPAS.get("listo"),
+        "rss_mb": round(rss_mb(), 1),
+        "miembros": len(cliente.miembros),
+        "mensajes": len(cliente.mensajes) if cliente.mensajes is not None else 0,
+    }))
+
+
+def mediana(medidas: List[Dict[str, float]]) -> Dict[str, float]:
+    return {clave: round(statistics.median(m[clave] for m in medidas), 4) for clave in medidas[0]}
+
+
+def mostrar(resultado: Dict[str, Dict[str, float]], anterior: Optional[Dict] = None):
+    print(f"{'Perfil':<15}{'Conectado (s)':>14}{'Listo (s)':>11}{'RSS (MB)':>10}{'Miembros':>10}{'Mensajes':>10}")
+    for perfil, medida in resultado.items():
+        texto = (f"{perfil:<15}{medida['conectado']:>14.3f}{medida['listo']:>11.3f}{medida['rss_mb']:>10.1f}"
+                 f"{medida['miembros']:>10}{medida['mensajes']:>10}")
+        previa = (anterior or {}).get(perfil)
+        if previa and previa.get("listo") and previa.get("rss_mb"):
+            texto += (f"  (listo {(medida['listo'] - previa['listo']) / previa['listo']:+.1%}, "
+                      f"RSS {(medida['rss_mb'] - previa['rss_mb']) / previa['rss_mb']:+.1%})")
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--servidores", type=int, default=20)
+    parser.add_argument("--miembros", type=int, default=50000, help="miembros por servidor")
+    parser.add_argument("--mensajes", type=int, default=20000, help="mensajes de charla tras conectar")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--gateway", type=float, default=0.3, help="segundos desde iniciar sesión hasta READY")
+    parser.add_argument("--latencia", type=float, default=0.05,
+                        help="segundos por petición REST y por bloque de miembros")
+    parser.add_argument("--perfiles", default=",".join(PERFILES))
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    parser.add_argument("--directorio", help=argparse.SUPPRESS)
+    parser.add_argument("--perfil", choices=PERFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.perfil is not None:
+        os.environ.update({
+            "DIARIO_PARTIDAS": os.path.join(args.directorio, "partidas.db"),
+            "ESTADISTICAS": os.path.join(args.directorio, "estadisticas.db"),
+            "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+            "PERFIL_CLIENTE": args.perfil, "MODO_INTERACCION": "mensajes",
+        })
+        os.environ.setdefault("LOG_NIVEL", "ERROR")
+        os.environ.pop("METRICAS_PUERTO", None)
+        hijo(args)
+        return 0
+
+    # Cada arranque en un proceso nuevo: la memoria de uno no se mezcla con la de otro
+    directorio = tempfile.mkdtemp(prefix="perfiles-")
+    comando = [sys.executable, os.path.abspath(__file__), "--directorio", directorio] + (argv or sys.argv[1:])
+    resultado = {}
+    for perfil in args.perfiles.split(","):
+        medidas = []
+        for _ in range(args.repeticiones):
+            salida = subprocess.run(comando + ["--perfil", perfil], check=True, capture_output=True, text=True)
+            medidas.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        resultado[perfil] = mediana(medidas)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
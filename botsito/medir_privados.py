@@ -0,0 +1,117 @@
+"""Mide el inicio de la primera noche según el número de jugadores, contra el Discord falso.
+
+Uso: python medir_privados.py --jugadores 5 10 20 40 --repeticiones 5 --latencia 0.05
+
+Para cada tamaño llena `--repeticiones` partidas, una tras otra. Desde que
+entra el último jugador mide cuánto tarda el canal en ver "Anochece" y
+cuánto tardan en llegar todos los DMs (rol e instrucciones de la noche).
+Por defecto la red devuelve 429 con Retry-After al pasar un límite, como la
+API sin discord.py delante (`--esperar-limites` para esperar en su lugar).
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+
+async def ejecutar(args) -> Dict[str, Dict[str, float]]:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+
+    red = RedFalsa(latencia=args.latencia, limite_global=args.limite_global,
+                   limite_destino=args.limite_destino, responder_429=not args.esperar_limites)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+    resultado = {}
+    numero = 0
+    for jugadores in args.jugadores:
+        anochece, privados = [], []
+        for _ in range(args.repeticiones):
+            numero += 1
+            canal = red.canal(10**9 + numero)
+            primero = 10**6 * numero
+            await bot.client.entregar(red.usuario(primero, admin=True), f"!mafia crear {jugadores}", canal)
+            for i in range(1, jugadores - 1):
+                await bot.client.entregar(red.usuario(primero + i), "!mafia unirme", canal)
+            await bot.salida.vaciar()
+
+            inicio = time.perf_counter()
+            await bot.client.entregar(red.usuario(primero + jugadores - 1), "!mafia unirme", canal)
+            await bot.salida.vaciar()
+            anochece.append(time.perf_counter() - inicio)
+            while str(canal.id) in bot.envios_privados:
+                await bot.envios_privados[str(canal.id)]
+            privados.append(time.perf_counter() - inicio)
+        resultado[str(jugadores)] = {
+            "anochece_s": round(statistics.median(anochece), 4),
+            "privados_s": round(statistics.median(privados), 4),
+        }
+    resultado["api"] = red.resumen()
+    bot.cerrar_almacenes()
+    return resultado
+
+
+def mostrar(resultado: Dict, anterior: Optional[Dict] = None):
+    print(f"{'jugadores':<12}{'anochece':>12}{'privados':>12}")
+    for jugadores, medida in resultado.items():
+        if jugadores == "api":
+            continue
+        texto = f"{jugadores:<12}"
+        for clave in ("anochece_s", "privados_s"):
+            texto += f"{medida[clave]:>10.3f} s"
+        previa = (anterior or {}).get(jugadores)
+        if previa and previa.get("privados_s"):
+            texto += f"  ({(medida['privados_s'] - previa['privados_s']) / previa['privados_s']:+.1%})"
+        print(texto)
+    api = resultado["api"]
+    print(f"429/esperas: {sum(api['limitadas'].values())}, "
+          f"peticiones: {sum(api['llamadas'].values())}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--jugadores", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--limite-global", type=int, default=50, help="peticiones por segundo")
+    parser.add_argument("--limite-destino", type=int, default=5, help="mensajes por destino cada 5 s")
+    parser.add_argument("--esperar-limites", action="store_true",
+                        help="al pasar un límite, esperar como discord.py en vez de devolver 429")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="privados-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = asyncio.run(ejecutar(args))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Mide mensajes por segundo a través de on_message y del router, contra el Discord falso.
+
+Uso: python medir_router.py --mensajes 50000 --partidas 100
+
+Entrega `--mensajes` mensajes de cada tipo, en lotes que llegan a la vez,
+y muestra cuántos procesa el bot por segundo:
+
+- charla: texto sin prefijo en el canal de una partida (se descarta con
+  una sola comprobación);
+- desconocido: empieza por el prefijo pero no es un comando;
+- rechazado: un comando que no vale ahí (`!votar` en el canal, solo va
+  por DM), se descarta tras buscarlo en la tabla;
+- privado: `!mafia rol` por DM de un jugador, que se enruta a su partida,
+  pasa por su actor y responde (la red no tiene latencia).
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+JUGADORES = 6
+
+
+async def ejecutar(args) -> Dict[str, float]:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+
+    # Sin latencia ni límites: aquí se mide el bot, no la red
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+    jugadores = []
+    for numero in range(args.partidas):
+        canal = red.canal(10**9 + numero)
+        primero = 10**6 * (numero + 1)
+        await bot.client.entregar(red.usuario(primero, admin=True), f"!mafia crear {JUGADORES}", canal)
+        for i in range(1, JUGADORES):
+            await bot.client.entregar(red.usuario(primero + i), "!mafia unirme", canal)
+        jugadores += [(red.usuario(primero + i), canal) for i in range(JUGADORES)]
+    while bot.envios_privados:
+        await asyncio.gather(*list(bot.envios_privados.values()))
+    await bot.salida.vaciar()
+
+    tipos = {
+        "charla": lambda autor, canal: bot.client.entregar(autor, "alguien sabe quién es el mafioso?", canal),
+        "desconocido": lambda autor, canal: bot.client.entregar(autor, "!musica play algo", canal),
+        "rechazado": lambda autor, canal: bot.client.entregar(autor, "!votar alguien", canal),
+        "privado": lambda autor, canal: bot.client.entregar(autor, "!mafia rol"),
+    }
+    resultado = {}
+    for tipo, entregar in tipos.items():
+        inicio = time.perf_counter()
+        for desde in range(0, args.mensajes, args.lote):
+            lote = range(desde, min(args.mensajes, desde + args.lote))
+            await asyncio.gather(*(entregar(*jugadores[i % len(jugadores)]) for i in lote))
+        await bot.salida.vaciar()
+        resultado[tipo] = round(args.mensajes / (time.perf_counter() - inicio), 1)
+    bot.cerrar_almacenes()
+    return resultado
+
+
+def mostrar(resultado: Dict[str, float], anterior: Optional[Dict] = None):
+    for tipo, por_segundo in resultado.items():
+        texto = f"{tipo:<14}{por_segundo:>12.0f} mensajes/s"
+        if anterior and anterior.get(tipo):
+            texto += f"  ({(por_segundo - anterior[tipo]) / anterior[tipo]:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--mensajes", type=int, default=50000, help="mensajes de cada tipo")
+    parser.add_argument("--partidas", type=int, default=100, help="partidas en curso")
+    parser.add_argument("--lote", type=int, default=1000, help="mensajes que llegan a la vez")
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="router-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = asyncio.run(ejecutar(args))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Mide cómo escala el bot al repartir los shards entre procesos, contra un gateway falso.
+
+Uso: python medir_shards.py --servidores 800 --shards 16 --procesos 1 2 4
+
+Simula `--servidores` servidores con una partida cada uno. Como en
+lanzador.py, los `--shards` se reparten en rangos entre los procesos y cada
+proceso solo recibe los mensajes de los servidores de sus shards
+((servidor_id >> 22) % shards, como Discord), así que es dueño de sus
+partidas. Cada proceso juega las suyas enteras como carga.py y se mide el
+total de comandos por segundo de todos los procesos para cada valor de
+`--procesos`. Los DMs de cada jugador llegan directamente al proceso dueño
+de su partida: el reenvío desde el shard 0 no se simula.
+
+Escalar necesita núcleos libres: con menos núcleos que procesos el total
+no sube. `--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from bot.fragmentos import repartir_shards
+
+
+def shard_del_servidor(servidor_id: int, shards: int) -> int:
+    return (servidor_id >> 22) % shards
+
+
+def servidor(numero: int) -> int:
+    """Id del servidor de la partida `numero`; los ids reales también llevan la fecha en los bits altos"""
+    return (numero + 1) << 22
+
+
+async def jugar(args, shard_ids: List[int], listos, resultados):
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+    from carga import Carga
+
+    red = RedFalsa(latencia=args.latencia, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()
+    propios = [n for n in range(args.servidores) if shard_del_servidor(servidor(n), args.shards) in shard_ids]
+    for numero in propios:
+        # Carga.partida juega en red.canal(10**9 + numero): ya existe, en su servidor
+        red.canal(10**9 + numero, servidor_id=servidor(numero))
+    carga = Carga(bot, red, args.jugadores, args.semilla)
+    limite = asyncio.Semaphore(args.simultaneas)
+
+    async def partida(numero: int):
+        async with limite:
+            await carga.partida(numero)
+
+    listos.wait()  # Todos los procesos empiezan a la vez, ya importados y conectados
+    inicio = time.perf_counter()
+    await asyncio.gather(*(partida(n) for n in propios))
+    await bot.salida.vaciar()
+    resultados.put({"comandos": len(carga.latencias), "partidas": carga.terminadas,
+                    "segundos": time.perf_counter() - inicio})
+    bot.cerrar_almacenes()
+
+
+def trabajador(indice: int, shard_ids: List[int], args, directorio: str, listos, resultados):
+    os.environ.update({
+        "SHARD_IDS": ",".join(str(i) for i in shard_ids), "SHARD_COUNT": str(args.shards),
+        "DIARIO_PARTIDAS": os.path.join(directorio, f"partidas-{indice}.db"),
+        "ESTADISTICAS": os.path.join(directorio, f"estadisticas-{indice}.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "MAX_PARTIDAS": str(max(1000, args.servidores * 2)),
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    random.seed(args.semilla * 1_000_003 + indice)  # El reparto de roles usa el módulo random
+    asyncio.run(jugar(args, shard_ids, listos, resultados))
+
+
+def medir(args, procesos: int) -> Dict[str, float]:
+    rangos = repartir_shards(args.shards, procesos)
+    directorio = tempfile.mkdtemp(prefix="shards-")
+    listos = multiprocessing.Barrier(len(rangos) + 1)
+    resultados = multiprocessing.Queue()
+    hijos = [
+        multiprocessing.Process(target=trabajador, args=(i, shard_ids, args, directorio, listos, resultados),
+                                name=f"bot-{i}")
+        for i, shard_ids in enumerate(rangos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    listos.wait()
+    inicio = time.perf_counter()
+    parciales = [resultados.get() for _ in hijos]
+    duracion = time.perf_counter() - inicio
+    for hijo in hijos:
+        hijo.join()
+
+    comandos = sum(p["comandos"] for p in parciales)
+    return {
+        "procesos": len(rangos),
+        "partidas": sum(p["partidas"] for p in parciales),
+        "comandos": comandos,
+        "segundos": round(duracion, 3),
+        "comandos_por_segundo": round(comandos / duracion, 1),
+        # El proceso más lento marca el total: si sus servidores son más, el reparto no es parejo
+        "desequilibrio": round(max(p["segundos"] for p in parciales) / min(p["segundos"] for p in parciales), 2),
+    }
+
+
+def mostrar(resultado: Dict[str, Dict], anterior: Optional[Dict] = None):
+    print(f"núcleos: {os.cpu_count()}")
+    base = None
+    for procesos, medida in resultado.items():
+        base = base or medida["comandos_por_segundo"]
+        texto = (f"{procesos:>3} procesos  {medida['comandos_por_segundo']:>10.0f} comandos/s  "
+                 f"x{medida['comandos_por_segundo'] / base:.2f}  desequilibrio {medida['desequilibrio']:.2f}")
+        previa = (anterior or {}).get(procesos)
+        if previa and previa.get("comandos_por_segundo"):
+            cambio = (medida["comandos_por_segundo"] - previa["comandos_por_segundo"]) / previa["comandos_por_segundo"]
+            texto += f"  ({cambio:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--servidores", type=int, default=800, help="servidores, con una partida cada uno")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--jugadores", type=int, default=8, help="jugadores por partida")
+    parser.add_argument("--simultaneas", type=int, default=200, help="partidas jugándose a la vez en cada proceso")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por petición REST (±50 %%)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    resultado = {str(procesos): medir(args, procesos) for procesos in args.procesos}
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
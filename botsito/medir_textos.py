@@ -0,0 +1,113 @@
+"""Mide lo que cuesta construir los mensajes de cada fase (bot/textos.py) en partidas grandes.
+
+Uso: python medir_textos.py --jugadores 10 25 50 100 --partidas 200
+
+Para cada tamaño juega `--partidas` partidas personalizadas (una cuarta
+parte de mafiosos, `--doctores` doctores y `--detectives` detectives) solo
+en lo que toca a los textos: el reparto (un DM de rol por jugador) y, hasta
+que queda la mitad, noches (instrucciones para cada rol especial) y
+votaciones (la lista de vivos), con una muerte entre cada fase. Muestra los
+microsegundos por fase con la caché de Textos y sin ella (cada
+destinatario recalcula sus listas), y cuántas veces es más rápida.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from bot.textos import Textos
+from game.jugadores import Plantel, Rol
+
+# Solo cuenta su longitud: parecida a las de mainnn.ROLES
+DESCRIPCIONES = {rol: f"Eres {rol.value.lower()}. " + "Descripción de lo que puede hacer el rol. " * 2 for rol in Rol}
+
+
+def plantel(jugadores: int, doctores: int, detectives: int, azar: random.Random) -> Plantel:
+    roles = ([Rol.MAFIOSO] * (jugadores // 4) + [Rol.DOCTOR] * doctores + [Rol.DETECTIVE] * detectives)
+    roles += [Rol.CIUDADANO] * (jugadores - len(roles))
+    azar.shuffle(roles)
+    resultado = Plantel()
+    for i, rol in enumerate(roles):
+        resultado.agregar(str(i), f"Jugador{i}")
+        resultado.asignar_rol(str(i), rol)
+    return resultado
+
+
+def partida(textos: Textos, canal_id: str, jugadores: Plantel, azar: random.Random) -> int:
+    """Construye todos los mensajes de una partida; devuelve cuántas fases tuvo"""
+    for jugador in jugadores:
+        textos.mensaje_rol(canal_id, jugadores, jugador)
+    fases = 1
+    while len(jugadores.vivos()) > len(jugadores) // 2:
+        for jugador in jugadores.vivos():
+            textos.instrucciones_noche(canal_id, jugadores, jugador)
+        jugadores.matar(azar.choice(jugadores.vivos()).id)
+        textos.inicio_votacion(canal_id, jugadores)
+        jugadores.matar(azar.choice(jugadores.vivos()).id)
+        fases += 2
+    textos.roles_finales(jugadores)
+    textos.olvidar(canal_id)
+    return fases + 1
+
+
+def medir(args, jugadores: int, con_cache: bool) -> float:
+    """Microsegundos por fase"""
+    textos = Textos(DESCRIPCIONES)
+    if not con_cache:
+        # Sin caché: cada destinatario vuelve a construir sus listas
+        textos._memo = lambda canal_id, plantel_, clave, calcular: calcular()
+    azar = random.Random(args.semilla)
+    planteles = [plantel(jugadores, args.doctores, args.detectives, azar) for _ in range(args.partidas)]
+    inicio = time.perf_counter()
+    fases = sum(partida(textos, str(numero), p, azar) for numero, p in enumerate(planteles))
+    return (time.perf_counter() - inicio) / fases * 1e6
+
+
+def mostrar(resultado: Dict[str, Dict[str, float]], anterior: Optional[Dict] = None):
+    print(f"{'jugadores':<12}{'con caché':>14}{'sin caché':>14}")
+    for jugadores, medida in resultado.items():
+        texto = (f"{jugadores:<12}{medida['con_cache_us']:>11.1f} µs{medida['sin_cache_us']:>11.1f} µs"
+                 f"  x{medida['sin_cache_us'] / medida['con_cache_us']:.1f}")
+        previa = (anterior or {}).get(jugadores)
+        if previa and previa.get("con_cache_us"):
+            texto += f"  ({(medida['con_cache_us'] - previa['con_cache_us']) / previa['con_cache_us']:+.1%})"
+        print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--jugadores", type=int, nargs="+", default=[10, 25, 50, 100])
+    parser.add_argument("--partidas", type=int, default=200, help="partidas de cada tamaño")
+    parser.add_argument("--doctores", type=int, default=2)
+    parser.add_argument("--detectives", type=int, default=2)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    resultado = {
+        str(jugadores): {
+            "con_cache_us": round(medir(args, jugadores, True), 2),
+            "sin_cache_us": round(medir(args, jugadores, False), 2),
+        }
+        for jugadores in args.jugadores
+    }
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Mide lo que cuestan el vigilante del bucle y el perfilador (bot/vigilancia.py).
+
+Uso: python medir_vigilancia.py --reposo 5 --partidas 300 --repeticiones 3
+
+- reposo: CPU que gasta el proceso sin hacer nada durante `--reposo`
+  segundos, con el vigilante y sin él (ms de CPU por segundo);
+- bucle: vueltas por segundo de tareas que solo ceden el turno
+  (`await asyncio.sleep(0)`), con el vigilante y sin él;
+- partidas: comandos por segundo jugando partidas enteras contra el
+  Discord falso, como carga.py, sin vigilante, con él y con él más un
+  perfil (`!mafia perfil`) capturando durante toda la medida. Las medidas
+  se alternan para que ninguna salga siempre primero.
+
+`--json` y `--comparar` funcionan como en carga.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+VUELTAS = 200_000
+TAREAS = 10
+
+
+async def reposo(segundos: float) -> float:
+    """Milisegundos de CPU por segundo sin nada que hacer"""
+    cpu = time.process_time()
+    await asyncio.sleep(segundos)
+    return (time.process_time() - cpu) / segundos * 1000
+
+
+async def bucle() -> float:
+    """Vueltas por segundo de tareas que solo ceden el turno"""
+    async def tarea():
+        for _ in range(VUELTAS // TAREAS):
+            await asyncio.sleep(0)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(tarea() for _ in range(TAREAS)))
+    return VUELTAS / (time.perf_counter() - inicio)
+
+
+async def ejecutar(args, directorio: str) -> Dict[str, Dict[str, float]]:
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso, RedFalsa
+    from bot.vigilancia import Perfilador
+    from carga import Carga
+
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn as bot
+
+    await bot.client.conectar()  # Arranca el vigilante, como en producción
+    vigilante = bot.vigilante
+    perfilador = Perfilador(directorio)
+    numero = 0
+
+    async def partidas() -> float:
+        nonlocal numero
+        carga = Carga(bot, red, args.jugadores, args.semilla)
+        inicio = time.perf_counter()
+        await asyncio.gather(*(carga.partida(n) for n in range(numero, numero + args.partidas)))
+        await bot.salida.vaciar()
+        numero += args.partidas
+        return len(carga.latencias) / (time.perf_counter() - inicio)
+
+    async def con_perfil() -> float:
+        captura = asyncio.create_task(perfilador.capturar(3600))
+        await asyncio.sleep(0)  # Que empiece a muestrear antes de jugar
+        try:
+            return await partidas()
+        finally:
+            captura.cancel()
+            await asyncio.gather(captura, return_exceptions=True)
+
+    medidas: Dict[str, Dict[str, List[float]]] = {
+        "reposo_ms_cpu": {"sin": [], "con": []},
+        "bucle_vueltas": {"sin": [], "con": []},
+        "partidas_comandos": {"sin": [], "con": [], "perfil": []},
+    }
+    # Una vuelta sin anotar: la primera medida pagaría imports y cachés frías
+    await bucle()
+    await partidas()
+    for repeticion in range(args.repeticiones):
+        modos = ["sin", "con", "perfil"]
+        if repeticion % 2:
+            modos.reverse()
+        for modo in modos:
+            if modo == "sin":
+                vigilante.detener()
+            else:
+                vigilante.iniciar()
+            if modo != "perfil":
+                medidas["reposo_ms_cpu"][modo].append(await reposo(args.reposo))
+                medidas["bucle_vueltas"][modo].append(await bucle())
+                medidas["partidas_comandos"][modo].append(await partidas())
+            elif perfilador.disponible():
+                medidas["partidas_comandos"][modo].append(await con_perfil())
+    vigilante.detener()
+    bot.cerrar_almacenes()
+    return {nombre: {modo: round(statistics.median(valores), 2) for modo, valores in por_modo.items() if valores}
+            for nombre, por_modo in medidas.items()}
+
+
+def mostrar(resultado: Dict[str, Dict[str, float]], anterior: Optional[Dict] = None):
+    for nombre, por_modo in resultado.items():
+        base = por_modo["sin"]
+        for modo, valor in por_modo.items():
+            texto = f"{nombre:<20}{modo:<8}{valor:>14.2f}"
+            if modo != "sin" and base:
+                texto += f"  ({(valor - base) / base:+.1%} frente a sin vigilante)"
+            previa = (anterior or {}).get(nombre, {}).get(modo)
+            if previa:
+                texto += f"  [{(valor - previa) / previa:+.1%} frente al anterior]"
+            print(texto)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--reposo", type=float, default=5.0, help="segundos de cada medida en reposo")
+    parser.add_argument("--partidas", type=int, default=300, help="partidas por medida")
+    parser.add_argument("--jugadores", type=int, default=8, help="jugadores por partida")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="guarda el resultado en este archivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) con el que comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="vigilancia-")
+    os.environ.update({
+        "DIARIO_PARTIDAS": os.path.join(directorio, "partidas.db"),
+        "ESTADISTICAS": os.path.join(directorio, "estadisticas.db"),
+        "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+        "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    })
+    os.environ.setdefault("LOG_NIVEL", "ERROR")
+    os.environ.pop("METRICAS_PUERTO", None)
+    resultado = asyncio.run(ejecutar(args, directorio))
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+    mostrar(resultado, anterior)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Entorno común de las pruebas: mainnn contra el Discord falso (bot/falso.py).
+
+mainnn guarda su estado en el módulo, así que todas las pruebas comparten un
+solo bot y un solo bucle de eventos; cada módulo usa sus propios canales y
+usuarios (a partir de su `base`) para no pisarse. Los plazos de las fases
+son de una hora: las fases las avanza `!siguiente`.
+"""
+import asyncio
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict
+
+import pytest
+
+DIRECTORIO = tempfile.mkdtemp(prefix="pruebas-")
+os.environ.update({
+    "DIARIO_PARTIDAS": os.path.join(DIRECTORIO, "partidas.db"),
+    "ESTADISTICAS": os.path.join(DIRECTORIO, "estadisticas.db"),
+    "DURACION_NOCHE": "3600", "DURACION_DIA": "3600", "DURACION_VOTACION": "3600",
+    "MAX_PARTIDAS": "100000",
+    "PERFIL_CLIENTE": "ligero", "MODO_INTERACCION": "mensajes",
+    # Cada cambio de un plantel recalcula sus contadores (ver game/jugadores.py)
+    "COMPROBAR_INVARIANTES": "1",
+})
+os.environ.setdefault("LOG_NIVEL", "ERROR")
+os.environ.pop("METRICAS_PUERTO", None)
+
+
+@pytest.fixture(scope="session")
+def bucle():
+    bucle = asyncio.new_event_loop()
+    yield bucle
+    bucle.run_until_complete(cancelar_pendientes())
+    bucle.close()
+
+
+async def cancelar_pendientes():
+    """Las colas y los actores esperan su plazo de inactividad: se cancelan al acabar"""
+    pendientes = asyncio.all_tasks() - {asyncio.current_task()}
+    for tarea in pendientes:
+        tarea.cancel()
+    await asyncio.gather(*pendientes, return_exceptions=True)
+
+
+@pytest.fixture
+def correr(bucle):
+    """Ejecuta una corrutina en el bucle compartido y devuelve su resultado"""
+    return bucle.run_until_complete
+
+
+@pytest.fixture(scope="session")
+def red():
+    from bot.falso import RedFalsa
+
+    # Sin latencia ni límites: las pruebas miden el bot, no la red
+    return RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9)
+
+
+@pytest.fixture(scope="session")
+def bot(bucle, red):
+    from bot import client as modulo_cliente
+    from bot.falso import ClienteFalso
+
+    modulo_cliente.fabrica_cliente = lambda **opciones: ClienteFalso(red, **opciones)
+    import mainnn
+
+    bucle.run_until_complete(mainnn.client.conectar())
+    yield mainnn
+    mainnn.cerrar_almacenes()
+
+
+# {módulo de pruebas: primer id de sus canales y usuarios}; los de carga.py
+# (canales 10**9 + n, usuarios por debajo de 10**9) quedan por debajo de todos
+_bases: Dict[str, int] = {}
+
+
+@pytest.fixture
+def base(request) -> int:
+    """Primer id de los canales y usuarios del módulo: 10**9 ids para cada uno"""
+    return _bases.setdefault(request.module.__name__, (len(_bases) + 2) * 10**9)
+
+
+@pytest.fixture
+def vaciar(bot):
+    """Corrutina que espera a que salgan los DMs en segundo plano y los mensajes encolados"""
+    async def vaciar():
+        while bot.envios_privados:
+            await asyncio.gather(*list(bot.envios_privados.values()))
+        await bot.salida.vaciar()
+    return vaciar
+
+
+@pytest.fixture
+def entregados(red):
+    """`with entregados() as lista:` guarda en `lista` lo que la red entrega mientras dura"""
+    @contextmanager
+    def guardando():
+        red.entregados.clear()
+        red.guardar_entregados = True
+        try:
+            yield red.entregados
+        finally:
+            red.guardar_entregados = False
+    return guardando
+
+
+@pytest.fixture
+def reloj_virtual(bucle, monkeypatch):
+    """El bucle con un reloj de mentira: cuando solo queda esperar, el reloj salta en vez de dormir.
+
+    Devuelve el reloj (bucle.time). Los tiempos medidos con él (latencias,
+    Retry-After) son exactos y no dependen de lo cargada que esté la máquina.
+    """
+    ahora = [bucle.time()]
+    seleccionar = bucle._selector.select
+
+    def seleccionar_sin_esperar(timeout=None):
+        if timeout is not None and timeout > 0:
+            ahora[0] += timeout
+            timeout = 0
+        return seleccionar(timeout)
+
+    monkeypatch.setattr(bucle, "time", lambda: ahora[0])
+    monkeypatch.setattr(bucle._selector, "select", seleccionar_sin_esperar)
+    return bucle.time
@@ -0,0 +1,145 @@
+"""Actores por partida: órdenes en serie dentro de una partida, partidas en paralelo"""
+import asyncio
+
+from game import actores as modulo_actores
+from game.actores import Actores
+
+PARTIDAS = 200
+PLAZAS = 8
+SOBRAN = 4  # Quieren unirse más de los que caben, todos a la vez
+LATENCIA = 0.005
+
+FINALES_VOTACION = ("linchado por el pueblo", "no ha decidido linchar")
+
+
+def test_orden_encolada_al_caducar_el_actor_no_se_pierde(correr, monkeypatch):
+    """Una orden que llega en la misma vuelta del bucle que el plazo de inactividad se ejecuta"""
+    monkeypatch.setattr(modulo_actores, "INACTIVIDAD", 0)
+    actores = Actores()
+    hechas = []
+
+    async def probar():
+        async def orden(numero=None):
+            hechas.append(numero)
+
+        for numero in range(500):
+            assert actores.enviar("canal", lambda numero=numero: orden(numero))
+            # Desfasar el envío respecto al plazo del actor, que vence en cada vuelta
+            for _ in range(numero % 3):
+                await asyncio.sleep(0)
+        resultado = await asyncio.wait_for(actores.ejecutar("canal", lambda: orden("ultima")), 1)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        return resultado
+
+    correr(probar())
+    assert hechas == list(range(500)) + ["ultima"]
+    assert len(actores) == 0  # Sin órdenes, el actor se libera
+
+
+def test_actor_cancelado_se_da_de_baja_y_falla_lo_pendiente(correr):
+    actores = Actores()
+
+    async def probar():
+        empezada = asyncio.Event()
+
+        async def eterna():
+            empezada.set()
+            await asyncio.Event().wait()
+
+        async def rapida():
+            return "hecha"
+
+        en_curso = asyncio.ensure_future(actores.ejecutar("canal", eterna))
+        en_cola = asyncio.ensure_future(actores.ejecutar("canal", rapida))
+        await empezada.wait()
+        actores._tareas["canal"].cancel()
+        return await asyncio.wait_for(asyncio.gather(en_curso, en_cola, return_exceptions=True), 1)
+
+    resultados = correr(probar())
+    assert all(isinstance(r, modulo_actores.ActorDetenido) for r in resultados)
+    assert len(actores) == 0 and actores.pendientes() == 0
+    assert actores.en_curso == {}
+
+
+def test_orden_cancelada_por_dentro_no_para_el_actor(correr):
+    actores = Actores()
+
+    async def probar():
+        async def cancelada():
+            tarea = asyncio.ensure_future(asyncio.sleep(10))
+            tarea.cancel()
+            await tarea
+
+        async def siguiente():
+            return "hecha"
+
+        try:
+            await asyncio.wait_for(actores.ejecutar("canal", cancelada), 1)
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("la orden debía cancelarse")
+        return await asyncio.wait_for(actores.ejecutar("canal", siguiente), 1)
+
+    assert correr(probar()) == "hecha"
+    assert len(actores) == 1
+
+
+def test_uniones_y_votos_simultaneos(bot, red, correr, base, vaciar, entregados, reloj_virtual):
+    """Muchas partidas a la vez, cada una con uniones, votos y !siguiente que compiten"""
+
+    async def partida(numero: int):
+        canal = red.canal(base + numero)
+        primero = base + 10**4 * numero
+        creador = red.usuario(primero, admin=True)
+        aspirantes = [red.usuario(primero + i) for i in range(1, PLAZAS + SOBRAN)]
+        await bot.client.entregar(creador, f"!mafia crear {PLAZAS}", canal)
+        await asyncio.gather(*(bot.client.entregar(u, "!mafia unirme", canal) for u in aspirantes))
+        await bot.client.entregar(creador, "!siguiente", canal)  # Noche -> día
+        await bot.client.entregar(creador, "!siguiente", canal)  # Día -> votación
+        canal_id = str(canal.id)
+        if canal_id not in bot.partidas:
+            return canal_id  # La noche pudo terminar la partida
+        plantel = bot.jugadores_por_partida[canal_id]
+        vivos = [red.usuario(int(j.id)) for j in plantel.vivos()]
+        objetivo = plantel.vivos()[-1].nombre
+        # Todos votan al último mientras el moderador pulsa !siguiente tres veces
+        await asyncio.gather(*(bot.client.entregar(u, f"!votar {objetivo}") for u in vivos),
+                             *(bot.client.entregar(creador, "!siguiente", canal) for _ in range(3)))
+        return canal_id
+
+    async def jugar():
+        red.latencia = LATENCIA
+        try:
+            inicio = reloj_virtual()
+            canales = await asyncio.gather(*(partida(n) for n in range(PARTIDAS)))
+            await vaciar()  # Hasta que sale el último mensaje
+            return canales, reloj_virtual() - inicio
+        finally:
+            red.latencia = 0
+
+    llamadas_antes = sum(red.llamadas.values())
+    with entregados() as anunciados:
+        canales, duracion = correr(jugar())
+    llamadas = sum(red.llamadas.values()) - llamadas_antes
+
+    for canal_id in canales:
+        partida = bot.partidas.get(canal_id)
+        if partida is None:
+            continue
+        plantel = bot.jugadores_por_partida[canal_id]
+        assert len(plantel) == PLAZAS
+        assert all(j.rol is not None for j in plantel)
+        # Solo los que entraron quedan apuntados a la partida; los que no cupieron, en ninguna
+        primero = base + 10**4 * (int(canal_id) - base)
+        apuntados = {str(u) for u in range(primero, primero + PLAZAS + SOBRAN)
+                     if bot.partida_por_usuario.get(str(u)) == canal_id}
+        assert apuntados == {j.id for j in plantel}
+        plantel.comprobar_invariantes()
+        # La votación se cerró una sola vez aunque llegaran tres !siguiente
+        anuncios = [texto for destino, texto in anunciados if str(destino) == canal_id]
+        assert sum(texto.count(final) for texto in anuncios for final in FINALES_VOTACION) == 1
+    # Las partidas van en paralelo: en el reloj virtual, mucho menos que hacer todas las llamadas una tras otra
+    assert duracion < llamadas * LATENCIA / 10
+    assert bot.actores.rechazadas == 0
@@ -0,0 +1,104 @@
+"""Comandos de barra: contestan en la propia respuesta y solo se difieren si tienen que esperar"""
+import asyncio
+from types import SimpleNamespace
+
+from bot.commands import RECHAZO_INTERACCION, Ambito, Router
+from game.actores import Actores
+
+
+class InteraccionFalsa:
+    """Lo que despachar_interaccion usa de discord.Interaction, anotando cada llamada"""
+
+    def __init__(self, servidor=None):
+        self.guild = servidor
+        self.user = SimpleNamespace(id=7)
+        self.channel = SimpleNamespace(id=8)
+        self.llamadas = []
+        self._hecha = False
+        self.response = SimpleNamespace(defer=self._diferir, is_done=lambda: self._hecha,
+                                        send_message=self._responder)
+        self.followup = SimpleNamespace(send=self._followup)
+
+    async def _diferir(self, ephemeral=False):
+        assert not self._hecha, "una interacción solo se contesta una vez"
+        self._hecha = True
+        self.llamadas.append(("defer", ephemeral))
+
+    async def _responder(self, contenido, ephemeral=False):
+        assert not self._hecha, "una interacción solo se contesta una vez"
+        self._hecha = True
+        self.llamadas.append(("respuesta", contenido, ephemeral))
+
+    async def _followup(self, contenido, ephemeral=False):
+        assert self._hecha, "el followup necesita una respuesta (o un defer) antes"
+        self.llamadas.append(("followup", contenido, ephemeral))
+
+
+def router(actores=None) -> Router:
+    router = Router(lambda autor_id, canal_id, es_privado: (None, None, None), actores=actores)
+
+    @router.comando("!lento")
+    async def lento(ctx):
+        ctx.interaccion.llamadas.append(("manejador",))
+        await asyncio.sleep(0.01)
+        await ctx.responder("uno")
+        await ctx.responder("dos")
+
+    @router.comando("!servidor", ambito=Ambito.SERVIDOR)
+    async def servidor(ctx):
+        await ctx.responder("no debería llegar")
+
+    return router
+
+
+def test_sin_esperas_contesta_en_la_propia_respuesta(correr):
+    interaccion = InteraccionFalsa(servidor=SimpleNamespace(id=1))
+    assert correr(router(Actores()).despachar_interaccion(interaccion, "!lento", []))
+    assert interaccion.llamadas == [("manejador",), ("respuesta", "uno\ndos", False)]
+
+
+def test_en_privado_la_respuesta_es_efimera(correr):
+    interaccion = InteraccionFalsa()
+    correr(router().despachar_interaccion(interaccion, "!lento", []))
+    assert interaccion.llamadas[-1] == ("respuesta", "uno\ndos", True)
+
+
+def test_difiere_antes_de_esperar_a_que_este_preparado(correr):
+    interaccion = InteraccionFalsa(servidor=SimpleNamespace(id=1))
+    despacho = router()
+    despacho.preparado = asyncio.Event()
+
+    async def probar():
+        tarea = asyncio.create_task(despacho.despachar_interaccion(interaccion, "!lento", []))
+        await asyncio.sleep(0)
+        assert interaccion.llamadas == [("defer", False)]  # Ya diferida mientras espera
+        despacho.preparado.set()
+        return await tarea
+
+    assert correr(probar())
+    assert interaccion.llamadas == [("defer", False), ("manejador",), ("followup", "uno\ndos", False)]
+
+
+def test_difiere_si_la_partida_esta_ocupada(correr):
+    interaccion = InteraccionFalsa(servidor=SimpleNamespace(id=1))
+    actores = Actores()
+    despacho = router(actores)
+
+    async def probar():
+        liberar = asyncio.Event()
+        actores.enviar(str(interaccion.channel.id), liberar.wait)  # Otra orden ocupa la partida
+        await asyncio.sleep(0)
+        tarea = asyncio.create_task(despacho.despachar_interaccion(interaccion, "!lento", []))
+        await asyncio.sleep(0)
+        assert interaccion.llamadas == [("defer", False)]
+        liberar.set()
+        return await tarea
+
+    assert correr(probar())
+    assert interaccion.llamadas == [("defer", False), ("manejador",), ("followup", "uno\ndos", False)]
+
+
+def test_comando_rechazado_contesta_igualmente(correr):
+    interaccion = InteraccionFalsa()  # Comando de servidor usado en un DM
+    assert not correr(router().despachar_interaccion(interaccion, "!servidor", []))
+    assert interaccion.llamadas == [("respuesta", RECHAZO_INTERACCION, True)]
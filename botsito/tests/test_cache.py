@@ -0,0 +1,65 @@
+"""Caché de entidades (bot/cache.py): caducidad, expulsión LRU e invalidación por eventos"""
+from bot.cache import CacheEntidades, CacheLRU
+from bot.client import intents_del_perfil
+from bot.commands import Router
+from bot.events import registrar_eventos
+from bot.falso import ClienteFalso
+
+
+def test_caduca_pasado_el_ttl():
+    ahora = [0.0]
+    cache = CacheLRU(max_entradas=10, ttl=60, reloj=lambda: ahora[0])
+    cache.guardar("a", 1)
+    ahora[0] = 60
+    assert cache.obtener("a") == 1
+    ahora[0] = 60.5
+    assert cache.obtener("a") is None
+    assert len(cache) == 0  # La entrada caducada se borra al consultarla
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+    cache.guardar("a", 2)  # Guardar otra vez renueva el plazo
+    ahora[0] = 100
+    assert cache.obtener("a") == 2
+
+
+def test_expulsa_la_menos_usada():
+    cache = CacheLRU(max_entradas=2, ttl=60)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")  # "b" pasa a ser la menos usada
+    cache.guardar("c", 3)
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1 and cache.obtener("c") == 3
+
+    cache.invalidar("a")
+    cache.invalidar("a")  # Invalidar lo que no está no falla
+    assert cache.obtener("a") is None and len(cache) == 1
+
+
+def test_eventos_invalidan_usuarios_dms_y_canales(red, correr, base):
+    cliente = ClienteFalso(red, intents=intents_del_perfil("completo"))
+    cache = CacheEntidades(cliente)
+    registrar_eventos(cliente, Router(lambda *_: (None, None, None)), cache)
+    usuario_id, canal_id = str(base), str(base + 1)
+    red.canal(base + 1)
+
+    privado = correr(cache.obtener_canal_privado(usuario_id))
+    correr(cache.obtener_canal(canal_id))
+    peticiones = cache.peticiones_rest
+    assert correr(cache.obtener_canal_privado(usuario_id)) is privado
+    assert cache.peticiones_rest == peticiones  # Ya estaban en la caché
+
+    # Al borrarse el DM se olvidan el canal y su destinatario
+    correr(cliente.on_private_channel_delete(privado))
+    assert cache.usuarios.obtener(usuario_id) is None
+    assert cache.privados.obtener(usuario_id) is None
+    correr(cache.obtener_canal_privado(usuario_id))
+    assert cache.peticiones_rest == peticiones + 1  # Vuelve a pedir el usuario
+
+    # Quien deja el servidor tampoco conserva su DM en la caché
+    correr(cliente.on_member_remove(red.usuario(base)))
+    assert cache.privados.obtener(usuario_id) is None
+
+    correr(cliente.on_guild_channel_delete(red.canales[base + 1]))
+    assert cache.canales.obtener(canal_id) is None
+    assert correr(cache.obtener_canal(canal_id)) is red.canales[base + 1]  # Sigue en el gateway
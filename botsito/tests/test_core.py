@@ -0,0 +1,98 @@
+"""Reglas de game/core.py: cada paso devuelve la partida nueva y sus efectos sin tocar la anterior"""
+from game import core
+from game.core import FaseJuego
+from game.jugadores import Bando, Plantel, Rol
+from game.votos import Desempate
+
+# Dos mafiosos, doctor, detective y dos ciudadanos
+ROLES = [Rol.MAFIOSO, Rol.MAFIOSO, Rol.DOCTOR, Rol.DETECTIVE, Rol.CIUDADANO, Rol.CIUDADANO]
+
+
+def mesa():
+    jugadores = Plantel()
+    for numero, rol in enumerate(ROLES):
+        jugadores.agregar(str(numero), f"J{numero}")
+        jugadores.asignar_rol(str(numero), rol)
+    partida = {"estado": FaseJuego.ESPERANDO, "creador": "0", "max_jugadores": len(ROLES),
+               "roles_asignados": True}
+    return core.iniciar_noche(partida, Desempate.ALEATORIO).partida, jugadores
+
+
+def aplicar(paso: core.Paso, jugadores: Plantel):
+    for muerto in paso.muertos:
+        jugadores.matar(muerto)
+    return paso.partida
+
+
+def tipos(paso: core.Paso):
+    return [type(efecto) for efecto in paso.efectos]
+
+
+def test_noche_completa_y_doctor_que_salva():
+    partida, jugadores = mesa()
+    assert partida["estado"] == FaseJuego.NOCHE
+
+    paso = core.votar_matar(partida, jugadores, "0", "4")
+    assert len(partida["votos_matar"]) == 0  # La partida de antes no cambia
+    assert tipos(paso) == [core.VotoRegistrado, core.Guardar]
+    partida = paso.partida
+
+    assert core.votar_matar(partida, jugadores, "0", "1") is None  # A otro mafioso no
+    assert core.votar_matar(partida, jugadores, "4", "5") is None  # Un ciudadano no vota de noche
+    paso = core.votar_matar(partida, jugadores, "1", "4")
+    assert paso.partida["victima_noche"] == "4"
+    assert core.DecisionMafia("4") in paso.efectos
+    partida = paso.partida
+
+    partida = core.proteger(partida, jugadores, "4").partida
+    assert core.investigar(partida, jugadores, "3", "3") is None  # A sí mismo no
+    paso = core.investigar(partida, jugadores, "3", "0")
+    assert paso.efectos[-1] == core.Plazo(FaseJuego.NOCHE, ya=True)  # Ya actuaron todos
+    partida = paso.partida
+    assert core.investigar(partida, jugadores, "3", "1") is None  # Una vez por noche
+
+    paso = core.avanzar(partida, jugadores, Desempate.ALEATORIO, Desempate.SIN_DECISION)
+    assert paso.muertos == ()
+    assert paso.partida["estado"] == core.SIGUIENTE_FASE[FaseJuego.NOCHE] == FaseJuego.DIA
+    assert core.Amanecer(None, True) in paso.efectos
+    assert not paso.terminada
+
+
+def test_linchamiento_que_termina_la_partida():
+    partida, jugadores = mesa()
+    for jugador_id in ("2", "3", "4"):
+        jugadores.matar(jugador_id)  # Quedan dos mafiosos y un ciudadano: la mafia ya iguala
+    paso = core.resolver_noche(partida, jugadores)
+    assert paso.efectos[-1] == core.FinPartida(Bando.MAFIA)
+
+    partida, jugadores = mesa()
+    for jugador_id in ("1", "2", "3"):
+        jugadores.matar(jugador_id)  # Un mafioso contra dos ciudadanos
+    partida = aplicar(core.avanzar(partida, jugadores, Desempate.ALEATORIO, Desempate.SIN_DECISION), jugadores)
+    partida = aplicar(core.avanzar(partida, jugadores, Desempate.ALEATORIO, Desempate.SIN_DECISION), jugadores)
+    assert partida["estado"] == FaseJuego.VOTACION
+
+    assert core.votar_linchar(partida, jugadores, "4", "4") is None  # A sí mismo no
+    assert core.votar_linchar(partida, jugadores, "1", "0") is None  # Los muertos no votan
+    partida = core.votar_linchar(partida, jugadores, "4", "0").partida
+    paso = core.votar_linchar(partida, jugadores, "5", "0")
+    assert core.Plazo(FaseJuego.VOTACION, ya=True) in paso.efectos  # 2 de 3: mayoría absoluta
+
+    paso = core.avanzar(paso.partida, jugadores, Desempate.ALEATORIO, Desempate.SIN_DECISION)
+    assert paso.muertos == ("0",)
+    assert tipos(paso) == [core.Guardar, core.Linchamiento, core.FinPartida]
+    assert paso.efectos[-1].ganador == Bando.PUEBLO
+    assert jugadores.obtener("0").vivo  # El plantel lo actualiza quien aplica el paso
+
+
+def test_votacion_sin_decision_pasa_a_la_noche():
+    partida, jugadores = mesa()
+    partida = core.iniciar_votacion(partida, Desempate.SIN_DECISION).partida
+    partida = core.votar_linchar(partida, jugadores, "4", "0").partida
+    partida = core.votar_linchar(partida, jugadores, "5", "1").partida
+
+    paso = core.avanzar(partida, jugadores, Desempate.ALEATORIO, Desempate.SIN_DECISION)
+    assert paso.muertos == ()
+    assert paso.efectos[0] == core.SinLinchamiento(empate=True)
+    assert paso.partida["estado"] == FaseJuego.NOCHE
+    assert len(paso.partida["votos_matar"]) == 0
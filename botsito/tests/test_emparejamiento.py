@@ -0,0 +1,47 @@
+"""`!mafia buscar`: la sala se crea y se llena antes de avisar a nadie"""
+import time
+
+from game.core import FaseJuego
+from game.emparejamiento import Solicitud
+
+def sala(canal_id: str, jugadores, repetido=None):
+    ahora = time.monotonic()
+    solicitudes = [Solicitud(str(j), f"J{j}", canal_id, "1", 6, "es", ahora) for j in jugadores]
+    if repetido is not None:
+        # El mismo jugador dos veces: la segunda no puede entrar
+        solicitudes.append(solicitudes[repetido]._replace(nombre="Otra vez"))
+    return solicitudes
+
+
+def test_avisa_cuando_ya_estan_todos_dentro(bot, correr, base, vaciar, monkeypatch):
+    canal_id = str(base)
+    jugadores = range(base + 1, base + 6)
+    dentro_al_avisar = []
+    enviar = bot.salida.enviar
+
+    async def contar(canal, texto):
+        if "Partida encontrada" in texto:
+            dentro_al_avisar.append(len(bot.jugadores_por_partida[canal_id]))
+        await enviar(canal, texto)
+
+    monkeypatch.setattr(bot.salida, "enviar", contar)
+    correr(bot.formar_partida(canal_id, sala(canal_id, jugadores, repetido=2)))
+
+    assert dentro_al_avisar == [5]
+    assert bot.partidas[canal_id]["estado"] == FaseJuego.NOCHE
+    assert bot.partidas[canal_id]["max_jugadores"] == 5
+    assert str(base + 3) not in bot.obtener_emparejador()  # Ya juega: no vuelve a la cola
+    correr(vaciar())
+
+
+def test_sin_jugadores_suficientes_se_deshace_y_vuelven_a_la_cola(bot, correr, base):
+    canal_id = str(base + 100)
+    jugadores = range(base + 101, base + 105)
+    correr(bot.formar_partida(canal_id, sala(canal_id, jugadores, repetido=0)))
+
+    assert canal_id not in bot.partidas
+    emparejador = bot.obtener_emparejador()
+    assert all(str(j) in emparejador for j in jugadores)
+    assert all(bot.partida_del_jugador(str(j)) is None for j in jugadores)
+    for jugador in jugadores:
+        emparejador.cancelar(str(jugador))
@@ -0,0 +1,120 @@
+"""DMs en paralelo contra una red que devuelve 429 con Retry-After, como la API de Discord"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+import discord
+
+from bot import envios as modulo_envios
+from bot.envios import EsperasPorRuta, enviar_privados
+from bot.falso import RedFalsa
+
+JUGADORES = 20
+
+
+def destinos(red: RedFalsa):
+    async def obtener_destino(jugador_id: str):
+        return await red.usuario(int(jugador_id)).create_dm()
+    return obtener_destino
+
+
+def test_reintenta_los_429_sin_frenar_al_resto(correr, reloj_virtual):
+    # Un mensaje por DM cada 0.1 s: el segundo a cada jugador recibe un 429
+    red = RedFalsa(latencia=0.001, limite_global=10**9, limite_destino=1, periodo_destino=0.1,
+                   responder_429=True, reloj=reloj_virtual)
+    red.guardar_entregados = True
+    jugadores = [str(10**6 + i) for i in range(JUGADORES)]
+
+    async def enviar():
+        inicio = reloj_virtual()
+        primeros = await enviar_privados(destinos(red), {j: f"rol {j}" for j in jugadores})
+        segundos = await enviar_privados(destinos(red), {j: f"noche {j}" for j in jugadores})
+        return primeros + segundos, reloj_virtual() - inicio
+
+    no_alcanzados, duracion = correr(enviar())
+    assert no_alcanzados == []
+    assert red.limitadas["send"] >= JUGADORES
+    entregados = {(destino - 10**15, texto) for destino, texto in red.entregados}
+    assert entregados == {(int(j), f"{t} {j}") for j in jugadores for t in ("rol", "noche")}
+    # Cada jugador espera su Retry-After (0.1 s en el reloj virtual) a la vez que los demás:
+    # uno tras otro serían 0.1 s por jugador
+    assert duracion < 0.1 * 2
+
+
+def test_informa_de_los_que_no_se_alcanzan(correr, monkeypatch):
+    monkeypatch.setattr(modulo_envios, "ESPERA_BASE", 0.001)
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9, dm_cerrados=0.3)
+    jugadores = [str(10**6 + i) for i in range(JUGADORES)]
+    cerrados = [j for j in jugadores if red.usuario(int(j)).dm_cerrados]
+    assert cerrados
+
+    no_alcanzados = correr(enviar_privados(destinos(red), {j: "rol" for j in jugadores}))
+    assert no_alcanzados == cerrados
+    # Un 403 no se reintenta
+    assert red.llamadas["send"] == JUGADORES
+
+
+def test_reintenta_errores_del_servidor(correr, monkeypatch):
+    monkeypatch.setattr(modulo_envios, "ESPERA_BASE", 0.001)
+    # El azar de las esperas decide el orden de los reintentos: fijo, para que la prueba lo sea
+    monkeypatch.setattr(modulo_envios, "random", random.Random(0))
+    red = RedFalsa(latencia=0, limite_global=10**9, limite_destino=10**9, prob_fallo=0.3, semilla=1)
+    red.guardar_entregados = True
+    jugadores = [str(10**6 + i) for i in range(JUGADORES)]
+
+    no_alcanzados = correr(enviar_privados(destinos(red), {j: "rol" for j in jugadores}))
+    assert red.fallidas
+    # create_dm y send fallan cada uno un 30 %: sin reintentos no llegaría la mitad
+    assert len(no_alcanzados) < JUGADORES // 4
+    alcanzados = {str(destino - 10**15) for destino, _ in red.entregados}
+    assert alcanzados == set(jugadores) - set(no_alcanzados)
+
+
+def test_un_429_solo_frena_su_ruta(correr, reloj_virtual):
+    """El Retry-After de un DM lo respetan los lotes siguientes a ese DM, y solo a ese"""
+    entregas = []
+    limitados = {"1": 5.0}  # {jugador: Retry-After del próximo envío}; "todos": 429 global
+
+    class Destino:
+        def __init__(self, jugador_id: str):
+            self.jugador_id = jugador_id
+
+        async def send(self, contenido: str):
+            await asyncio.sleep(0.001)
+            for clave in (self.jugador_id, "todos"):
+                if clave in limitados:
+                    respuesta = SimpleNamespace(status=429, reason="Too Many Requests", headers={
+                        "Retry-After": str(limitados.pop(clave)),
+                        "X-RateLimit-Global": str(clave == "todos").lower(),
+                    })
+                    raise discord.HTTPException(respuesta, "You are being rate limited.")
+            entregas.append((self.jugador_id, contenido, round(reloj_virtual())))
+
+    async def obtener_destino(jugador_id: str):
+        return Destino(jugador_id)
+
+    async def enviar():
+        esperas = EsperasPorRuta()
+        inicio = reloj_virtual()
+        roles = asyncio.create_task(
+            enviar_privados(obtener_destino, {"1": "rol", "2": "rol"}, esperas=esperas))
+        await asyncio.sleep(1)
+        # El siguiente lote al jugador 1 espera al 429 del anterior en vez de pedir otro
+        assert await enviar_privados(obtener_destino, {"1": "noche", "2": "noche"}, esperas=esperas) == []
+        assert await roles == []
+
+        # Un 429 global frena también los envíos a los demás
+        limitados["todos"] = 3.0
+        dia = asyncio.create_task(enviar_privados(obtener_destino, {"1": "día"}, esperas=esperas))
+        await asyncio.sleep(1)
+        assert await enviar_privados(obtener_destino, {"2": "día"}, esperas=esperas) == []
+        assert await dia == []
+        return inicio
+
+    inicio = round(correr(enviar()))
+    assert limitados == {}
+    # El orden entre lotes lo pone quien los manda (ver privados_en_segundo_plano en mainnn.py)
+    assert sorted((s - inicio, j, t) for j, t, s in entregas) == [
+        (0, "2", "rol"), (1, "2", "noche"), (5, "1", "noche"), (5, "1", "rol"),
+        (8, "1", "día"), (8, "2", "día"),
+    ]
@@ -0,0 +1,40 @@
+"""Estadísticas (game/estadisticas.py): contadores por jugador y rol, y el ranking en memoria"""
+from game.estadisticas import Estadisticas, Resultado, Totales
+
+
+def test_fichas_y_ranking(tmp_path):
+    estadisticas = Estadisticas(str(tmp_path / "estadisticas.db"))
+    assert estadisticas.ficha("1") is None
+    assert estadisticas.ranking() == []
+
+    estadisticas.registrar("100", "pueblo", [
+        Resultado("1", "Ana", "aldeano", True, True),
+        Resultado("2", "Beto", "mafioso", False, False),
+    ])
+    estadisticas.registrar("101", "mafia", [
+        Resultado("1", "Ana María", "aldeano", False, False),
+        Resultado("2", "Beto", "mafioso", True, True),
+        Resultado("3", "Ceci", "mafioso", True, False),
+    ])
+    estadisticas.registrar("102", "mafia", [
+        Resultado("1", "Ana María", "mafioso", True, True),
+    ])
+    estadisticas.cerrar()
+    assert estadisticas.escritas == 3 and estadisticas.pendientes() == 0
+
+    ficha = estadisticas.ficha("1")
+    assert ficha.nombre == "Ana María"  # El nombre más reciente
+    assert ficha.totales == Totales(3, 2, 2)
+    assert ficha.por_rol == {"aldeano": Totales(2, 1, 1), "mafioso": Totales(1, 1, 1)}
+
+    # Más victorias primero; a igualdad, menos partidas
+    assert estadisticas.ranking(2) == [("Ana María", Totales(3, 2, 2)), ("Ceci", Totales(1, 1, 0))]
+    assert estadisticas.ranking_en_memoria(1) == [("Ana María", Totales(3, 2, 2))]
+    assert estadisticas.ranking_en_memoria(3) is None  # Se leyeron solo 2
+
+    # Una partida nueva deja viejo el ranking guardado
+    estadisticas.registrar("103", "pueblo", [Resultado("3", "Ceci", "aldeano", True, True)])
+    estadisticas.cerrar()
+    assert estadisticas.ranking_en_memoria(2) is None
+    assert estadisticas.ranking(3)[0] == ("Ceci", Totales(2, 2, 1))  # Mismas victorias que Ana, menos partidas
+    estadisticas.cerrar()
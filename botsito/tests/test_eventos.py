@@ -0,0 +1,29 @@
+"""Eventos del gateway: on_member_remove solo con el intent de miembros"""
+from bot.cache import CacheEntidades
+from bot.client import intents_del_perfil
+from bot.commands import Router
+from bot.events import registrar_eventos
+from bot.falso import ClienteFalso
+
+
+def cliente_con_perfil(red, perfil: str):
+    cliente = ClienteFalso(red, intents=intents_del_perfil(perfil))
+    cache = CacheEntidades(cliente)
+    registrar_eventos(cliente, Router(lambda *_: (None, None, None)), cache)
+    return cliente, cache
+
+
+def test_on_member_remove_invalida_al_jugador_en_el_perfil_completo(red, correr, base):
+    cliente, cache = cliente_con_perfil(red, "completo")
+    usuario = red.usuario(base)
+    cache.recordar_usuario(usuario)
+    assert cache.usuarios.obtener(str(usuario.id)) is usuario
+
+    correr(cliente.on_member_remove(usuario))
+    assert cache.usuarios.obtener(str(usuario.id)) is None
+
+
+def test_sin_intent_de_miembros_no_se_registra(red):
+    for perfil in ("ligero", "interacciones"):
+        cliente, _ = cliente_con_perfil(red, perfil)
+        assert not hasattr(cliente, "on_member_remove")
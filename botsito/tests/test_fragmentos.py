@@ -0,0 +1,54 @@
+"""Reenvío de DMs entre procesos: cada uno consulta su copia local de quién lleva a cada jugador"""
+import queue
+
+from bot.fragmentos import Reenvio, repartir_shards
+
+
+def procesos(cuantos: int):
+    colas = [queue.SimpleQueue() for _ in range(cuantos)]
+    return [Reenvio(indice, colas) for indice in range(cuantos)], colas
+
+
+def entregar(reenvio: Reenvio, cola):
+    """Lo que haría el hilo de escuchar(): aplica los avisos y devuelve los DMs"""
+    dms = []
+    while not cola.empty():
+        dm = reenvio.recibir(cola.get())
+        if dm is not None:
+            dms.append(dm)
+    return dms
+
+
+def test_vincular_avisa_a_los_demas_y_el_dm_va_al_dueno():
+    (cero, uno, dos), colas = procesos(3)
+    uno.vincular("7")
+    assert uno.propietario("7") == 1
+    assert cero.propietario("7") is None  # Hasta que lee su cola
+    for reenvio, cola in ((cero, colas[0]), (dos, colas[2])):
+        assert entregar(reenvio, cola) == []
+        assert reenvio.propietario("7") == 1
+
+    assert cero.reenviar_si_ajeno("7", 100, 200)
+    assert not uno.reenviar_si_ajeno("7", 100, 200)  # Es suyo
+    assert not cero.reenviar_si_ajeno("8", 100, 200)  # No es de nadie
+    assert entregar(uno, colas[1]) == [(100, 200)]
+
+
+def test_desvincular_tardio_no_borra_un_vinculo_nuevo():
+    (cero, uno, dos), colas = procesos(3)
+    cero.vincular("7")
+    cero.desvincular("7")
+    dos.vincular("7")  # Ya juega en otra partida, de otro proceso
+    uno.desvincular("7")  # No es suyo: no avisa a nadie
+    entregar(uno, colas[1])
+    assert uno.propietario("7") == 2
+
+    # Aunque el aviso de dos llegue antes que el desvincular de cero
+    uno.recibir(("vincular", "7", 2))
+    uno.recibir(("desvincular", "7", 0))
+    assert uno.propietario("7") == 2
+
+
+def test_repartir_shards():
+    assert repartir_shards(5, 2) == [[0, 1, 2], [3, 4]]
+    assert repartir_shards(2, 4) == [[0], [1]]
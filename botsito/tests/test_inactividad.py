@@ -0,0 +1,99 @@
+"""Expulsión de partidas inactivas: horas de altas y abandonos con memoria plana"""
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from bot import salida as modulo_salida
+from game import actores as modulo_actores
+
+RONDAS = 40
+POR_RONDA = 200   # Partidas nuevas por ronda; cada una cuesta un segundo simulado
+MAX_PARTIDAS = 300
+TTL_SALA = 600
+TTL_PARTIDA = 1200
+
+
+def test_memoria_plana_con_altas_y_abandonos(bot, red, correr, base, entregados, monkeypatch):
+    ahora = [time.monotonic()]
+    monkeypatch.setattr(bot.actividad, "reloj", lambda: ahora[0])
+    monkeypatch.setattr(bot, "MAX_PARTIDAS", MAX_PARTIDAS)
+    monkeypatch.setattr(bot, "TTL_SALA", TTL_SALA)
+    monkeypatch.setattr(bot, "TTL_PARTIDA", TTL_PARTIDA)
+    monkeypatch.setattr(bot, "ARCHIVAR_EXPULSADAS", True)
+    # Las colas y los actores sin trabajo se liberan enseguida, como tras un rato real
+    monkeypatch.setattr(modulo_salida, "INACTIVIDAD", 0.05)
+    monkeypatch.setattr(modulo_actores, "INACTIVIDAD", 0.05)
+    # Las cachés de usuarios y canales también tienen su presupuesto: que se llenen pronto
+    for cache in (bot.cache.usuarios, bot.cache.privados, bot.cache.canales):
+        monkeypatch.setattr(cache, "max_entradas", MAX_PARTIDAS)
+
+    def creador(numero: int):
+        return red.usuario(base + 10**4 * numero, admin=True)
+
+    def tamaños():
+        return {
+            "partidas": len(bot.partidas),
+            "planteles": len(bot.jugadores_por_partida),
+            "jugadores": len(bot.partida_por_usuario),
+            "actividad": len(bot.actividad),
+            "plazos": len(bot.planificador),
+        }
+
+    async def abandonar():
+        medidas = []
+        numero = 0
+        for ronda in range(RONDAS):
+            for _ in range(POR_RONDA):
+                canal = red.canal(base + numero)
+                await bot.client.entregar(creador(numero), "!mafia crear 6", canal)
+                if numero % 3 == 0:
+                    await bot.client.entregar(red.usuario(base + 10**4 * numero + 1), "!mafia unirme", canal)
+                numero += 1
+                ahora[0] += 1.0
+            await bot.barrer_partidas()
+            while bot.expulsiones_pendientes:
+                await asyncio.sleep(0.001)
+            await bot.salida.vaciar()
+            await asyncio.sleep(0.1)  # Que se liberen las colas y los actores parados
+            gc.collect()
+            if ronda == RONDAS // 4:
+                # Los avisos entregados se guardan solo hasta aquí: ocupan memoria
+                red.guardar_entregados = False
+                tracemalloc.start()
+            elif ronda == RONDAS // 2:
+                antes = tracemalloc.take_snapshot()
+            medidas.append(tamaños())
+        despues = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        return numero, medidas, antes, despues
+
+    with entregados() as avisos:
+        _, medidas, antes, despues = correr(abandonar())
+
+    # Nunca hay más partidas que el presupuesto y el resto de índices las siguen
+    for medida in medidas:
+        assert medida["partidas"] <= MAX_PARTIDAS
+        assert medida["planteles"] == medida["partidas"] == medida["actividad"]
+    assert medidas[-1] == medidas[RONDAS // 2]
+
+    # La memoria del bot no crece con las partidas expulsadas (el Discord falso sí: se excluye)
+    fuera = [tracemalloc.Filter(False, "*/bot/falso.py"), tracemalloc.Filter(False, __file__),
+             tracemalloc.Filter(False, tracemalloc.__file__)]
+    crecimiento = sum(d.size_diff for d in despues.filter_traces(fuera).compare_to(
+        antes.filter_traces(fuera), "filename"))
+    assert crecimiento < 256 * 1024
+
+    # Cada canal expulsado mientras se guardaban los avisos recibió el suyo
+    avisados = {destino for destino, texto in avisos if "se ha cerrado" in texto}
+    expulsados = {base + n for n in range(POR_RONDA * (RONDAS // 4 - 2))}
+    assert all(str(canal) not in bot.partidas for canal in expulsados)
+    assert expulsados <= avisados
+
+    # Una partida expulsada se reanuda con sus jugadores
+    async def reanudar(numero: int):
+        await bot.client.entregar(creador(numero), "!mafia reanudar", red.canal(base + numero))
+
+    correr(reanudar(0))
+    assert bot.partida_del_jugador(str(base + 1)) == str(base)
+    assert len(bot.jugadores_por_partida[str(base)]) == 2
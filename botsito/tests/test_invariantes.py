@@ -0,0 +1,43 @@
+"""Partidas enteras con COMPROBAR_INVARIANTES: los contadores del plantel siempre cuadran"""
+from carga import Carga
+from game import jugadores as modulo_jugadores
+from game.jugadores import Plantel
+
+PARTIDAS = 100  # Por tamaño de partida
+
+
+def test_contadores_cuadran_en_partidas_enteras(bot, red, correr, vaciar, monkeypatch):
+    assert modulo_jugadores.COMPROBAR_INVARIANTES
+    original = Plantel.comprobar_invariantes
+    comprobaciones = []
+    fallos = []
+
+    # El bot registra y se traga los errores de cada comando: aquí se apuntan
+    def comprobar(plantel):
+        comprobaciones.append(plantel)
+        try:
+            original(plantel)
+        except AssertionError as e:
+            fallos.append(str(e))
+            raise
+
+    monkeypatch.setattr(Plantel, "comprobar_invariantes", comprobar)
+
+    async def jugar():
+        cargas = []
+        for indice, jugadores in enumerate((5, 8, 12)):
+            carga = Carga(bot, red, jugadores, semilla=indice)
+            desde = indice * PARTIDAS
+            for numero in range(desde, desde + PARTIDAS):
+                await carga.partida(numero)
+            cargas.append(carga)
+        await vaciar()
+        return cargas
+
+    cargas = correr(jugar())
+
+    assert fallos == []
+    assert len(comprobaciones) > PARTIDAS * 3 * 5
+    for carga in cargas:
+        assert carga.terminadas == PARTIDAS
+        assert carga.atascadas == 0
@@ -0,0 +1,46 @@
+"""Plantel.buscar y los comandos de los jugadores eliminados"""
+import asyncio
+
+from game.jugadores import Plantel
+
+PLAZAS = 5
+
+
+def test_buscar_por_nombre_mencion_y_arroba():
+    plantel = Plantel()
+    for jugador_id, nombre in (("1", "Bianca"), ("2", "Bernardo"), ("3", "Ana María"), ("4", "Bia")):
+        plantel.agregar(jugador_id, nombre)
+
+    assert plantel.buscar("<@2>").nombre == "Bernardo"
+    assert plantel.buscar("<@!2>").nombre == "Bernardo"
+    for texto in ("Bia", "@Bia", "@bia"):
+        assert plantel.buscar(texto).nombre == "Bia"  # Exacto antes que prefijo
+    for texto in ("Bern", "@Bern", "@bérn"):
+        assert plantel.buscar(texto).nombre == "Bernardo"
+    for texto in ("maria", "@María", " @maria "):
+        assert plantel.buscar(texto).nombre == "Ana María"  # Por último, contenido
+    for texto in ("@", "", "@Zoe", "<@9>"):
+        assert plantel.buscar(texto) is None
+
+
+def test_eliminado_que_vota_recibe_aviso(bot, red, correr, base, vaciar, entregados):
+    canal = red.canal(base)
+    usuarios = [red.usuario(base + i) for i in range(PLAZAS)]
+
+    async def probar():
+        await bot.client.entregar(usuarios[0], f"!mafia crear {PLAZAS}", canal)
+        await asyncio.gather(*(bot.client.entregar(u, "!mafia unirme", canal) for u in usuarios[1:]))
+        await vaciar()
+        canal_id = str(canal.id)
+        muerto, vivo = usuarios[0], usuarios[1]
+        bot.jugadores_por_partida[canal_id].matar(str(muerto.id))
+        await bot.iniciar_votacion(canal_id)
+        await bot.salida.vaciar()
+
+        with entregados() as avisos:
+            await bot.client.entregar(muerto, f"!votar {vivo.mention}")
+            await bot.salida.vaciar()
+        return avisos
+
+    entregados = correr(probar())
+    assert entregados == [(10**15 + base, "💀 Ya has sido eliminado de la partida.")]
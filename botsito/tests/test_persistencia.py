@@ -0,0 +1,46 @@
+"""Diario de partidas (game/persistencia.py): lo que se recupera al arrancar"""
+from game import persistencia
+from game.persistencia import Diario
+
+
+def test_recupera_el_ultimo_estado_de_cada_partida(tmp_path):
+    ruta = str(tmp_path / "partidas.db")
+    diario = Diario(ruta)
+    diario.iniciar()
+    diario.registrar("1", "crear", {"fase": "espera", "jugadores": ["a"]})
+    diario.registrar("1", "unirse", {"fase": "espera", "jugadores": ["a", "b"]})
+    diario.registrar("2", "crear", {"fase": "espera", "jugadores": ["c"]})
+    diario.registrar("2", "fin", None)  # Terminada: no se restaura
+    diario.registrar("3", "crear", {"fase": "noche", "jugadores": ["d"]})
+    diario.archivar("3", {"fase": "noche", "jugadores": ["d"]})
+    diario.cerrar()
+    diario.cerrar()  # Cerrar dos veces no falla
+    assert diario.escritos == 6
+
+    assert Diario(ruta).cargar() == {"1": {"fase": "espera", "jugadores": ["a", "b"]}}
+
+    # La archivada espera aparte hasta que se reanuda, y solo una vez
+    otro = Diario(ruta)
+    assert otro.sacar_archivada("3") == {"fase": "noche", "jugadores": ["d"]}
+    assert otro.sacar_archivada("3") is None
+
+
+def test_compacta_sin_perder_partidas(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistencia, "COMPACTAR_CADA", 10)
+    ruta = str(tmp_path / "partidas.db")
+    diario = Diario(ruta)
+    diario.iniciar()
+    for ronda in range(30):
+        diario.registrar("1", "fase", {"ronda": ronda})
+        diario.cerrar()  # Un lote por evento: se compacta varias veces por el camino
+        diario.iniciar()
+    diario.registrar("2", "crear", {"ronda": 0})
+    diario.cerrar()
+
+    assert Diario(ruta).cargar() == {"1": {"ronda": 29}, "2": {"ronda": 0}}
+
+    # Terminar una partida que ya estaba en la instantánea la borra de ella
+    diario.iniciar()
+    diario.registrar("1", "fin", None)
+    diario.cerrar()
+    assert Diario(ruta).cargar() == {"2": {"ronda": 0}}
@@ -0,0 +1,85 @@
+"""Planificador: un solo montículo para los plazos de todas las partidas"""
+import asyncio
+import random
+
+from game.planificador import Planificador
+
+PARTIDAS = 10_000
+
+
+def test_orden_reemplazo_y_cancelacion_con_reloj_virtual(correr):
+    ahora = [0.0]
+    planificador = Planificador(reloj=lambda: ahora[0])
+    azar = random.Random(0)
+    disparados = []
+    esperado = {}  # {clave: segundo en que debe vencer}
+
+    def accion(clave: str, version: int):
+        async def vencer():
+            disparados.append((ahora[0], clave, version))
+        return vencer
+
+    async def probar():
+        for numero in range(PARTIDAS):
+            clave = str(numero)
+            vence = azar.uniform(0, 3600)
+            planificador.programar(clave, vence, accion(clave, 0))
+            esperado[clave] = (vence, 0)
+        # Una de cada cuatro pasa de fase (nuevo plazo) y otra termina (sin plazo)
+        for numero in range(0, PARTIDAS, 4):
+            clave = str(numero)
+            vence = azar.uniform(0, 3600)
+            planificador.programar(clave, vence, accion(clave, 1))
+            esperado[clave] = (vence, 1)
+        for numero in range(1, PARTIDAS, 4):
+            planificador.cancelar(str(numero))
+            del esperado[str(numero)]
+        assert len(planificador) == len(esperado)
+
+        # El reloj avanza a saltos de un minuto; en cada salto vence lo que toca
+        while ahora[0] <= 3600:
+            ahora[0] += 60
+            for vencer in planificador.extraer_vencidos():
+                await vencer()
+        planificador.detener()
+
+    correr(probar())
+
+    assert len(disparados) == len(esperado)
+    assert len(planificador) == 0 and planificador.proximo_vencimiento() is None
+    vistos = set()
+    anterior = 0.0
+    for momento, clave, version in disparados:
+        vence, ultima = esperado[clave]
+        assert version == ultima  # Solo el último plazo de cada clave
+        assert vence <= momento < vence + 60  # Ni antes de tiempo ni un salto tarde
+        assert vence >= anterior - 60  # En orden de vencimiento
+        anterior = max(anterior, vence)
+        assert clave not in vistos
+        vistos.add(clave)
+
+
+def test_acciones_en_el_bucle_y_cancelacion_al_terminar(correr):
+    planificador = Planificador()
+    disparados = []
+
+    async def probar():
+        def accion(clave: str):
+            async def vencer():
+                disparados.append(clave)
+                # Al vencer, la partida siguiente termina: su plazo ya no debe llegar
+                planificador.cancelar(str(int(clave) + 1))
+            return vencer
+
+        for numero in range(PARTIDAS):
+            planificador.programar(str(numero), 0.01 + numero * 1e-6, accion(str(numero)))
+        # Otra partida termina antes de que venza nada
+        planificador.cancelar("1")
+        await asyncio.sleep(0.2)
+        planificador.detener()
+
+    correr(probar())
+    # Ninguna clave dos veces y ninguna de las canceladas a tiempo
+    assert len(disparados) == len(set(disparados))
+    assert "1" not in disparados
+    assert len(disparados) >= PARTIDAS // 2
@@ -0,0 +1,83 @@
+"""Comandos por DM: se enrutan a la partida del autor por el índice partida_por_usuario"""
+import asyncio
+
+from game.jugadores import Plantel
+
+PLAZAS = 6
+POCAS = 50
+MUCHAS = 500
+MUESTRA = 300  # Jugadores que piden su rol por DM en cada medida
+
+# Lo que tendría que llamar quien buscara al jugador recorriendo los planteles
+CONSULTAS_PLANTEL = ("__contains__", "__iter__", "obtener", "buscar")
+
+
+def contando(metodo, consultas: list):
+    def contado(*args, **kwargs):
+        consultas.append(metodo.__name__)
+        return metodo(*args, **kwargs)
+    return contado
+
+
+def test_enrutado_de_dms_con_muchas_partidas(bot, red, correr, base, vaciar, entregados, monkeypatch):
+    consultas = []
+    for nombre in CONSULTAS_PLANTEL:
+        monkeypatch.setattr(Plantel, nombre, contando(getattr(Plantel, nombre), consultas))
+
+    def jugadores(numero: int):
+        primero = base + 10**4 * numero
+        return [red.usuario(primero + i, admin=(i == 0)) for i in range(PLAZAS)]
+
+    async def llenar(desde: int, hasta: int):
+        async def partida(numero: int):
+            canal = red.canal(base + numero)
+            creador, *resto = jugadores(numero)
+            await bot.client.entregar(creador, f"!mafia crear {PLAZAS}", canal)
+            await asyncio.gather(*(bot.client.entregar(u, "!mafia unirme", canal) for u in resto))
+
+        await asyncio.gather(*(partida(n) for n in range(desde, hasta)))
+        await vaciar()
+
+    async def pedir_roles(numeros):
+        """Consultas a los planteles por DM de `!mafia rol`"""
+        autores = [u for n in numeros for u in jugadores(n)][:MUESTRA]
+        consultas.clear()
+        await asyncio.gather(*(bot.client.entregar(u, "!mafia rol") for u in autores))
+        await bot.salida.vaciar()
+        return len(consultas) / len(autores)
+
+    async def medir():
+        await llenar(0, POCAS)
+        con_pocas = await pedir_roles(range(POCAS))
+        await llenar(POCAS, MUCHAS)
+        with entregados() as respuestas:
+            con_muchas = await pedir_roles(range(POCAS))
+        return con_pocas, con_muchas, respuestas
+
+    con_pocas, con_muchas, entregadas = correr(medir())
+
+    # Cada jugador está apuntado a su partida y su DM va a ella, no al canal del DM
+    for numero in range(MUCHAS):
+        canal_id = str(base + numero)
+        for usuario in jugadores(numero):
+            privado = str(10**15 + usuario.id)
+            encontrado, _, jugador = bot.resolver_partida(str(usuario.id), privado, True)
+            assert encontrado == canal_id
+            assert jugador is not None and jugador.id == str(usuario.id)
+
+    # Las respuestas llegan a cada DM con el rol de ese jugador en su partida
+    respuestas = {}
+    for destino, texto in entregadas:
+        respuestas.setdefault(destino - 10**15, []).append(texto)
+    for numero in range(POCAS):
+        plantel = bot.jugadores_por_partida[str(base + numero)]
+        for usuario in jugadores(numero):
+            if usuario.id not in respuestas:
+                continue  # Fuera de la muestra
+            rol = plantel.obtener(str(usuario.id)).rol.value
+            assert all(f"Tu rol en la partida de Mafia es: {rol}" in t for t in respuestas[usuario.id])
+    assert sum(len(t) for t in respuestas.values()) == MUESTRA
+
+    # Con 10 veces más partidas, un DM consulta los mismos planteles: no se recorren
+    # (el tiempo por DM con miles de partidas lo mide medir_enrutado.py)
+    assert con_muchas == con_pocas <= 3
@@ -0,0 +1,53 @@
+"""Registro (bot/registro.py): campos de contexto, límite de frecuencia y cola sin formato"""
+import json
+import logging
+import queue
+
+from bot.registro import ColaSinFormato, FormatoJSON, FormatoTexto, LimiteFrecuencia, registro_con_contexto
+
+
+def registro(mensaje: str = "Voto de %s", nivel: int = logging.INFO, creado: float = 1000.0,
+             **contexto) -> logging.LogRecord:
+    record = logging.LogRecord("prueba", nivel, __file__, 1, mensaje, ("J1",), None)
+    record.created = creado
+    record.__dict__.update(contexto)
+    return record
+
+
+def test_formatos_con_contexto():
+    record = registro(canal_id="10", usuario_id="20")
+    assert FormatoTexto().format(record).endswith("Voto de J1 [canal_id=10 usuario_id=20]")
+    assert FormatoTexto().format(registro()).endswith("Voto de J1")  # Sin contexto, sin corchetes
+
+    datos = json.loads(FormatoJSON().format(record))
+    assert datos["mensaje"] == "Voto de J1" and datos["nivel"] == "INFO"
+    assert (datos["canal_id"], datos["usuario_id"]) == ("10", "20")
+    assert "comando" not in datos
+
+
+def test_adaptador_anade_el_contexto():
+    cola = queue.SimpleQueue()
+    logger = logging.getLogger("prueba.contexto")
+    logger.addHandler(ColaSinFormato(cola))
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    try:
+        registro_con_contexto(logger, canal_id="10", usuario_id="20").info("Voto de %s", "J1")
+    finally:
+        logger.handlers.clear()
+
+    record = cola.get_nowait()
+    assert (record.canal_id, record.usuario_id) == ("10", "20")
+    # Se encola tal cual: el mensaje se formatea en el hilo del listener
+    assert record.msg == "Voto de %s" and record.args == ("J1",)
+
+
+def test_limite_de_frecuencia_por_plantilla():
+    limite = LimiteFrecuencia(max_por_segundo=3)
+    pasan = [limite.filter(registro()) for _ in range(5)]
+    assert pasan == [True, True, True, False, False]
+    assert limite.descartados == 2
+
+    assert limite.filter(registro("Otro mensaje"))  # Cada plantilla lleva su cuenta
+    assert limite.filter(registro(nivel=logging.WARNING))  # Los avisos nunca se descartan
+    assert limite.filter(registro(creado=1001.0))  # Segundo nuevo, cuenta nueva
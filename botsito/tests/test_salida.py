@@ -0,0 +1,91 @@
+"""ColaSalida: agrupa por destino y no deja de enviar aunque falle un envío"""
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot import salida as modulo_salida
+from bot.salida import ColaSalida
+
+
+def error_http(status: int) -> discord.HTTPException:
+    return discord.HTTPException(SimpleNamespace(status=status, reason="prueba", headers={}), "prueba")
+
+
+class Destino:
+    """Canal que falla con los errores de `fallos` (uno por envío) antes de funcionar"""
+
+    def __init__(self, destino_id: int, fallos=()):
+        self.id = destino_id
+        self.fallos = list(fallos)
+        self.intentos = 0
+        self.recibidos = []
+
+    async def send(self, contenido: str):
+        self.intentos += 1
+        if self.fallos:
+            raise self.fallos.pop(0)
+        self.recibidos.append(contenido)
+
+
+def test_reintenta_errores_transitorios(correr, monkeypatch):
+    monkeypatch.setattr(modulo_salida, "espera_reintento", lambda error, intento: 0)
+    cola = ColaSalida(ventana=0)
+    destino = Destino(1, [error_http(429), error_http(503), OSError("conexión cortada")])
+
+    async def probar():
+        await cola.enviar(destino, "hola")
+        await cola.vaciar()
+
+    correr(probar())
+    assert destino.recibidos == ["hola"]
+    assert destino.intentos == 4
+
+
+def test_no_reintenta_errores_definitivos(correr, monkeypatch):
+    monkeypatch.setattr(modulo_salida, "espera_reintento", lambda error, intento: 0)
+    cola = ColaSalida(ventana=0)
+    destino = Destino(2, [error_http(403)])
+
+    async def probar():
+        await cola.enviar(destino, "sin permisos")
+        await cola.vaciar()
+        await cola.enviar(destino, "otra vez")
+        await cola.vaciar()
+
+    correr(probar())
+    assert destino.recibidos == ["otra vez"]
+    assert destino.intentos == 2
+
+
+def test_un_error_inesperado_no_para_la_cola(correr):
+    cola = ColaSalida(ventana=0, max_pendientes=2)
+    destino = Destino(3, [RuntimeError("error de programación")])
+
+    async def probar():
+        await cola.enviar(destino, "se pierde")
+        await cola.vaciar()
+        # Más mensajes que caben en la cola: si la tarea hubiera muerto, esto esperaría siempre
+        for numero in range(5):
+            await cola.enviar(destino, str(numero))
+        await cola.vaciar()
+
+    correr(asyncio.wait_for(probar(), 2))
+    assert "\n".join(destino.recibidos).split("\n") == [str(n) for n in range(5)]
+
+
+def test_mensaje_encolado_al_liberar_la_cola_no_se_pierde(correr, monkeypatch):
+    """Un mensaje que llega en la misma vuelta del bucle que el plazo de inactividad se envía"""
+    monkeypatch.setattr(modulo_salida, "INACTIVIDAD", 0)
+    cola = ColaSalida(ventana=0)
+    destino = Destino(4)
+
+    async def probar():
+        for numero in range(300):
+            await cola.enviar(destino, str(numero))
+            for _ in range(numero % 3):
+                await asyncio.sleep(0)
+        await cola.vaciar()
+
+    correr(asyncio.wait_for(probar(), 2))
+    assert "\n".join(destino.recibidos).split("\n") == [str(n) for n in range(300)]
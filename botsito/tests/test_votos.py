@@ -0,0 +1,103 @@
+"""Recuento (game/votos.py): cambios de voto, desempates y el máximo que se lleva al día"""
+import random
+
+from game.votos import Desempate, Recuento
+
+
+def comprobar_maximo(recuento: Recuento):
+    """El máximo y los grupos por conteo cuadran con un recuento hecho desde cero"""
+    conteo = {}
+    for objetivo in recuento.votos.values():
+        conteo[objetivo] = conteo.get(objetivo, 0) + 1
+    assert recuento.conteo == conteo
+    assert recuento.maximo == max(conteo.values(), default=0)
+    assert sorted(recuento.lideres()) == sorted(o for o, v in conteo.items() if v == recuento.maximo)
+    assert all(grupo for grupo in recuento._por_conteo.values())  # Sin grupos vacíos
+
+
+def test_cambiar_y_retirar_voto():
+    recuento = Recuento()
+    recuento.votar("a", "x")
+    recuento.votar("b", "x")
+    recuento.votar("c", "y")
+    assert recuento.ganador() == "x" and recuento.maximo == 2
+
+    recuento.votar("a", "x")  # El mismo voto otra vez no cuenta doble
+    assert recuento.conteo["x"] == 2 and len(recuento) == 3
+
+    recuento.votar("b", "y")  # Cambia de voto: x pierde uno, y gana uno
+    assert recuento.conteo == {"x": 1, "y": 2}
+    assert recuento.ganador() == "y"
+    comprobar_maximo(recuento)
+
+    recuento.retirar("c")
+    recuento.retirar("c")  # Quien ya no tiene voto no cambia nada
+    assert recuento.conteo == {"x": 1, "y": 1} and len(recuento) == 2
+    assert recuento.empate
+    comprobar_maximo(recuento)
+
+    recuento.retirar("a")
+    recuento.retirar("b")
+    assert recuento.conteo == {} and recuento.maximo == 0
+    assert recuento.ganador() is None and not recuento.empate
+
+
+def test_desempates():
+    def empatado(desempate: Desempate) -> Recuento:
+        recuento = Recuento(desempate, semilla=1)
+        recuento.votar("a", "y")
+        recuento.votar("b", "x")
+        recuento.votar("c", "y")
+        recuento.votar("d", "x")  # x llega a 2 después que y
+        return recuento
+
+    assert empatado(Desempate.SIN_DECISION).ganador() is None
+    assert empatado(Desempate.PRIMERO).ganador() == "y"
+    ganadores = {empatado(Desempate.ALEATORIO).ganador() for _ in range(5)}
+    assert len(ganadores) == 1 and ganadores <= {"x", "y"}  # Con la misma semilla, el mismo
+
+    recuento = empatado(Desempate.PRIMERO)
+    recuento.votar("c", "x")  # y baja a 1 y x sube a 3...
+    recuento.votar("c", "y")  # ...y vuelven a empatar a 2, ahora con y la última en llegar
+    assert recuento.ganador() == "x"
+
+
+def test_mayoria_absoluta():
+    recuento = Recuento()
+    recuento.votar("a", "x")
+    recuento.votar("b", "x")
+    assert recuento.mayoria(4) is None  # 2 de 4 no es más de la mitad
+    assert recuento.mayoria(3) == "x"
+    recuento.votar("c", "y")
+    recuento.votar("d", "y")
+    assert recuento.mayoria(5) is None
+    recuento.votar("e", "y")
+    assert recuento.mayoria(5) == "y"
+
+
+def test_maximo_al_dia_con_votos_al_azar():
+    azar = random.Random(0)
+    recuento = Recuento(Desempate.PRIMERO)
+    votantes = [str(i) for i in range(12)]
+    objetivos = ["x", "y", "z", "w"]
+    for _ in range(2000):
+        votante = azar.choice(votantes)
+        if azar.random() < 0.25:
+            recuento.retirar(votante)
+        else:
+            recuento.votar(votante, azar.choice(objetivos))
+        comprobar_maximo(recuento)
+
+
+def test_copia_y_dict_independientes():
+    recuento = Recuento(Desempate.PRIMERO)
+    recuento.votar("a", "x")
+    recuento.votar("b", "y")
+    copia = recuento.copia()
+    copia.votar("c", "y")
+    assert recuento.conteo == {"x": 1, "y": 1}
+    assert copia.ganador() == "y"
+
+    restaurado = Recuento.desde_dict(recuento.a_dict())
+    assert restaurado.votos == recuento.votos
+    assert restaurado.ganador() == recuento.ganador() == "x"